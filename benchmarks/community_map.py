@@ -0,0 +1,61 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Compare community lookups from SQLite with the in-memory community map.
+
+Run from the repository root with: python -m benchmarks.community_map
+"""
+import asyncio
+import random
+import time
+
+import aiosqlite
+
+from lgapi import database
+
+
+async def sqlite_lookup(communities: set) -> dict:
+    """Look up community descriptions with a query per response, as before the in-memory map."""
+    async with aiosqlite.connect(database.DB_PATH) as db_con:
+        async with db_con.cursor() as db_cursor:
+            placeholders = ",".join("?" for _ in communities)
+            sql = f"SELECT community, name FROM communities WHERE community IN ({placeholders})"
+            res = await db_cursor.execute(sql, tuple(communities))
+            return {row[0]: row[1] for row in await res.fetchall()}
+
+
+def response_communities(size: int = 1000) -> set:
+    """Build the communities of a large BGP response, three quarters of them known."""
+    exact = sorted(database.community_map.exact)
+    known = random.sample(exact, min(len(exact), size * 3 // 4))
+    unknown = {f"64512:{n}" for n in range(size - len(known))}
+    return set(known) | unknown
+
+
+async def main(rounds: int = 200) -> None:
+    """Print the mean time to describe the communities of a 1k community response."""
+    await database.init_community_map_db()
+    await database.load_community_map()
+    communities = response_communities()
+    assert await sqlite_lookup(communities) == database.get_community_map(communities)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await sqlite_lookup(communities)
+    sqlite_time = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        database.get_community_map(communities)
+    memory_time = (time.perf_counter() - start) / rounds
+
+    print(f"{len(communities)} communities, {len(database.community_map)} descriptions loaded")
+    print(f"sqlite    {sqlite_time * 1e3:8.3f} ms per response")
+    print(f"in-memory {memory_time * 1e3:8.3f} ms per response ({sqlite_time / memory_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
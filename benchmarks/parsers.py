@@ -0,0 +1,53 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Compare the throughput of the native parsers with the compiled TTP templates.
+
+Run from the repository root with: python -m benchmarks.parsers
+"""
+import time
+from pathlib import Path
+
+from lgapi.native_parsers import NATIVE_PARSERS
+from lgapi.parsing import get_template, parse_txt
+
+FIXTURE_DIR = Path("tests/fixtures")
+
+# Size of the large outputs, built by repeating the recorded output.
+LARGE_SIZE = 1024 * 1024
+
+
+def throughput(func, *args, size: int, min_time: float = 1.0) -> float:
+    """Get the parse throughput in MB of device output per second."""
+    rounds = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_time:
+        func(*args)
+        rounds += 1
+    return size * rounds / elapsed / 1e6
+
+
+def main() -> None:
+    """Print the throughput of each parser on the recorded output and on a 1 MB output."""
+    print(f"{'parser':<26} {'output':>10} {'ttp MB/s':>10} {'native MB/s':>12} {'speedup':>8}")
+    for (device_type, command), native_parser in NATIVE_PARSERS.items():
+        template = get_template(command, device_type)
+        recorded = (FIXTURE_DIR / f"{device_type}_{command}.txt").read_text()
+        large = recorded * (LARGE_SIZE // len(recorded) + 1)
+
+        for label, raw_output in (("recorded", recorded), ("1 MB", large)):
+            assert native_parser(raw_output) == parse_txt(raw_output, template)
+            size = len(raw_output.encode())
+            ttp_rate = throughput(parse_txt, raw_output, template, size=size)
+            native_rate = throughput(native_parser, raw_output, size=size)
+            print(
+                f"{device_type + '_' + command:<26} {label:>10} {ttp_rate:>10.2f} {native_rate:>12.2f}"
+                f" {native_rate / ttp_rate:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
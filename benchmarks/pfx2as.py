@@ -0,0 +1,57 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Measure local IP to ASN lookups on a prefix to AS table the size of a full table.
+
+Run from the repository root with: python -m benchmarks.pfx2as [pfx2as file]
+"""
+import ipaddress
+import random
+import sys
+import time
+
+from lgapi.pfx2as import PrefixIndex, read_index
+
+
+def synthetic_table(ipv4: int = 1_000_000, ipv6: int = 200_000) -> list[str]:
+    """Build random pfx2as lines with about a full table's prefix counts, nested prefixes included."""
+    rng = random.Random(1)
+    lines = []
+    for _ in range(ipv4):
+        network = ipaddress.IPv4Network((rng.getrandbits(32), rng.randint(16, 24)), strict=False)
+        lines.append(f"{network.network_address}\t{network.prefixlen}\t{rng.randint(1, 400000)}")
+    for _ in range(ipv6):
+        network = ipaddress.IPv6Network(((0x2000 << 112) | rng.getrandbits(112), rng.randint(32, 48)), strict=False)
+        lines.append(f"{network.network_address}\t{network.prefixlen}\t{rng.randint(1, 400000)}")
+    return lines
+
+
+def main(lookups: int = 1_000_000) -> None:
+    """Print the index build time and the mean time of a lookup."""
+    if len(sys.argv) > 1:
+        start = time.perf_counter()
+        index = read_index(sys.argv[1])
+    else:
+        lines = synthetic_table()
+        start = time.perf_counter()
+        index = PrefixIndex(lines)
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(2)
+    addresses = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(lookups * 4 // 5)]
+    addresses += [str(ipaddress.IPv6Address((0x2000 << 112) | rng.getrandbits(112))) for _ in range(lookups // 5)]
+
+    start = time.perf_counter()
+    found = sum(1 for address in addresses if index.lookup(address) is not None)
+    lookup_time = time.perf_counter() - start
+
+    print(f"{len(index)} prefixes indexed in {build_time:.1f}s")
+    per_lookup = lookup_time / len(addresses) * 1e6
+    print(f"{len(addresses)} lookups in {lookup_time:.2f}s, {per_lookup:.2f} us each, {found} found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Compare cache serializers on typical cached values.
+
+Run from the repository root with: python -m benchmarks.serializers
+"""
+import time
+import timeit
+
+from lgapi.serializers import CompactSerializer, msgpack, zstandard
+
+BGP_OUTPUT = "\n".join(
+    [
+        "inet.0: 1012345 destinations, 4049380 routes (1012300 active, 0 holddown, 45 hidden)",
+        "+ = Active Route, - = Last Active, * = Both",
+        "",
+        "8.8.8.0/24 (4 entries, 1 announced)",
+    ]
+    + [
+        line
+        for n in range(4)
+        for line in (
+            "        *BGP    Preference: 170/-101",
+            f"                Next hop: 192.0.2.{n + 1} via et-0/0/{n}.0, selected",
+            "                AS path: 15169 I",
+            f"                Communities: 2914:410 2914:1007 2914:2000 2914:3000 65535:{n}",
+            "                Localpref: 100",
+            f"                Router ID: 198.51.100.{n + 1}",
+        )
+    ]
+)
+
+TRACEROUTE_OUTPUT = "\n".join(
+    ["traceroute to 8.8.8.8 (8.8.8.8), 30 hops max, 52 byte packets"]
+    + [
+        f" {hop} ae{hop}.cr{hop}.lon1.example.net (203.0.113.{hop})  {hop * 1.3:.3f} ms  {hop * 1.4:.3f} ms"
+        f"  {hop * 1.2:.3f} ms"
+        for hop in range(1, 16)
+    ]
+)
+
+VALUES = {
+    "bgp command": {"value": BGP_OUTPUT, "stored": time.time()},
+    "traceroute command": {"value": TRACEROUTE_OUTPUT, "stored": time.time()},
+    "asninfo": {
+        "asnName": "GOOGLE",
+        "rank": 2453,
+        "organization": {"orgName": "Google LLC"},
+        "country": {"iso": "US", "name": "United States"},
+    },
+    "ip2asn": {"asn": 15169, "bgp_prefix": "8.8.8.0/24", "registry": "arin"},
+    "rev_dns": "dns.google",
+}
+
+
+def serializers() -> dict[str, CompactSerializer]:
+    """Build each available serializer configuration."""
+    options = {"pickle": CompactSerializer(fmt="pickle"), "json": CompactSerializer(fmt="json")}
+    if msgpack:
+        options["msgpack"] = CompactSerializer(fmt="msgpack")
+    if zstandard:
+        options["json+zstd"] = CompactSerializer(fmt="json", compression="zstd")
+        if msgpack:
+            options["msgpack+zstd"] = CompactSerializer(fmt="msgpack", compression="zstd")
+    return options
+
+
+def main(number: int = 20000) -> None:
+    """Print encode and decode time and encoded size for each value and serializer."""
+    print(f"{'value':<20} {'serializer':<14} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for name, value in VALUES.items():
+        for label, serializer in serializers().items():
+            data = serializer.dumps(value)
+            assert serializer.loads(data) == value
+            encode = timeit.timeit(lambda: serializer.dumps(value), number=number) / number * 1e6
+            decode = timeit.timeit(lambda: serializer.loads(data), number=number) / number * 1e6
+            print(f"{name:<20} {label:<14} {len(data):>7} {encode:>10.2f} {decode:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Compare parsing with a new TTP object per call against the precompiled templates.
+
+Run from the repository root with: python -m benchmarks.ttp_templates
+"""
+import time
+from pathlib import Path
+
+from ttp import ttp
+
+from lgapi.parsing import TEMPLATE_DIR, get_template, parse_txt
+
+FIXTURE_DIR = Path("tests/fixtures")
+
+
+def parse_uncompiled(raw_output: str, template_path: str) -> list:
+    """Parse as before the template cache, loading and compiling the template each time."""
+    ttp_parser = ttp(data=raw_output, template=template_path)
+    ttp_parser.parse()
+    return ttp_parser.result(structure="flat_list")
+
+
+def mean_time(func, *args, number: int) -> float:
+    """Get the mean time of a call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(number):
+        func(*args)
+    return (time.perf_counter() - start) / number * 1e3
+
+
+def main(number: int = 200) -> None:
+    """Print the per parse latency of each shipped template before and after."""
+    print(f"{'template':<26} {'before ms':>10} {'after ms':>10}")
+    for template_path in sorted(TEMPLATE_DIR.glob("*.ttp")):
+        raw_output = (FIXTURE_DIR / f"{template_path.stem}.txt").read_text()
+        device_type, command = template_path.stem.rsplit("_", 1)
+        template = get_template(command, device_type)
+        assert parse_txt(raw_output, template) == parse_uncompiled(raw_output, str(template_path))
+
+        before = mean_time(parse_uncompiled, raw_output, str(template_path), number=number)
+        after = mean_time(parse_txt, raw_output, template, number=number)
+        print(f"{template_path.stem:<26} {before:>10.3f} {after:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
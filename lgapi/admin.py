@@ -0,0 +1,79 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Admin and monitoring endpoints."""
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from lgapi import database
+from lgapi.admission import limiters
+from lgapi.cache import flush_cache
+from lgapi.config import settings
+from lgapi.decorators import cache_stats, local_cache
+from lgapi.parsing import parse_pool
+from lgapi.types.models import CommunityMapStats, LimiterStats, ParseStats
+
+
+async def verify_api_key(x_api_key: Annotated[str | None, Header()] = None) -> None:
+    """Check the admin API key, admin endpoints are hidden when no key is configured."""
+    api_key = settings.admin.api_key
+    if not api_key:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not x_api_key or not secrets.compare_digest(x_api_key, api_key):
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(verify_api_key)])
+
+
+@router.get("/limits", response_model=list[LimiterStats])
+async def limits() -> list:
+    """Get device concurrency, queue depth and wait time statistics per location."""
+    return [limiter.stats() for limiter in limiters.values()]
+
+
+@router.get("/parsing", response_model=ParseStats)
+async def parsing() -> dict:
+    """Get inline and offloaded parse counts, with queue and parse times, for this worker."""
+    return parse_pool.stats()
+
+
+@router.get("/cache", response_model=dict[str, dict[str, int]])
+async def cache() -> dict:
+    """Get cache hit, stale and miss counts, and the in-process cache size for this worker."""
+    stats = {name: dict(counts) for name, counts in cache_stats.items()}
+    stats["local_cache"] = {"entries": len(local_cache), "max_size": local_cache.max_size}
+    return stats
+
+
+@router.post("/cache/flush", response_model=dict[str, int])
+async def cache_flush() -> dict:
+    """Remove all cached lookups and command output, and this worker's in-process cache."""
+    local_entries = len(local_cache)
+    local_cache.clear()
+    return {"redis_keys": await flush_cache(), "local_entries": local_entries}
+
+
+def community_map_stats() -> dict:
+    """Get the loaded community map details."""
+    index = database.community_map
+    return {**database.community_map_info, "entries": len(index.exact), "patterns": index.pattern_count}
+
+
+@router.get("/communities", response_model=CommunityMapStats)
+async def communities() -> dict:
+    """Get the generation, file and entry counts of this worker's community map."""
+    return community_map_stats()
+
+
+@router.post("/communities/reload", response_model=CommunityMapStats)
+async def communities_reload() -> dict:
+    """Rebuild the community map from changed mapping files and load it in this worker."""
+    await database.reload_community_map()
+    return community_map_stats()
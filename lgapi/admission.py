@@ -0,0 +1,147 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Per location admission control for device commands.
+
+Limits how many commands run against a location's device at once. Commands over
+the limit wait in a bounded FIFO queue and are rejected once the queue is full or
+they have waited too long, so the routers' VTY lines and control plane policers
+are never flooded.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from lgapi.config import settings
+from lgapi.types.config import ConcurrencyConfig
+
+
+class DeviceBusyError(Exception):
+    """Raised when a command is not admitted to run on a device."""
+
+    def __init__(self, location: str, retry_after: int, queue_full: bool):
+        self.location = location
+        self.retry_after = retry_after
+        self.queue_full = queue_full
+        reason = "queue is full" if queue_full else "timed out waiting in queue"
+        super().__init__(f"Device at location '{location}' is busy, {reason}")
+
+
+class ConcurrencyLimiter:
+    """FIFO concurrency limiter with a bounded wait queue."""
+
+    def __init__(self, location: str, config: ConcurrencyConfig):
+        self.location = location
+        self.config = config
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.hold_time_total = 0.0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds until a slot is likely to be free."""
+        avg_hold = self.hold_time_total / self.admitted if self.admitted else self.config.max_wait
+        estimate = avg_hold * (len(self.waiters) + 1) / self.config.max_concurrent
+        return max(1, min(math.ceil(estimate), math.ceil(self.config.max_wait)))
+
+    async def acquire(self) -> None:
+        """Wait for a free slot, raising DeviceBusyError if the command is not admitted."""
+        if self.active < self.config.max_concurrent and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self.waiters) >= self.config.max_queue:
+            self.rejected_queue_full += 1
+            raise DeviceBusyError(self.location, self.retry_after(), queue_full=True)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.queued_total += 1
+        start = time.monotonic()
+
+        try:
+            async with asyncio.timeout(self.config.max_wait):
+                await waiter
+        except TimeoutError:
+            # The slot may have been handed over just as the timeout fired.
+            if not waiter.done() or waiter.cancelled():
+                self._remove_waiter(waiter)
+                self.rejected_timeout += 1
+                raise DeviceBusyError(self.location, self.retry_after(), queue_full=False) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._remove_waiter(waiter)
+            raise
+        finally:
+            waited = time.monotonic() - start
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+        self.admitted += 1
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        """Remove an abandoned waiter from the queue."""
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """Hand the slot to the next waiter in the queue, or free it."""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the context."""
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.hold_time_total += time.monotonic() - start
+            self.release()
+
+    def stats(self) -> dict:
+        """Current queue depth and wait time statistics."""
+        return {
+            "location": self.location,
+            "max_concurrent": self.config.max_concurrent,
+            "max_queue": self.config.max_queue,
+            "max_wait": self.config.max_wait,
+            "active": self.active,
+            "queue_depth": len(self.waiters),
+            "admitted": self.admitted,
+            "queued": self.queued_total,
+            "wait_time_avg": self.wait_time_total / self.queued_total if self.queued_total else 0.0,
+            "wait_time_max": self.wait_time_max,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+limiters = {location: ConcurrencyLimiter(location, cfg.concurrency) for location, cfg in settings.locations.items()}
+
+
+def device_slot(location: str):
+    """Get the admission slot context manager for a location."""
+    return limiters[location].slot()
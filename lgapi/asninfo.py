@@ -0,0 +1,221 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Local store of CAIDA AS Rank ASN information.
+
+The store is a SQLite database with the AS Rank details of each ASN, the same as
+the live API returns them. Build or refresh it from the AS Rank API, or from a
+JSON lines dump with one AS Rank ASN per line, with:
+
+    python -m lgapi.asninfo refresh [--file asns.jsonl.gz] [--database mapsdb/asninfo.db]
+
+The new database is written beside the old one and swapped in when complete.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+from collections.abc import AsyncIterator, Iterable
+
+import aiosqlite
+from httpx import AsyncClient
+
+from lgapi import logger
+from lgapi.config import settings
+
+DEFAULT_DB_PATH = "mapsdb/asninfo.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS asns(asn INTEGER PRIMARY KEY, info TEXT) WITHOUT ROWID;
+"""
+
+INSERT_SQL = "INSERT OR REPLACE INTO asns(asn, info) VALUES (?, ?)"
+
+ASNS_QUERY = """{{
+    asns(first:{first}, offset:{offset}) {{
+        pageInfo {{
+            hasNextPage
+        }}
+        edges {{
+            node {{
+                asn
+                asnName
+                rank
+                organization {{
+                    orgName
+                }}
+                country {{
+                    iso
+                    name
+                }}
+            }}
+        }}
+    }}
+}}"""
+
+
+# Read only connection to the store, shared by all requests in the worker.
+store_con: aiosqlite.Connection | None = None
+
+# Path, inode and modification time of the store the connection is open on.
+store_identity: tuple[str, int, int] | None = None
+
+store_lock = asyncio.Lock()
+
+
+def store_file_identity(db_path: str) -> tuple[str, int, int] | None:
+    """Get the path, inode and modification time of the store, which change when it is replaced."""
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return (db_path, stat.st_ino, stat.st_mtime_ns)
+
+
+async def close_store() -> None:
+    """Close the connection to the store."""
+    global store_con, store_identity
+
+    if store_con is not None:
+        await store_con.close()
+    store_con = None
+    store_identity = None
+
+
+async def open_store(db_path: str) -> aiosqlite.Connection | None:
+    """Get the connection to the store, opening it again if the store was refreshed since."""
+    global store_con, store_identity
+
+    identity = store_file_identity(db_path)
+    if store_con is not None and identity == store_identity:
+        return store_con
+
+    async with store_lock:
+        if store_con is None or identity != store_identity:
+            await close_store()
+            if identity is None:
+                return None
+            store_con = await aiosqlite.connect(f"file:{db_path}?mode=ro", uri=True)
+            store_identity = identity
+            logger.debug("Opened ASN information store %s", db_path)
+    return store_con
+
+
+async def lookup_asns(db_path: str, asns: Iterable[int]) -> dict[int, dict]:
+    """Get the stored information of the ASNs, ASNs that are not stored are left out."""
+    asns = list(asns)
+    if not asns:
+        return {}
+    db_con = await open_store(db_path)
+    if db_con is None:
+        return {}
+
+    # One call, so the query is queued before a refresh can close the connection.
+    placeholders = ",".join("?" for _ in asns)
+    rows = await db_con.execute_fetchall(f"SELECT asn, info FROM asns WHERE asn IN ({placeholders})", asns)
+    return {asn: json.loads(info) for asn, info in rows}
+
+
+def asn_entry(node: dict) -> tuple[int, str] | None:
+    """Split an AS Rank ASN into its number and the information the API gives for one ASN."""
+    asn = str(node.get("asn", ""))
+    if not asn.isdigit():
+        return None
+    info = {field: value for field, value in node.items() if field != "asn"}
+    return int(asn), json.dumps(info, separators=(",", ":"))
+
+
+async def read_dump(filepath: str) -> AsyncIterator[dict]:
+    """Read a JSON lines dump of AS Rank ASNs, gzip compressed if it ends in .gz."""
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "rt", encoding="utf-8") as dump_file:
+        for line in dump_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def fetch_asrank(httpclient: AsyncClient, page_size: int = 5000) -> AsyncIterator[dict]:
+    """Page through every ASN in the AS Rank API."""
+    offset = 0
+    while True:
+        response = await httpclient.post(
+            settings.asninfo.api_url,
+            json={"query": ASNS_QUERY.format(first=page_size, offset=offset)},
+            timeout=60,
+        )
+        response.raise_for_status()
+        asns = response.json()["data"]["asns"]
+        for edge in asns["edges"]:
+            yield edge["node"]
+
+        offset += page_size
+        logger.info("Fetched %d ASNs from AS Rank", offset)
+        if not asns["pageInfo"]["hasNextPage"]:
+            return
+
+
+async def write_store(db_path: str, nodes: AsyncIterator[dict]) -> int:
+    """Write the ASNs to a new database which then replaces the store, returns the ASN count."""
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    try:
+        count = 0
+        async with aiosqlite.connect(tmp_path) as db_con:
+            await db_con.executescript(SCHEMA)
+
+            batch = []
+            async for node in nodes:
+                entry = asn_entry(node)
+                if entry:
+                    batch.append(entry)
+                if len(batch) == 10000:
+                    await db_con.executemany(INSERT_SQL, batch)
+                    count += len(batch)
+                    batch = []
+            await db_con.executemany(INSERT_SQL, batch)
+            count += len(batch)
+            await db_con.commit()
+
+        if not count:
+            raise ValueError("No ASNs found, keeping the current store")
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return count
+
+
+async def refresh(db_path: str, filepath: str | None = None) -> int:
+    """Rebuild the store from a dump file, or from the AS Rank API if there is no file."""
+    if filepath:
+        return await write_store(db_path, read_dump(filepath))
+
+    async with AsyncClient() as httpclient:
+        return await write_store(db_path, fetch_asrank(httpclient))
+
+
+def main() -> None:
+    """Command line interface to refresh the ASN information store."""
+    parser = argparse.ArgumentParser(prog="python -m lgapi.asninfo", description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = subparsers.add_parser("refresh", help="Rebuild the store from the AS Rank API or a dump file")
+    refresh_parser.add_argument("--file", help="JSON lines dump of AS Rank ASNs, instead of the API")
+    refresh_parser.add_argument("--database", help=f"Store to write, asninfo.database or {DEFAULT_DB_PATH} if unset")
+    args = parser.parse_args()
+
+    db_path = args.database or settings.asninfo.database or DEFAULT_DB_PATH
+
+    count = asyncio.run(refresh(db_path, args.file))
+    print(f"Stored {count} ASNs in {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Batch single item lookups made close together into one call.
+
+Lookups of one item at a time, from one response or from concurrent requests,
+are collected for a short window and then loaded together with one call. Each
+caller still waits on, and gets, the result of its own item, so the per item
+caching around the lookups is unchanged.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from lgapi import logger
+
+
+class BatchLoader:
+    """Collect the items requested within a window and load them with one call."""
+
+    def __init__(self, load_many: Callable[..., Awaitable[dict]], window: float, max_size: int):
+        """Batch calls to load_many(items, *args), which returns a result for each item.
+
+        A result that is an exception is raised to the caller of that item only.
+
+        Lookups sharing the same extra arguments are batched together. A batch is loaded
+        window seconds after its first item, or as soon as it holds max_size items.
+        """
+        self.load_many = load_many
+        self.window = window
+        self.max_size = max_size
+        self.pending: dict[tuple, dict[Hashable, asyncio.Future]] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    async def load(self, item: Hashable, *args: Any) -> Any:
+        """Get the result for one item, loaded in a batch with the other items requested with it."""
+        loop = asyncio.get_running_loop()
+        batch = self.pending.get(args)
+        if batch is None:
+            batch = self.pending[args] = {}
+            loop.call_later(self.window, self._dispatch, args, batch)
+
+        future = batch.get(item)
+        if future is None:
+            future = batch[item] = loop.create_future()
+            if len(batch) >= self.max_size:
+                self._dispatch(args, batch)
+
+        # Shield the shared future so one cancelled caller does not cancel it for the others.
+        return await asyncio.shield(future)
+
+    def _dispatch(self, args: tuple, batch: dict[Hashable, asyncio.Future]) -> None:
+        """Start loading a batch, unless it was already started when it filled up."""
+        if self.pending.get(args) is not batch:
+            return
+        del self.pending[args]
+
+        task = asyncio.create_task(self._run(args, batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, args: tuple, batch: dict[Hashable, asyncio.Future]) -> None:
+        logger.debug("Loading a batch of %d items with %s", len(batch), self.load_many.__name__)
+        try:
+            results = await self.load_many(list(batch), *args)
+        except Exception as err:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(err)
+            return
+
+        for item, future in batch.items():
+            if future.done():
+                continue
+            result = results.get(item)
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
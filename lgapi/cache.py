@@ -4,24 +4,134 @@
 # "BSD 2-Clause License". Please see the LICENSE file that should
 # have been included as part of this distribution.
 #
-"""Generate cache keys, used as key builder functions"""
+"""Generate cache keys, used as key builder functions, and manage cache generations.
+
+Cache keys carry a generation derived from the code and config that produced the
+cached values. A change in either starts a new generation, so workers never read
+stale formats and the cache does not need clearing when workers start. Keys from
+old generations are removed in the background, or expire with their TTL.
+"""
+import asyncio
+import hashlib
+import json
+
+from aiocache import caches
+
+from lgapi import logger
+from lgapi.config import settings
+
+# Bump when the structure of cached lookup results or command output changes.
+LOOKUP_CACHE_VERSION = 1
+COMMAND_CACHE_VERSION = 1
+
+LOOKUP_PREFIXES = ("asninfo", "ip2asn", "rev_dns")
+COMMAND_PREFIXES = ("command",)
+
+# Keys unlinked per batch when removing old generations.
+SCAN_BATCH = 500
+
+
+def build_generation(*parts) -> str:
+    """Hash the parts that cached values depend on into a short generation id."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:8]
+
+
+LOOKUP_GENERATION = build_generation(LOOKUP_CACHE_VERSION, settings.cache.redis.serializer)
+
+COMMAND_GENERATION = build_generation(
+    COMMAND_CACHE_VERSION,
+    settings.cache.redis.serializer,
+    settings.commands.model_dump(mode="json"),
+    {
+        name: {"device": location.device, "type": location.type, "source": location.source.model_dump(mode="json")}
+        for name, location in settings.locations.items()
+    },
+)
 
 
 def asn_key_builder(func, *args, **kwargs):
     """Builds the cache key for ASN lookup"""
-    return f"asninfo:{args[0]}"
+    return f"asninfo:{LOOKUP_GENERATION}:{args[0]}"
 
 
 def reverse_dns_key_builder(func, *args, **kwargs):
     """Builds the cache key for reverse DNS lookup"""
-    return f"rev_dns:{args[0]}"
+    return f"rev_dns:{LOOKUP_GENERATION}:{args[0]}"
 
 
 def ip_to_asn_key_builder(func, *args, **kwargs):
     """Builds the cache key from function name plus the destination IP address"""
-    return f"ip2asn:{args[0]}"
+    return f"ip2asn:{LOOKUP_GENERATION}:{args[0]}"
 
 
 def command_key_builder(func, *args, **kwargs):
     """Builds the cache key from function name plus the command, location and destination IP address"""
-    return f"command:{args[0]}_{args[1]}_{args[2]}"
+    return f"command:{COMMAND_GENERATION}:{args[0]}_{args[1]}_{args[2]}"
+
+
+def command_ttl_builder(func, *args, **kwargs):
+    """Gets the soft and hard cache lifetimes from the command type"""
+    return settings.cache.commands.get_ttls(args[1])
+
+
+def job_key(job_id: str) -> str:
+    """Builds the cache key for a background job"""
+    return f"job:{job_id}"
+
+
+def current_prefixes() -> list[str]:
+    """Get the key prefixes of the current cache generations."""
+    return [f"{prefix}:{LOOKUP_GENERATION}:" for prefix in LOOKUP_PREFIXES] + [
+        f"{prefix}:{COMMAND_GENERATION}:" for prefix in COMMAND_PREFIXES
+    ]
+
+
+async def unlink_keys(prefixes: tuple[str, ...], keep: list[str] | None = None) -> int:
+    """Unlink the Redis keys under the prefixes, except those under the keep prefixes."""
+    cache = caches.get("default")
+    namespace = settings.cache.redis.namespace
+    keep = tuple(f"{namespace}:{prefix}".encode() for prefix in keep or [])
+    removed = 0
+
+    for prefix in prefixes:
+        batch = []
+        async for key in cache.client.scan_iter(match=f"{namespace}:{prefix}:*", count=SCAN_BATCH):
+            if not key.startswith(keep):
+                batch.append(key)
+            if len(batch) >= SCAN_BATCH:
+                removed += await cache.client.unlink(*batch)
+                batch = []
+                # Let requests run between batches.
+                await asyncio.sleep(0.01)
+        if batch:
+            removed += await cache.client.unlink(*batch)
+
+    return removed
+
+
+async def collect_old_generations() -> None:
+    """Remove keys left by old cache generations, once per generation change."""
+    if not settings.cache.enabled:
+        return
+
+    cache = caches.get("default")
+    marker = f"{settings.cache.redis.namespace}:cache:generation"
+    generation = f"{LOOKUP_GENERATION}:{COMMAND_GENERATION}"
+
+    try:
+        # Only the first worker to see a new generation cleans up after the old ones.
+        previous = await cache.client.getset(marker, generation)
+        if previous is not None and previous.decode() == generation:
+            return
+
+        removed = await unlink_keys(LOOKUP_PREFIXES + COMMAND_PREFIXES, keep=current_prefixes())
+        logger.info("Removed %d cache keys from old generations", removed)
+    except Exception as err:
+        logger.warning("Unable to remove old cache generations: %s", err)
+
+
+async def flush_cache() -> int:
+    """Remove all cached lookups and command output from Redis."""
+    if not settings.cache.enabled:
+        return 0
+    return await unlink_keys(LOOKUP_PREFIXES + COMMAND_PREFIXES)
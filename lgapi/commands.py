@@ -8,17 +8,47 @@
 import asyncio
 import ipaddress
 
+from aiocache import caches
+
 from lgapi import logger
-from lgapi.cache import command_key_builder
+from lgapi.admission import DeviceBusyError, device_slot
+from lgapi.batchloader import BatchLoader
+from lgapi.cache import command_key_builder, command_ttl_builder
 from lgapi.config import settings
 from lgapi.decorators import command_cache
-from lgapi.device import execute_on_device, get_command_timeout
+from lgapi.device import (
+    execute_many_on_device,
+    execute_on_device,
+    get_command_timeout,
+)
+from lgapi.singleflight import RedisBackend, SingleFlight
 from lgapi.types.models import MultiBgpBody, MultiPingBody
 from lgapi.types.returntypes import CmdResult, LocationResult
 
 LOCATIONS_CFG = settings.locations
 COMMANDS_CFG = settings.commands
 
+# Seconds destinations missing the cache are collected for, to run them in one device session.
+LOCATION_BATCH_WINDOW = 0.01
+LOCATION_BATCH_SIZE = 10
+
+
+def create_coalescer() -> SingleFlight | None:
+    """Set up coalescing of identical in-flight device commands."""
+    mode = settings.devices.coalesce
+    if mode == "off":
+        return None
+
+    if mode == "redis":
+        if settings.cache.enabled:
+            return SingleFlight(RedisBackend(caches.get("default").client, settings.cache.redis.namespace))
+        logger.warning("Redis command coalescing needs the cache enabled, coalescing in this worker only")
+
+    return SingleFlight()
+
+
+coalescer = create_coalescer()
+
 
 def get_ip_version(ip: str) -> str:
     """Return 'ipv4' or 'ipv6' based on the IP address or CIDR."""
@@ -58,23 +88,85 @@ def get_cmd(location: str, command: str, ip_address: str) -> CmdResult:
     }
 
 
-@command_cache(alias="default", key_builder=command_key_builder)
+async def run_single_command(location: str, command: str, destination: str) -> str:
+    """Run command on the location's device."""
+
+    device_commands = get_cmd(location, command, destination)
+    loc_config = LOCATIONS_CFG[location]
+
+    async with device_slot(location):
+        response = await execute_on_device(
+            hostname=loc_config.device,
+            device_type=device_commands["device_type"],
+            cli_command=device_commands["cmd"],
+            auth_group=loc_config.authentication,
+            timeout=get_command_timeout(command),
+        )
+    return response.result
+
+
+@command_cache(alias="default", key_builder=command_key_builder, ttl_builder=command_ttl_builder)
 async def execute_single_command(location: str, command: str, destination: str) -> str:
-    """Execute command on device."""
+    """Execute command on device, sharing the execution with identical commands already in flight."""
 
     logger.debug("Cache Miss: Execute %s command at %s to %s", command, location, destination)
 
-    device_commands = get_cmd(location, command, destination)
+    if coalescer is None:
+        return await run_single_command(location, command, destination)
+
+    return await coalescer.do(
+        command_key_builder(None, location, command, destination),
+        lambda: run_single_command(location, command, destination),
+        timeout=get_command_timeout(command) + LOCATIONS_CFG[location].concurrency.max_wait,
+    )
+
+
+async def execute_location_commands(location: str, command: str, destinations: list[str]) -> dict[str, str | Exception]:
+    """Execute command for several destinations on a device in a single session.
+
+    Returns the output of each destination, or the error it failed with.
+    """
+
+    logger.debug("Cache Miss: Execute %s command at %s to %s", command, location, ", ".join(destinations))
+
     loc_config = LOCATIONS_CFG[location]
+    cli_commands = [get_cmd(location, command, destination)["cmd"] for destination in destinations]
+
+    async with device_slot(location):
+        responses = await execute_many_on_device(
+            hostname=loc_config.device,
+            device_type=loc_config.type,
+            cli_commands=cli_commands,
+            auth_group=loc_config.authentication,
+            timeout=get_command_timeout(command),
+        )
+    return {
+        destination: response if isinstance(response, Exception) else response.result
+        for destination, response in zip(destinations, responses)
+    }
+
+
+# Destinations of the same command and location are run together in one device session.
+location_loader = BatchLoader(
+    lambda destinations, location, command: execute_location_commands(location, command, destinations),
+    window=LOCATION_BATCH_WINDOW,
+    max_size=LOCATION_BATCH_SIZE,
+)
 
-    response = await execute_on_device(
-        hostname=loc_config.device,
-        device_type=device_commands["device_type"],
-        cli_command=device_commands["cmd"],
-        auth_group=loc_config.authentication,
-        timeout=get_command_timeout(command),
+
+async def execute_destination_command(location: str, command: str, destination: str) -> str:
+    """Execute command for a destination missing the cache, in a session shared with other destinations.
+
+    Identical commands already in flight, from single or multi destination requests, are joined.
+    """
+    if coalescer is None:
+        return await location_loader.load(destination, location, command)
+
+    return await coalescer.do(
+        command_key_builder(None, location, command, destination),
+        lambda: location_loader.load(destination, location, command),
+        timeout=get_command_timeout(command) * LOCATION_BATCH_SIZE + LOCATIONS_CFG[location].concurrency.max_wait,
     )
-    return response.result
 
 
 async def run_for_location(
@@ -82,17 +174,31 @@ async def run_for_location(
     command: str,
     ipaddresses: list[str],
 ) -> LocationResult:
-    """Run all destinations for a location sequentially."""
-    result: LocationResult = {"location": location, "result": "", "errors": []}
-    for destination in ipaddresses:
-        try:
-            cmd_result = await execute_single_command(location, command, destination)
-            if result["result"]:
-                result["result"] += "\n"
-            result["result"] += cmd_result
-        except Exception as err:
-            logger.warning("Error executing %s at %s for %s: %s", command, location, destination, err)
-            result["errors"].append(f"{location}:{destination}: Error getting output from network device")
+    """Run all destinations for a location, uncached destinations in one device session."""
+    result: LocationResult = {"location": location, "outputs": {}, "errors": {}}
+
+    cached_results = await asyncio.gather(
+        *(execute_single_command.lookup(location, command, destination) for destination in ipaddresses)
+    )
+    outputs = {dest: output for dest, output in zip(ipaddresses, cached_results) if output is not None}
+    misses = [dest for dest in ipaddresses if dest not in outputs]
+
+    cmd_results = await asyncio.gather(
+        *(execute_destination_command(location, command, destination) for destination in misses),
+        return_exceptions=True,
+    )
+    for destination, cmd_result in zip(misses, cmd_results):
+        if isinstance(cmd_result, DeviceBusyError):
+            logger.warning("Not running %s at %s for %s: %s", command, location, destination, cmd_result)
+            result["errors"][destination] = "Network device is busy, try again later"
+        elif isinstance(cmd_result, BaseException):
+            logger.warning("Error executing %s at %s for %s: %s", command, location, destination, cmd_result)
+            result["errors"][destination] = "Error getting output from network device"
+        else:
+            outputs[destination] = cmd_result
+            await execute_single_command.store(cmd_result, location, command, destination)
+
+    result["outputs"] = {dest: outputs[dest] for dest in ipaddresses if dest in outputs}
     return result
 
 
@@ -100,12 +206,12 @@ async def execute_multiple_commands(
     targets: MultiPingBody | MultiBgpBody,
     command: str,
 ) -> list[LocationResult]:
-    """Execute command on device: destinations per location sequential, locations in parallel."""
+    """Execute command on device: destinations per location in one session, locations in parallel."""
 
     locations = list(set(targets.locations))
     ipaddresses = list({str(dest) for dest in targets.destinations})
 
-    # Run each location in parallel, but destinations per location sequentially
+    # Run each location in parallel, with all destinations for a location in one session
     tasks = [run_for_location(location, command, ipaddresses) for location in locations]
     formatted_results = await asyncio.gather(*tasks, return_exceptions=False)
     return formatted_results
@@ -0,0 +1,192 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Match BGP communities against exact and pattern community descriptions.
+
+Besides exact communities, mapping files can describe a range of values with a
+pattern in place of the value parts of a standard or large community:
+
+    3356:2xxx               Trailing x digits, 2000 to 2999
+    1299:[20000-29999]      Inclusive range
+    1299:2:[100-199]        Large community, each value part can be a pattern
+
+Patterns are compiled into sorted, non-overlapping intervals per ASN so that a
+community is matched with a binary search. Where patterns overlap the one from the
+higher priority file wins, then the narrower pattern, then the one read last.
+"""
+import re
+from bisect import bisect_right
+from collections.abc import Callable
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from lgapi import logger
+
+WILDCARD_REGEX = re.compile(r"(\d*)(x+)")
+RANGE_REGEX = re.compile(r"\[(\d+)-(\d+)\]")
+
+LARGE_PREFIX = "large:"
+
+
+@dataclass(frozen=True)
+class IntervalIndex:
+    """Non-overlapping inclusive intervals, each with a value, searched with bisect."""
+
+    starts: tuple[int, ...]
+    ends: tuple[int, ...]
+    values: tuple[Any, ...]
+
+    def get(self, number: int) -> Any:
+        """Get the value of the interval containing the number, None if there is none."""
+        idx = bisect_right(self.starts, number) - 1
+        if idx >= 0 and number <= self.ends[idx]:
+            return self.values[idx]
+        return None
+
+
+def build_intervals(items: list[tuple[int, int, Any]], combine: Callable[[list], Any]) -> IntervalIndex:
+    """Compile possibly overlapping (low, high, item) ranges into an interval index.
+
+    The value of each interval is combined from the items covering it, neighbouring
+    intervals with equal values are merged.
+    """
+    points = sorted({low for low, _, _ in items} | {high + 1 for _, high, _ in items})
+    starts, ends, values = [], [], []
+
+    for start, following in zip(points, points[1:]):
+        end = following - 1
+        covering = [item for low, high, item in items if low <= start and high >= end]
+        if not covering:
+            continue
+
+        value = combine(covering)
+        if ends and ends[-1] == start - 1 and values[-1] == value:
+            ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+            values.append(value)
+
+    return IntervalIndex(tuple(starts), tuple(ends), tuple(values))
+
+
+def best_description(patterns: list[tuple]) -> str:
+    """Get the description of the highest ranked pattern."""
+    return max(patterns, key=lambda pattern: pattern[1])[2]
+
+
+def parse_part(part: str) -> tuple[int, int] | None:
+    """Parse a community value part into an inclusive range, None if it is not valid."""
+    if part.isdigit():
+        return (int(part), int(part))
+
+    match = WILDCARD_REGEX.fullmatch(part)
+    if match:
+        prefix, wildcard = match.groups()
+        return (int(prefix + "0" * len(wildcard)), int(prefix + "9" * len(wildcard)))
+
+    match = RANGE_REGEX.fullmatch(part)
+    if match and int(match.group(1)) <= int(match.group(2)):
+        return (int(match.group(1)), int(match.group(2)))
+
+    return None
+
+
+def parse_pattern(pattern: str) -> tuple[int, list[tuple[int, int]]] | None:
+    """Parse a standard or large community pattern into its ASN and value ranges."""
+    parts = pattern.removeprefix(LARGE_PREFIX).split(":")
+    if len(parts) not in (2, 3) or not parts[0].isdigit():
+        return None
+
+    ranges = [parse_part(part) for part in parts[1:]]
+    if None in ranges:
+        return None
+    return int(parts[0]), ranges
+
+
+def is_pattern(community: str) -> bool:
+    """Check if a community from a mapping file is a pattern rather than an exact value."""
+    return "x" in community or "[" in community
+
+
+class CommunityIndex:
+    """Read only community descriptions, exact communities first then patterns."""
+
+    def __init__(self, entries: list[tuple[str, str, int]] | None = None):
+        """Compile (community, description, priority) entries, later entries take precedence."""
+        exact = {}
+        patterns: dict[tuple[int, int], list] = {}
+
+        for order, (community, description, priority) in enumerate(entries or []):
+            if not is_pattern(community):
+                exact[community] = description
+                continue
+
+            parsed = parse_pattern(community)
+            if parsed is None:
+                logger.warning("Ignoring invalid BGP community pattern %s", community)
+                continue
+
+            asn, ranges = parsed
+            width = 1
+            for low, high in ranges:
+                width *= high - low + 1
+            patterns.setdefault((asn, len(ranges)), []).append((ranges, (priority, -width, order), description))
+
+        self.exact = MappingProxyType(exact)
+        self.pattern_count = sum(len(items) for items in patterns.values())
+        self.patterns = {key: self.compile(items) for key, items in patterns.items()}
+
+    @staticmethod
+    def compile(patterns: list[tuple]) -> IntervalIndex:
+        """Compile the (ranges, rank, description) patterns of one ASN into an interval index."""
+        if len(patterns[0][0]) == 1:
+            return build_intervals([(*pattern[0][0], pattern) for pattern in patterns], best_description)
+
+        # Large communities: intervals of the first value part, each holding an index of the second.
+        def second_part(covering: list[tuple]) -> IntervalIndex:
+            return build_intervals([(*pattern[0][1], pattern) for pattern in covering], best_description)
+
+        return build_intervals([(*pattern[0][0], pattern) for pattern in patterns], second_part)
+
+    def get(self, community: str) -> str | None:
+        """Get the description of a community, None if it is not mapped."""
+        description = self.exact.get(community)
+        if description is not None:
+            return description
+
+        normalised = community.removeprefix(LARGE_PREFIX)
+        if normalised != community:
+            description = self.exact.get(normalised)
+            if description is not None:
+                return description
+
+        if not self.patterns:
+            return None
+
+        parts = normalised.split(":")
+        if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+            return None
+
+        index = self.patterns.get((int(parts[0]), len(parts) - 1))
+        for part in parts[1:]:
+            if index is None:
+                return None
+            index = index.get(int(part))
+        return index
+
+    def lookup(self, communities: set) -> dict:
+        """Get the descriptions of the mapped communities."""
+        result = {}
+        for community in communities:
+            description = self.get(community)
+            if description is not None:
+                result[community] = description
+        return result
+
+    def __len__(self) -> int:
+        return len(self.exact) + self.pattern_count
@@ -20,11 +20,19 @@ from pydantic_settings import (
 )
 
 from lgapi.types.config import (
+    AdminConfig,
+    AsnInfoConfig,
     AuthenticationConfig,
     CacheConfig,
     CommandsConfig,
+    CommunitiesConfig,
+    DevicesConfig,
+    DnsConfig,
+    EnrichmentConfig,
     LimitsConfig,
     LocationConfig,
+    ParsingConfig,
+    Pfx2AsConfig,
 )
 
 
@@ -45,6 +53,22 @@ class Settings(BaseSettings):
 
     authentication: AuthenticationConfig
 
+    devices: DevicesConfig = Field(default_factory=DevicesConfig)
+
+    admin: AdminConfig = Field(default_factory=AdminConfig)
+
+    communities: CommunitiesConfig = Field(default_factory=CommunitiesConfig)
+
+    parsing: ParsingConfig = Field(default_factory=ParsingConfig)
+
+    pfx2as: Pfx2AsConfig = Field(default_factory=Pfx2AsConfig)
+
+    asninfo: AsnInfoConfig = Field(default_factory=AsnInfoConfig)
+
+    dns: DnsConfig = Field(default_factory=DnsConfig)
+
+    enrichment: EnrichmentConfig = Field(default_factory=EnrichmentConfig)
+
     locations: dict[str, LocationConfig]
     commands: CommandsConfig
 
@@ -95,7 +119,12 @@ def configure_cache() -> None:
         "db": db,
         "namespace": redis_cfg.namespace,
         "timeout": redis_cfg.timeout,
-        "serializer": {"class": "aiocache.serializers.PickleSerializer"},
+        "serializer": {
+            "class": "lgapi.serializers.CompactSerializer",
+            "fmt": redis_cfg.serializer,
+            "compression": redis_cfg.compression,
+            "compress_min_size": redis_cfg.compress_min_size,
+        },
     }
 
     # Only add password if it exists
@@ -4,66 +4,254 @@
 # "BSD 2-Clause License". Please see the LICENSE file that should
 # have been included as part of this distribution.
 """Database functions, mainly for Community mapping"""
+import asyncio
+import fcntl
+import hashlib
 import os
 import re
+import shutil
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 import aiosqlite
 import aiosqlite.cursor
 
 from lgapi import logger
+from lgapi.communities import CommunityIndex
 
+DB_PATH = "mapsdb/maps.db"
+LOCK_PATH = "mapsdb/maps.db.lock"
 
-async def get_community_map(communities: set) -> dict:
-    """Get community descriptions from the database."""
-    if not communities:
+# Mapping file directories, communities from higher priority directories take precedence.
+SOURCE_DIRS = (("mapsdb/asns", 0), ("mapsdb/override", 1))
+
+SCHEMA_VERSION = 2
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS communities(
+    community TEXT, name TEXT, source TEXT, priority INTEGER, PRIMARY KEY(community, source)
+);
+CREATE TABLE IF NOT EXISTS manifest(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+# Community descriptions loaded from the database, read only and replaced as a whole.
+community_map = CommunityIndex()
+
+# Build generation, file count and load time of the loaded community map.
+community_map_info: dict = {"generation": None, "files": 0, "loaded": None}
+
+# Identity of the database file the community map was loaded from.
+loaded_db: tuple[int, int] | None = None
+
+reload_lock = asyncio.Lock()
+
+
+def get_community_map(communities: set) -> dict:
+    """Get community descriptions from the in-memory community map."""
+    return community_map.lookup(communities)
+
+
+def db_identity() -> tuple[int, int] | None:
+    """Get the inode and modification time of the database, which change when it is rebuilt."""
+    try:
+        stat = os.stat(DB_PATH)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+async def load_community_map() -> None:
+    """Load the community descriptions from the database into memory."""
+    global community_map, community_map_info, loaded_db
+
+    identity = db_identity()
+    async with aiosqlite.connect(DB_PATH) as db_con:
+        # Later rows replace earlier ones, so overrides are read last.
+        sql = "SELECT community, name, priority FROM communities ORDER BY priority, source"
+        async with db_con.execute(sql) as res:
+            entries = await res.fetchall()
+        async with db_con.execute("SELECT hash FROM manifest ORDER BY path") as res:
+            hashes = [row[0] for row in await res.fetchall()]
+
+    # Requests in progress keep the map they started with, new requests see the new one.
+    community_map = await asyncio.to_thread(CommunityIndex, entries)
+    community_map_info = {
+        "generation": hashlib.sha256("".join(hashes).encode()).hexdigest()[:12],
+        "files": len(hashes),
+        "loaded": time.time(),
+    }
+    loaded_db = identity
+    logger.debug("Loaded %d BGP community descriptions", len(community_map))
+
+
+async def reload_community_map() -> bool:
+    """Rebuild the database if the mapping files changed, and load it if it is newer.
+
+    Returns True if a new community map was loaded.
+    """
+    async with reload_lock:
+        await init_community_map_db()
+        if db_identity() == loaded_db:
+            return False
+
+        await load_community_map()
+        logger.info("Reloaded BGP community map, generation %s", community_map_info["generation"])
+        return True
+
+
+async def try_reload_community_map() -> None:
+    """Reload the community map, logging rather than raising errors."""
+    try:
+        await reload_community_map()
+    except (OSError, UnicodeDecodeError, aiosqlite.Error) as err:
+        logger.warning("Unable to reload BGP community map: %s", err)
+
+
+async def watch_community_files(interval: int) -> None:
+    """Check for changed mapping files every interval seconds, and reload them."""
+    while True:
+        await asyncio.sleep(interval)
+        await try_reload_community_map()
+
+
+def file_hash(filepath: str) -> str:
+    """Get the SHA-256 hash of a file's content."""
+    with open(filepath, "rb") as source_file:
+        return hashlib.file_digest(source_file, "sha256").hexdigest()
+
+
+def read_communities_file(filepath: str) -> list[list[str]]:
+    """Read the community and description pairs from a mapping file."""
+    records = []
+    with open(filepath, "r", encoding="utf-8") as communities_file:
+        for line in communities_file:
+            line = line.strip()
+            if line.startswith("#") or not line:
+                continue
+
+            data = re.split(r"\s+", line, maxsplit=1)
+            if len(data) == 2:
+                records.append(data)
+    return records
+
+
+async def read_manifest() -> dict[str, tuple]:
+    """Get the size, modification time and hash of each file in the current database."""
+    if not os.path.exists(DB_PATH):
         return {}
 
-    async with aiosqlite.connect("mapsdb/maps.db") as db_con:
-        async with db_con.cursor() as db_cursor:
-            placeholders = ",".join("?" for _ in communities)
-            sql = f"SELECT community, name FROM communities WHERE community IN ({placeholders})"
-            res = await db_cursor.execute(sql, tuple(communities))
-            return {row[0]: row[1] for row in await res.fetchall()}
+    async with aiosqlite.connect(DB_PATH) as db_con:
+        async with db_con.execute("PRAGMA user_version") as res:
+            if (await res.fetchone())[0] != SCHEMA_VERSION:
+                return {}
+        async with db_con.execute("SELECT path, size, mtime, hash FROM manifest") as res:
+            return {row[0]: row[1:] for row in await res.fetchall()}
+
 
+async def insert_communities_from_dir(
+    db_cursor: aiosqlite.cursor.Cursor, directory: str, priority: int, manifest: dict[str, tuple]
+) -> set[str]:
+    """Re-import the ASN files in the directory that changed since the manifest, return the files seen."""
+    seen = set()
+    if not os.path.isdir(directory):
+        return seen
 
-async def insert_communities_from_dir(db_cursor: aiosqlite.cursor.Cursor, directory: str):
-    """Inserts the community mapping into the database from each ASN file"""
-    for filename in os.listdir(directory):
+    for filename in sorted(os.listdir(directory)):
         if not filename.endswith(".txt"):
             continue
 
         filepath = os.path.join(directory, filename)
+        seen.add(filepath)
+        stat = os.stat(filepath)
+
+        previous = manifest.get(filepath)
+        if previous and previous[:2] == (stat.st_size, stat.st_mtime):
+            continue
+
+        digest = file_hash(filepath)
+        if not previous or previous[2] != digest:
+            logger.debug("Building BGP community data from %s", filepath)
+            await db_cursor.execute("DELETE FROM communities WHERE source = ?", (filepath,))
+            await db_cursor.executemany(
+                "INSERT INTO communities(community, name, source, priority) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(community, source) DO UPDATE SET name=excluded.name;",
+                [(community, name, filepath, priority) for community, name in read_communities_file(filepath)],
+            )
+
+        await db_cursor.execute(
+            "INSERT OR REPLACE INTO manifest(path, size, mtime, hash) VALUES (?, ?, ?, ?)",
+            (filepath, stat.st_size, stat.st_mtime, digest),
+        )
+
+    return seen
+
+
+def sources_changed(manifest: dict[str, tuple]) -> bool:
+    """Check the mapping files against the manifest by size and modification time."""
+    current = {}
+    for directory, _ in SOURCE_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            if filename.endswith(".txt"):
+                stat = os.stat(os.path.join(directory, filename))
+                current[os.path.join(directory, filename)] = (stat.st_size, stat.st_mtime)
+
+    return current != {path: entry[:2] for path, entry in manifest.items()}
+
+
+@asynccontextmanager
+async def builder_lock() -> AsyncIterator[None]:
+    """Hold the lock that allows only one process at a time to build the database."""
+    with open(LOCK_PATH, "a", encoding="utf-8") as lock_file:
+        await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 
-        logger.debug("Building BGP community data from %s", filepath)
+async def init_community_map_db() -> bool:
+    """Bring the community mappings database up to date with the mapping files.
 
-        with open(filepath, "r") as communities_file:
-            records = []
-            for line in communities_file:
-                line = line.strip()
-                if line.startswith("#") or not line:
-                    continue
+    Only files that changed since the last build are imported. The update is made to a
+    copy of the database which then replaces it, so readers never see a partial table.
+    Returns True if the database was rebuilt.
+    """
+    async with builder_lock():
+        manifest = await read_manifest()
+        if manifest and not sources_changed(manifest):
+            logger.debug("BGP community database is up to date")
+            return False
 
-                data = re.split(r"\s+", line, maxsplit=1)
-                if len(data) == 2:
-                    records.append(data)
+        tmp_path = f"{DB_PATH}.{os.getpid()}.tmp"
+        if manifest:
+            shutil.copyfile(DB_PATH, tmp_path)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-            if records:
-                await db_cursor.executemany(
-                    "INSERT INTO communities(community, name) VALUES (?, ?) "
-                    "ON CONFLICT(community) DO UPDATE SET name=excluded.name;",
-                    records,
-                )
+        try:
+            async with aiosqlite.connect(tmp_path) as db_con:
+                async with db_con.cursor() as db_cursor:
+                    await db_cursor.executescript(SCHEMA)
 
+                    seen = set()
+                    for directory, priority in SOURCE_DIRS:
+                        seen |= await insert_communities_from_dir(db_cursor, directory, priority, manifest)
 
-async def init_community_map_db():
-    """Initialise the community mappings database."""
+                    for removed in set(manifest) - seen:
+                        logger.debug("Removing BGP community data from %s", removed)
+                        await db_cursor.execute("DELETE FROM communities WHERE source = ?", (removed,))
+                        await db_cursor.execute("DELETE FROM manifest WHERE path = ?", (removed,))
 
-    async with aiosqlite.connect("mapsdb/maps.db") as db_con:
-        async with db_con.cursor() as db_cursor:
-            await db_cursor.execute("DROP TABLE IF EXISTS communities")
-            await db_cursor.execute("CREATE TABLE communities(community TEXT PRIMARY KEY, name TEXT)")
+                    await db_con.commit()
 
-            await insert_communities_from_dir(db_cursor, "mapsdb/asns")
-            await insert_communities_from_dir(db_cursor, "mapsdb/override")
+            os.replace(tmp_path, DB_PATH)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
-            await db_con.commit()
+    logger.debug("Rebuilt BGP community database")
+    return True
@@ -5,47 +5,276 @@
 # have been included as part of this distribution.
 #
 """Decorator overrides for AIOCache so that caching can be disabled or enabled"""
+import asyncio
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterable
 from functools import wraps
 from typing import Any, Callable
 
-from aiocache import cached
+from aiocache import caches
 
+from lgapi import logger
 from lgapi.config import settings
+from lgapi.localcache import MISSING, LocalCache
 
+# Cache hit, stale and miss counts by cache key prefix (and command for the command cache).
+cache_stats: defaultdict[str, Counter] = defaultdict(Counter)
 
-def command_cache(alias: str, key_builder: Callable) -> Callable:
-    """Apply command caching if enabled in settings, otherwise run uncached."""
+# In-process cache in front of Redis for lookups, shared by all request cached functions.
+local_cache = LocalCache(settings.cache.local.max_size)
+
+
+def command_cache(alias: str, key_builder: Callable, ttl_builder: Callable) -> Callable:
+    """Apply stale-while-revalidate command caching if enabled in settings, otherwise run uncached.
+
+    Cached output younger than the soft TTL is returned as is. Between the soft and hard
+    TTL the stale output is returned straight away and a single background call refreshes
+    the entry. Once the hard TTL has passed the entry has expired and the next call waits.
+    Cache backend errors are logged and the command run as if there was no cached output.
+    """
 
     cache_enabled = getattr(settings.cache, "enabled", False)
     command_cache_enabled = getattr(getattr(settings.cache, "commands", {}), "enabled", False)
-    ttl = getattr(getattr(settings.cache, "commands", {}), "ttl", 180)
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
-        if cache_enabled and command_cache_enabled:
-            return cached(alias=alias, key_builder=key_builder, ttl=ttl)(func)
+        if not (cache_enabled and command_cache_enabled):
+
+            @wraps(func)
+            async def uncached(*args: Any, **kwargs: Any) -> Any:
+                return await func(*args, **kwargs)
+
+            async def no_lookup(*args: Any) -> Any:
+                return None
+
+            async def no_store(value: Any, *args: Any) -> None:
+                return None
+
+            uncached.lookup = no_lookup
+            uncached.store = no_store
+            return uncached
+
+        cache = caches.get(alias)
+        refreshing: dict[str, asyncio.Task] = {}
+
+        def stats_for(args: tuple) -> Counter:
+            prefix = key_builder(func, *args).split(":", 1)[0]
+            return cache_stats[f"{prefix}:{args[1]}"]
+
+        async def store(value: Any, *args: Any) -> None:
+            key = key_builder(func, *args)
+            _, hard_ttl = ttl_builder(func, *args)
+            try:
+                await cache.set(key, {"value": value, "stored": time.time()}, ttl=hard_ttl)
+            except Exception as err:
+                logger.warning("Error writing cache entry %s: %s", key, err)
+
+        async def refresh(key: str, args: tuple) -> None:
+            try:
+                await store(await func(*args), *args)
+            except Exception as err:
+                stats_for(args)["refresh_error"] += 1
+                logger.warning("Error refreshing stale cache entry %s: %s", key, err)
+
+        async def lookup(*args: Any) -> Any:
+            key = key_builder(func, *args)
+            stats = stats_for(args)
+            try:
+                entry = await cache.get(key)
+            except Exception as err:
+                logger.warning("Error reading cache entry %s: %s", key, err)
+                entry = None
+
+            if not isinstance(entry, dict):
+                stats["miss"] += 1
+                return None
+
+            soft_ttl, _ = ttl_builder(func, *args)
+            if time.time() - entry["stored"] < soft_ttl:
+                stats["hit"] += 1
+                return entry["value"]
+
+            stats["stale"] += 1
+            if key not in refreshing:
+                logger.debug("Cache Stale: Refreshing %s", key)
+                task = asyncio.create_task(refresh(key, args))
+                refreshing[key] = task
+                task.add_done_callback(lambda _: refreshing.pop(key, None))
+            return entry["value"]
 
         @wraps(func)
-        async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            return await func(*args, **kwargs)
+        async def wrapper(*args: Any) -> Any:
+            value = await lookup(*args)
+            if value is not None:
+                return value
 
+            value = await func(*args)
+            await store(value, *args)
+            return value
+
+        # Allow callers that run the command themselves to check and fill the cache.
+        wrapper.lookup = lookup
+        wrapper.store = store
         return wrapper
 
     return decorator
 
 
 def request_cache(alias: str, ttl: int, key_builder: Callable) -> Callable:
-    """Apply request caching if enabled in settings, otherwise run uncached."""
+    """Apply two tier request caching, in-process then Redis, when caching is enabled in settings.
+
+    The in-process cache is checked first and filled from both Redis hits and fresh
+    results, so hot keys are answered without a Redis round trip. Empty results, from
+    failed lookups, are kept for the shorter cache.negative_ttl. Redis errors are logged
+    and treated as misses.
+    """
 
     cache_enabled = getattr(settings.cache, "enabled", False)
+    local_cfg = settings.cache.local
+    local_enabled = cache_enabled and local_cfg.enabled
+    negative_ttl = settings.cache.negative_ttl
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
-        if cache_enabled:
-            return cached(alias=alias, key_builder=key_builder, ttl=ttl)(func)
+        if not cache_enabled:
+
+            @wraps(func)
+            async def uncached(*args: Any, **kwargs: Any) -> Any:
+                return await func(*args, **kwargs)
+
+            async def uncached_batch(items: Iterable, *args: Any) -> dict:
+                items = list(dict.fromkeys(items))
+                return dict(zip(items, await asyncio.gather(*(func(item, *args) for item in items))))
+
+            async def uncached_store(fetched: dict, *args: Any) -> None:
+                pass
+
+            async def uncached_lookup_cached(items: Iterable, *args: Any) -> tuple[dict, list]:
+                return {}, list(dict.fromkeys(items))
+
+            uncached.batch = uncached_batch
+            uncached.lookup_cached = uncached_lookup_cached
+            uncached.fetch = uncached
+            uncached.store = uncached_store
+            return uncached
+
+        cache = caches.get(alias) if cache_enabled else None
+
+        def ttl_for(value: Any) -> int:
+            return ttl if value else min(ttl, negative_ttl)
+
+        def local_ttl_for(key: str, value: Any) -> float:
+            return min(ttl_for(value), local_cfg.get_ttl(key.split(":", 1)[0]))
+
+        async def fill(key: str, *args: Any, **kwargs: Any) -> Any:
+            """Run the lookup for a cache miss and store the result in both tiers."""
+            cache_stats[key.split(":", 1)[0]]["miss"] += 1
+            value = await func(*args, **kwargs)
+
+            if cache and ttl_for(value):
+                try:
+                    await cache.set(key, value, ttl=ttl_for(value))
+                except Exception as err:
+                    logger.warning("Error writing cache entry %s: %s", key, err)
+            if local_enabled:
+                local_cache.set(key, value, local_ttl_for(key, value))
+            return value
+
+        async def store(fetched: dict, *args: Any) -> None:
+            """Store the results of many lookups in both tiers, with one pipelined MSET per TTL."""
+            keys = {item: key_builder(func, item, *args) for item in fetched}
+            if cache:
+                for found in (True, False):
+                    pairs = [(keys[item], value) for item, value in fetched.items() if bool(value) is found]
+                    if pairs and ttl_for(found):
+                        try:
+                            await cache.multi_set(pairs, ttl=ttl_for(found))
+                        except Exception as err:
+                            logger.warning("Error writing %d cache entries: %s", len(pairs), err)
+            if local_enabled:
+                for item, value in fetched.items():
+                    local_cache.set(keys[item], value, local_ttl_for(keys[item], value))
 
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            return await func(*args, **kwargs)
+            key = key_builder(func, *args, **kwargs)
+            stats = cache_stats[key.split(":", 1)[0]]
+
+            if local_enabled:
+                value = local_cache.get(key)
+                if value is not MISSING:
+                    stats["local_hit"] += 1
+                    return value
+
+            if cache:
+                try:
+                    value = await cache.get(key)
+                except Exception as err:
+                    logger.warning("Error reading cache entry %s: %s", key, err)
+                    value = None
+                if value is not None:
+                    stats["redis_hit"] += 1
+                    if local_enabled:
+                        local_cache.set(key, value, local_ttl_for(key, value))
+                    return value
+
+            return await fill(key, *args, **kwargs)
+
+        async def lookup_cached(items: Iterable, *args: Any) -> tuple[dict, list]:
+            """Get the cached results of many items, from the in-process cache then one Redis MGET.
+
+            Returns the results found and the items that missed both tiers.
+            """
+            pending = {item: key_builder(func, item, *args) for item in dict.fromkeys(items)}
+            results = {}
+
+            for item, key in list(pending.items()):
+                value = local_cache.get(key) if local_enabled else MISSING
+                if value is not MISSING:
+                    del pending[item]
+                    cache_stats[key.split(":", 1)[0]]["local_hit"] += 1
+                    results[item] = value
+
+            if cache and pending:
+                try:
+                    values = await cache.multi_get(list(pending.values()))
+                except Exception as err:
+                    logger.warning("Error reading %d cache entries: %s", len(pending), err)
+                    values = [None] * len(pending)
+                for item, value in zip(list(pending), values):
+                    if value is not None:
+                        key = pending.pop(item)
+                        cache_stats[key.split(":", 1)[0]]["redis_hit"] += 1
+                        results[item] = value
+                        if local_enabled:
+                            local_cache.set(key, value, local_ttl_for(key, value))
+
+            return results, list(pending)
+
+        async def fetch(item: Any, *args: Any) -> Any:
+            """Look up an item that missed the cache, leaving the result to be stored with store."""
+            cache_stats[key_builder(func, item, *args).split(":", 1)[0]]["miss"] += 1
+            return await func(item, *args)
+
+        async def batch(items: Iterable, *args: Any) -> dict:
+            """Look up many items at once, the first argument varying and the rest shared.
+
+            Hits come from the in-process cache, then one Redis MGET for the rest. Only
+            the misses are looked up, and are written back with one pipelined MSET.
+            """
+            results, misses = await lookup_cached(items, *args)
+            if not misses:
+                return results
+
+            values = await asyncio.gather(*(fetch(item, *args) for item in misses))
+            fetched = dict(zip(misses, values))
+            results.update(fetched)
+            await store(fetched, *args)
+            return results
 
+        wrapper.lookup_cached = lookup_cached
+        wrapper.fetch = fetch
+        wrapper.store = store
+        wrapper.batch = batch
         return wrapper
 
     return decorator
@@ -6,17 +6,22 @@
 #
 """Device command runner."""
 
+import asyncio
+import re
+from collections.abc import AsyncIterator
 
-from scrapli import AsyncScrapli
 from scrapli.response import Response
 
 from lgapi.config import settings
+from lgapi.pool import ConnectionPool
 
 LOCATIONS_CFG = settings.locations
 
 DEFAULT_TIMEOUT = 60
 COMMAND_TIMEOUTS = {"traceroute": 600}
 
+connection_pool = ConnectionPool(settings.devices.pool)
+
 
 def get_command_timeout(command: str) -> int:
     """Get timeout for a specific command."""
@@ -50,5 +55,69 @@ async def execute_on_device(
     """Execute the command(s) on the network device."""
     device = get_default_args(hostname, device_type, auth_group)
 
-    async with AsyncScrapli(**device) as net_connect:
+    async with connection_pool.connection(device, auth_group) as net_connect:
         return await net_connect.send_command(command=cli_command, timeout_ops=timeout)
+
+
+async def execute_many_on_device(
+    hostname: str,
+    device_type: str,
+    auth_group: str | None,
+    cli_commands: list[str],
+    timeout: int = DEFAULT_TIMEOUT,
+) -> list[Response | Exception]:
+    """Execute several commands on the network device in a single session.
+
+    Commands are sent one at a time, so the responses of the commands that completed are
+    kept if a later one fails. The failed command, and those after it on the now untrusted
+    session, get the error instead of a response.
+    """
+    device = get_default_args(hostname, device_type, auth_group)
+    responses: list[Response | Exception] = []
+
+    try:
+        async with connection_pool.connection(device, auth_group) as net_connect:
+            for cli_command in cli_commands:
+                responses.append(await net_connect.send_command(command=cli_command, timeout_ops=timeout))
+    except Exception as err:
+        responses.extend([err] * (len(cli_commands) - len(responses)))
+
+    return responses
+
+
+async def stream_on_device(
+    hostname: str,
+    device_type: str,
+    auth_group: str | None,
+    cli_command: str,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> AsyncIterator[str]:
+    """Execute the command on the network device, yielding lines of output as they arrive."""
+    device = get_default_args(hostname, device_type, auth_group)
+
+    async with connection_pool.connection(device, auth_group) as net_connect:
+        await net_connect.acquire_priv(net_connect.default_desired_privilege_level)
+
+        prompt_pattern = re.compile(net_connect.comms_prompt_pattern.encode(), flags=re.M | re.I)
+        channel = net_connect.channel
+        channel.write(cli_command)
+        channel.send_return()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        echo_seen = False
+        buf = b""
+
+        while True:
+            buf += await asyncio.wait_for(channel.read(), timeout=max(0, deadline - loop.time()))
+            *lines, buf = buf.split(b"\n")
+
+            for line in lines:
+                # First line is the device echoing the command back.
+                if not echo_seen:
+                    echo_seen = True
+                    continue
+                yield line.decode(errors="replace").rstrip()
+
+            if echo_seen and prompt_pattern.search(buf):
+                return
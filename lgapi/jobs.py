@@ -0,0 +1,149 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Background jobs for long running commands.
+
+Jobs run in the worker that accepted them, their state is kept in the default
+cache so that any worker sharing the Redis backend can answer a poll.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+
+from aiocache import caches
+from httpx import AsyncClient
+
+from lgapi import logger
+from lgapi.admission import DeviceBusyError
+from lgapi.cache import job_key
+from lgapi.commands import execute_multiple_commands, execute_single_command
+from lgapi.parsing import parse_command_output, parse_multi_command_results
+from lgapi.types.models import MultiBgpBody, MultiPingBody
+
+JOB_TTL = 3600
+
+running_jobs: set[asyncio.Task] = set()
+
+
+async def get_job(job_id: str) -> dict | None:
+    """Get the current state of a job, None if it is not found or the cache can not be read."""
+    cache = caches.get("default")
+    try:
+        job = await cache.get(job_key(job_id))
+    except Exception as err:
+        logger.warning("Error reading job %s: %s", job_id, err)
+        return None
+    return json.loads(job) if job else None
+
+
+async def save_job(job: dict) -> None:
+    """Store the state of a job, logging rather than raising cache errors."""
+    job["updated"] = time.time()
+    cache = caches.get("default")
+    try:
+        # Stored as JSON so jobs work with whichever serializer the cache is using.
+        await cache.set(job_key(job["id"]), json.dumps(job), ttl=JOB_TTL)
+    except Exception as err:
+        logger.warning("Error saving job %s: %s", job["id"], err)
+
+
+async def run_job(job: dict, runner: Callable[[], Awaitable[dict]]) -> None:
+    """Run the job and record its result or error."""
+    job["status"] = "running"
+    await save_job(job)
+
+    try:
+        job["result"] = await runner()
+        job["status"] = "complete"
+    except asyncio.CancelledError:
+        job["status"] = "failed"
+        job["error"] = "Job cancelled, the API is shutting down"
+        await save_job(job)
+        raise
+    except DeviceBusyError as err:
+        logger.warning("Job %s not run: %s", job["id"], err)
+        job["status"] = "failed"
+        job["error"] = "Network device is busy, try again later"
+    except Exception as err:
+        logger.warning("Job %s failed: %s", job["id"], err)
+        job["status"] = "failed"
+        job["error"] = f"Error executing command '{job['command']}'"
+
+    await save_job(job)
+
+
+async def submit_job(command: str, runner: Callable[[], Awaitable[dict]]) -> dict:
+    """Create a job and start running it in the background."""
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "command": command,
+        "status": "pending",
+        "created": now,
+        "updated": now,
+        "error": None,
+        "result": None,
+    }
+    await save_job(job)
+
+    task = asyncio.create_task(run_job(job, runner))
+    running_jobs.add(task)
+    task.add_done_callback(running_jobs.discard)
+
+    return job
+
+
+async def submit_command_job(
+    command: str,
+    location: str,
+    destination: str,
+    raw: bool = False,
+    httpclient: AsyncClient | None = None,
+) -> dict:
+    """Submit a job running a command at a single location."""
+
+    async def runner() -> dict:
+        result = await execute_single_command(location, command, destination)
+        return await parse_command_output(
+            location=location,
+            result=result,
+            command=command,
+            raw=raw,
+            httpclient=httpclient,
+        )
+
+    return await submit_job(command, runner)
+
+
+async def submit_multi_command_job(
+    command: str,
+    targets: MultiPingBody | MultiBgpBody,
+    raw: bool = False,
+    httpclient: AsyncClient | None = None,
+) -> dict:
+    """Submit a job running a command at multiple locations to multiple destinations."""
+
+    async def runner() -> dict:
+        results = await execute_multiple_commands(targets, command)
+        return await parse_multi_command_results(
+            results=results,
+            command=command,
+            raw=raw,
+            httpclient=httpclient,
+        )
+
+    return await submit_job(f"multi_{command}", runner)
+
+
+async def cancel_jobs() -> None:
+    """Cancel all jobs still running in this worker."""
+    for task in list(running_jobs):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
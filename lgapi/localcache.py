@@ -0,0 +1,51 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Bounded in-process LRU cache, used in front of Redis for hot lookups."""
+import time
+from collections import OrderedDict
+from typing import Any
+
+MISSING = object()
+
+
+class LocalCache:
+    """Least recently used cache with a maximum size and per entry expiry."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """Get a value, MISSING if it is not cached or has expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return MISSING
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value, evicting the least recently used entries when full."""
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -5,25 +5,53 @@
 # have been included as part of this distribution.
 #
 # import pprint
+import asyncio
+import signal
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
-from typing import Annotated, TypedDict, cast
+from contextlib import asynccontextmanager, suppress
+from ipaddress import IPv4Network, IPv6Network
+from typing import Annotated, Literal, TypedDict, cast
 
-from aiocache import caches
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from httpx import AsyncClient, Limits
 from pydantic import AfterValidator, IPvAnyAddress
 from scrapli.exceptions import ScrapliException
 
-from lgapi import logger
+from lgapi import admin, logger
+from lgapi.admission import DeviceBusyError
+from lgapi.asninfo import close_store, open_store
+from lgapi.cache import collect_old_generations
 from lgapi.commands import execute_multiple_commands, execute_single_command
 from lgapi.config import settings
-from lgapi.database import init_community_map_db
+from lgapi.database import (
+    init_community_map_db,
+    load_community_map,
+    try_reload_community_map,
+    watch_community_files,
+)
+from lgapi.device import connection_pool
+from lgapi.jobs import (
+    cancel_jobs,
+    get_job,
+    submit_command_job,
+    submit_multi_command_job,
+)
 from lgapi.locations import get_locations, get_locations_by_region
-from lgapi.parsing import parse_command_output, parse_multi_command_results
+from lgapi.parsing import (
+    load_templates,
+    parse_command_output,
+    parse_multi_command_results,
+    parse_pool,
+)
+from lgapi.pfx2as import try_load_pfx2as, watch_pfx2as_file
+from lgapi.singleflight import CoalescedCallError
+from lgapi.streaming import StreamFormat, start_stream, stream_command, stream_response
 from lgapi.types.models import (
     BgpResult,
+    JobBody,
+    JobResult,
     LocationRegionResponse,
     LocationResponse,
     MultiBgpBody,
@@ -43,6 +71,18 @@ if settings.environment == "devel":
     logger.setLevel(str(settings.log_level).upper())
 
 
+# Community map reloads started by SIGHUP, kept so they are not garbage collected.
+reload_tasks: set[asyncio.Task] = set()
+
+
+def handle_sighup() -> None:
+    """Reload the community map files in the background."""
+    logger.info("SIGHUP received, reloading BGP community map")
+    task = asyncio.create_task(try_reload_community_map())
+    reload_tasks.add(task)
+    task.add_done_callback(reload_tasks.discard)
+
+
 class State(TypedDict):
     """Stores the state variables from the lifespan"""
 
@@ -56,19 +96,57 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     # Populate the community mapping database
     logger.debug("Building BGP community database")
     await init_community_map_db()
+    await load_community_map()
+
+    # Compile the TTP templates once for this worker, and start the pool for large outputs
+    load_templates()
+    parse_pool.start()
+
+    # Pick up changes to the community map files without a restart
+    tasks = []
+    if settings.communities.reload_interval:
+        tasks.append(asyncio.create_task(watch_community_files(settings.communities.reload_interval)))
+
+    # Map traceroute hops to ASNs from the local prefix to AS file, reloaded when it changes
+    pfx2as_cfg = settings.pfx2as
+    if pfx2as_cfg.file:
+        await try_load_pfx2as(pfx2as_cfg.file)
+        if pfx2as_cfg.reload_interval:
+            tasks.append(asyncio.create_task(watch_pfx2as_file(pfx2as_cfg.file, pfx2as_cfg.reload_interval)))
+
+    # Open the ASN information store once, it is reopened when refreshed
+    if settings.asninfo.database:
+        await open_store(settings.asninfo.database)
+
+    with suppress(NotImplementedError, RuntimeError, ValueError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, handle_sighup)
 
     # Set up the http client
     logger.debug("Starting HTTPX Async client")
     httpclient = AsyncClient(limits=Limits(max_connections=None, max_keepalive_connections=20))
 
-    logger.debug("Clearing cache")
-    cache = caches.get("default")
-    await cache.clear()
+    # Start closing idle device sessions
+    connection_pool.start()
+
+    # Remove keys left by old cache generations in the background
+    tasks.append(asyncio.create_task(collect_old_generations()))
 
     yield {"httpclient": httpclient}
+    for task in tasks:
+        task.cancel()
+    with suppress(NotImplementedError, RuntimeError, ValueError):
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    await cancel_jobs()
     await httpclient.aclose()
     logger.debug("Stopped HTTPX Async client")
 
+    await connection_pool.close()
+    logger.debug("Closed device connection pool")
+
+    await close_store()
+
+    parse_pool.close()
+
 
 app = FastAPI(
     title=settings.title,
@@ -84,6 +162,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(admin.router)
+
+
+@app.exception_handler(DeviceBusyError)
+async def device_busy_handler(request: Request, exc: DeviceBusyError) -> JSONResponse:
+    """Reject commands that were not admitted to run on a busy device."""
+    logger.warning("Rejected request for %s: %s", request.url.path, exc)
+    return JSONResponse(
+        status_code=429 if exc.queue_full else 503,
+        content={"detail": f"Network device at location '{LOCATIONS_CFG[exc.location].name}' is busy, try again later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
 @app.get("/locations", response_model=list[LocationResponse])
 async def locations() -> list:
@@ -112,7 +203,7 @@ async def ping(
     loc_config = LOCATIONS_CFG[location]
     try:
         result = await execute_single_command(location, "ping", str(destination))
-    except (ScrapliException, OSError) as err:
+    except (ScrapliException, OSError, CoalescedCallError) as err:
         logger.warning(
             "Error getting device output from '%s' (%s) for command ping: %s", loc_config.device, location, err
         )
@@ -130,6 +221,24 @@ async def ping(
     )
 
 
+@app.get("/ping/{location}/{destination}/stream")
+async def ping_stream(
+    location: Annotated[str, AfterValidator(validate_location)],
+    destination: IPvAnyAddress,
+    raw: bool = False,
+    output_format: Annotated[StreamFormat, Query(alias="format")] = "ndjson",
+) -> StreamingResponse:
+    """Ping a destination from a location, streaming the output as it arrives.
+
+    - **location**: Source location code to ping from
+    - **destination**: Destination IP address to ping
+    - **raw**: Return only raw output without any parsing.
+    - **format**: Stream as newline delimited JSON (`ndjson`) or server sent events (`sse`).
+    """
+    events = await start_stream(stream_command(location, "ping", str(destination), raw=raw))
+    return stream_response(events, output_format)
+
+
 @app.get("/traceroute/{location}/{destination}", response_model=TracerouteResult)
 async def traceroute(
     request: Request,
@@ -146,7 +255,7 @@ async def traceroute(
     loc_config = LOCATIONS_CFG[location]
     try:
         result = await execute_single_command(location, "traceroute", str(destination))
-    except (ScrapliException, OSError) as err:
+    except (ScrapliException, OSError, CoalescedCallError) as err:
         logger.warning(
             "Error getting device output from '%s' (%s) for command traceroute: %s", loc_config.device, location, err
         )
@@ -166,6 +275,28 @@ async def traceroute(
     )
 
 
+@app.get("/traceroute/{location}/{destination}/stream")
+async def traceroute_stream(
+    request: Request,
+    location: Annotated[str, AfterValidator(validate_location)],
+    destination: IPvAnyAddress,
+    raw: bool = False,
+    output_format: Annotated[StreamFormat, Query(alias="format")] = "ndjson",
+) -> StreamingResponse:
+    """Traceroute to a destination from a location, streaming each hop as soon as it is parsed.
+
+    - **location**: Source location code to traceroute from
+    - **destination**: Destination IP address to traceroute to
+    - **raw**: Return only raw output lines without any parsing.
+    - **format**: Stream as newline delimited JSON (`ndjson`) or server sent events (`sse`).
+    """
+    httpclient = cast(AsyncClient, request.state.httpclient) if not raw else None
+    events = await start_stream(
+        stream_command(location, "traceroute", str(destination), raw=raw, httpclient=httpclient)
+    )
+    return stream_response(events, output_format)
+
+
 @app.get("/bgp/{location}/{destination:path}", response_model=BgpResult)
 async def bgp(
     request: Request,
@@ -182,7 +313,7 @@ async def bgp(
     loc_config = LOCATIONS_CFG[location]
     try:
         result = await execute_single_command(location, "bgp", str(destination))
-    except (ScrapliException, OSError) as err:
+    except (ScrapliException, OSError, CoalescedCallError) as err:
         logger.warning(
             "Error getting device output from '%s' (%s) for command bgp: %s", loc_config.device, location, err
         )
@@ -226,3 +357,57 @@ async def multi_bgp(request: Request, targets: MultiBgpBody, raw: bool = False)
         raw=raw,
         httpclient=httpclient,
     )
+
+
+@app.post("/jobs/multi/{command}", response_model=JobResult, status_code=202)
+async def submit_multi_job(
+    request: Request,
+    command: Literal["ping", "bgp"],
+    targets: MultiPingBody | MultiBgpBody,
+    raw: bool = False,
+) -> dict:
+    """Submit a background job running a command from multiple sources to multiple destinations.
+
+    - **command**: Command to run, ping or bgp
+    - **raw**: Return only raw output without any parsing.
+
+    Poll `/jobs/{job_id}` for the result.
+    """
+    if command == "ping" and not isinstance(targets, MultiPingBody):
+        raise HTTPException(status_code=422, detail="Ping destinations must be IP addresses")
+
+    httpclient = cast(AsyncClient, request.state.httpclient) if not raw else None
+    return await submit_multi_command_job(command, targets, raw=raw, httpclient=httpclient)
+
+
+@app.post("/jobs/{command}", response_model=JobResult, status_code=202)
+async def submit_single_job(
+    request: Request,
+    command: Literal["ping", "traceroute", "bgp"],
+    target: JobBody,
+    raw: bool = False,
+) -> dict:
+    """Submit a background job running a command at a location.
+
+    - **command**: Command to run, ping, traceroute or bgp
+    - **raw**: Return only raw output without any parsing.
+
+    Poll `/jobs/{job_id}` for the result.
+    """
+    if command != "bgp" and isinstance(target.destination, (IPv4Network, IPv6Network)):
+        raise HTTPException(status_code=422, detail=f"The {command} destination must be an IP address")
+
+    httpclient = cast(AsyncClient, request.state.httpclient) if not raw else None
+    return await submit_command_job(command, target.location, str(target.destination), raw=raw, httpclient=httpclient)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResult)
+async def job_status(job_id: str) -> dict:
+    """Get the status of a background job, and its result once complete.
+
+    - **job_id**: Job ID returned when the job was submitted
+    """
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
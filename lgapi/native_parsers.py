@@ -0,0 +1,382 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Hand written parsers for the shipped TTP templates.
+
+Each parser gives exactly the same result as its TTP template, including the
+template quirks the output processing relies on, but walks the output once line
+by line and only tries the regexes a line could match. The regexes are the ones
+TTP compiles from the templates, matched against the output laid out the way TTP
+lays it out, so captured values are identical.
+
+Values are added to the current record without replacing those already found,
+a record without its key takes the key of the one before it, and a key seen
+twice becomes a list of records, as TTP does.
+"""
+import re
+from collections.abc import Callable, Iterator
+
+IPV4 = r"(?:[0-9]{1,3}\.){3}[0-9]{1,3}"
+IPV6 = r"(?:[a-fA-F0-9]{1,4}:|:){1,7}(?:[a-fA-F0-9]{1,4}|:?)"
+IP = rf"(?:{IPV4})|(?:{IPV6})"
+PREFIX = rf"(?:{IPV4}/[0-9]{{1,2}})|(?:{IPV6}/[0-9]{{1,3}})"
+EOL = r"[\t ]*(?=\n|\r\n)"
+ORPHRASE = r"(?:\S+|(\S+ {1})+?\S+)"
+
+IOSXR_BGP_PREFIX = re.compile(rf"\nBGP[ \t]+routing[ \t]+table[ \t]+entry[ \t]+for[ \t]+(?P<prefix>{PREFIX}){EOL}")
+IOSXR_BGP_PATH = re.compile(rf"\n  Path[ \t]+\#\S+:(?:.+){EOL}")
+IOSXR_BGP_AS_PATH = re.compile(rf"\n  (?P<as_path>(?:Local)|(?:\d+(?:\s\d+)*))(?:(,.+)?){EOL}")
+IOSXR_BGP_NEXT_HOP = re.compile(rf"\n    (?P<next_hop>{IP})[ \t]+\((?:.+){EOL}")
+IOSXR_BGP_ORIGIN = (
+    r"\n      Origin[ \t]+\S+,[ \t]+metric[ \t]+(?P<metric>(?:\d+)),[ \t]+localpref[ \t]+(?P<local_pref>(?:\d+))"
+)
+IOSXR_BGP_BEST = re.compile(rf"{IOSXR_BGP_ORIGIN}(?P<best_path>(?:([,\w\s\-]+)?, best(,.+)?)){EOL}")
+IOSXR_BGP_NOT_BEST = re.compile(rf"{IOSXR_BGP_ORIGIN}(?:(,.+)?){EOL}")
+IOSXR_BGP_COMMUNITY = re.compile(rf"\n      Community:[ \t]+(?P<communities>{ORPHRASE}){EOL}")
+
+IOSXR_PING_START = re.compile(rf"\nType[ \t]+escape[ \t]+sequence[ \t]+to[ \t]+abort\.{EOL}")
+IOSXR_PING_SENDING = re.compile(
+    rf"\nSending[ \t]+(?P<packet_count>(?:\d+)),[ \t]+(?P<packet_size>(?:\d+))\-byte[ \t]+ICMP[ \t]+Echos[ \t]+to[ \t]+"
+    rf"(?P<destination>{IP}),[ \t]+timeout[ \t]+is[ \t]+\S+[ \t]+seconds:{EOL}"
+)
+IOSXR_PING_SUCCESS = r"\nSuccess[ \t]+rate[ \t]+is[ \t]+(?P<packet_loss>(?:\S+))[ \t]+percent[ \t]+\(\S+/\S+\)"
+IOSXR_PING_RTT = re.compile(
+    rf"{IOSXR_PING_SUCCESS},[ \t]+round\-trip[ \t]+min/avg/max[ \t]+=[ \t]+"
+    rf"(?P<rtt_min>(?:\S+))/(?P<rtt_avg>(?:\S+))/(?P<rtt_max>(?:\S+))[ \t]+ms{EOL}"
+)
+IOSXR_PING_NO_RTT = re.compile(rf"{IOSXR_PING_SUCCESS}{EOL}")
+
+IOSXR_TRACEROUTE_START = re.compile(rf"\nTracing[ \t]+the[ \t]+route[ \t]+to[ \t]+(?P<destination>{IP}){EOL}")
+IOSXR_TRACEROUTE_HOPS = (
+    re.compile(rf"\n (?P<hop_number>(?:\d+))[ \t]+(?P<ip_address>{IP})[ \t]+(?P<rtt>(?:.+)){EOL}"),
+    re.compile(
+        rf"\n (?P<hop_number>(?:\d+))[ \t]+(?P<fqdn>(?:\S+))[ \t]+\((?P<ip_address>{IP})\)[ \t]+(?P<rtt>(?:.+)){EOL}"
+    ),
+    re.compile(rf"\n (?P<hop_number>(?:\d+))[ \t]+(?P<rtt>(?:.+)){EOL}"),
+)
+IOSXR_TRACEROUTE_PROBE = re.compile(rf"\n    (?P<ip_address>{IP})[ \t]+(?P<rtt>(?:.+)){EOL}")
+
+JUNOS_BGP_PREFIX = re.compile(rf"\n(?P<prefix>{PREFIX})(?:.+){EOL}")
+JUNOS_BGP_PATH = re.compile(rf"\n(?:\s+)(?P<best_path>(?:\*?BGP))[ \t]+Preference:[ \t]+\S+{EOL}")
+JUNOS_BGP_NEXT_HOP = re.compile(rf"\n                Next[ \t]+hop:[ \t]+(?P<next_hop>{IP})(?:(.+)?){EOL}")
+JUNOS_BGP_AS_PATH = re.compile(
+    rf"\n                AS[ \t]+path:[ \t]+(?P<as_path>(?:I)|(?:\?)|(?:\d+(\s[\d\sI\?]+)))(?:(.+)?){EOL}"
+)
+JUNOS_BGP_LOCAL_PREF = re.compile(rf"\n                Localpref:[ \t]+(?P<local_pref>(?:\d+)){EOL}")
+JUNOS_BGP_METRIC = re.compile(
+    rf"\n                Age:[ \t]+(?:(.+)?)[ \t]+Metric:[ \t]+(?P<metric>(?:\d+))(?:.+){EOL}"
+)
+JUNOS_BGP_COMMUNITIES = re.compile(rf"\n                Communities:[ \t]+(?P<communities>{ORPHRASE}){EOL}")
+
+JUNOS_PING_START = re.compile(
+    rf"\nPING[ \t]+\S+[ \t]+\((?P<destination>{IP})\):[ \t]+(?P<packet_size>(?:\S+))[ \t]+data[ \t]+bytes{EOL}"
+)
+JUNOS_PING6_START = re.compile(
+    rf"\nPING\d+\((?P<packet_size>(?:\S+))=\S+[ \t]+bytes\)[ \t]+\S+[ \t]+\-\->[ \t]+(?P<destination>(?:{IPV6})){EOL}"
+)
+JUNOS_PING_STATISTICS = re.compile(
+    r"\n(?P<packet_count>(?:\d+))[ \t]+packets[ \t]+transmitted,[ \t]+\S+[ \t]+packets[ \t]+received,[ \t]+"
+    rf"(?P<packet_loss>(?:\S+))%[ \t]+packet[ \t]+loss{EOL}"
+)
+JUNOS_PING_RTT = re.compile(
+    r"\nround\-trip[ \t]+min/avg/max/std\-?dev[ \t]+=[ \t]+"
+    rf"(?P<rtt_min>(?:\S+))/(?P<rtt_avg>(?:\S+))/(?P<rtt_max>(?:\S+))/\S+[ \t]+ms{EOL}"
+)
+
+JUNOS_TRACEROUTE_START = re.compile(rf"\ntraceroute(?:6?)[ \t]+to[ \t]+(?P<destination>{IP})(?:(.+)?){EOL}")
+JUNOS_TRACEROUTE_HOP = re.compile(rf"\n (?P<hop_number>(?:\d+))[ \t]+(?P<probes>(?:.+)){EOL}")
+
+JUNOS_BGP_FIELDS = ("Next", "AS", "Localpref", "Age", "Communities")
+
+
+def output_lines(raw_output: str) -> tuple[str, Iterator[tuple[int, str]]]:
+    """Lay out the output as TTP does and get the position of the newline before each line."""
+    text = "\n" + raw_output + "\n"
+
+    def lines() -> Iterator[tuple[int, str]]:
+        pos = 0
+        for line in raw_output.split("\n"):
+            yield pos, line
+            pos += len(line) + 1
+
+    return text, lines()
+
+
+def add(record: dict, values: dict) -> None:
+    """Add values to a record, keeping values already found."""
+    for name, value in values.items():
+        record.setdefault(name, value)
+
+
+def save(results: dict, key: str, record: dict) -> None:
+    """Save a record under its key, a second record with the same key turns it into a list."""
+    existing = results.get(key)
+    if existing is None:
+        results[key] = record
+    elif isinstance(existing, list):
+        if record:
+            existing.append(record)
+    elif existing:
+        results[key] = [existing, record]
+    else:
+        existing.update(record)
+
+
+def save_child(results: dict, key: str, name: str, record: dict) -> None:
+    """Append a record to a list in the last record saved under the key."""
+    parent = results[key]
+    if isinstance(parent, list):
+        parent = parent[-1]
+    children = parent.setdefault(name, [])
+    if record:
+        children.append(record)
+
+
+class Records:
+    """Records of a template with one keyed group, optionally with a list of child records."""
+
+    def __init__(self, key_name: str, child_name: str | None = None):
+        self.key_name = key_name
+        self.child_name = child_name
+        self.results: dict = {}
+        self.record: dict | None = None
+        self.is_child = False
+        self.key: str | None = None
+
+    def save(self) -> None:
+        """Save the current record, a record without its key uses the last key seen."""
+        if self.record is None:
+            return
+        if self.is_child:
+            if self.key is not None:
+                save_child(self.results, self.key, self.child_name, self.record)
+            return
+
+        key = self.record.pop(self.key_name, self.key)
+        if key is None:
+            return
+        self.key = key
+        save(self.results, key, self.record)
+
+    def start(self, values: dict) -> None:
+        """Save the current record and start a new one."""
+        self.save()
+        self.record = values
+        self.is_child = False
+
+    def start_child(self, values: dict) -> None:
+        """Save the current record and start a new child record."""
+        self.save()
+        self.record = values
+        self.is_child = True
+
+    def in_child(self) -> bool:
+        """Check if values found now belong to a child record."""
+        return self.record is not None and self.is_child
+
+    def finish(self) -> list[dict]:
+        """Save the last record and get the results as TTP would return them."""
+        self.save()
+        return [self.results]
+
+
+def parse_iosxr_bgp(raw_output: str) -> list[dict]:
+    """Parse IOS-XR show bgp output."""
+    text, lines = output_lines(raw_output)
+    records = Records("prefix", "paths")
+
+    for pos, line in lines:
+        if line.startswith("BGP routing"):
+            match = IOSXR_BGP_PREFIX.match(text, pos)
+            if match:
+                records.start(match.groupdict())
+        elif line.startswith("  Path"):
+            if records.record is not None and IOSXR_BGP_PATH.match(text, pos):
+                records.start_child({})
+        elif not records.in_child():
+            continue
+        elif line.startswith("      Origin"):
+            match = IOSXR_BGP_BEST.match(text, pos)
+            if match:
+                add(records.record, {"metric": match["metric"], "local_pref": match["local_pref"], "best_path": True})
+                continue
+            match = IOSXR_BGP_NOT_BEST.match(text, pos)
+            if match:
+                add(records.record, {"metric": match["metric"], "local_pref": match["local_pref"], "best_path": False})
+        elif line.startswith("      Community:"):
+            match = IOSXR_BGP_COMMUNITY.match(text, pos)
+            if match:
+                add(records.record, {"communities": match["communities"].split(" ")})
+        elif line.startswith("    "):
+            match = IOSXR_BGP_NEXT_HOP.match(text, pos)
+            if match:
+                add(records.record, {"next_hop": match["next_hop"]})
+        elif line.startswith("  "):
+            match = IOSXR_BGP_AS_PATH.match(text, pos)
+            if match:
+                add(records.record, {"as_path": match["as_path"]})
+
+    return records.finish()
+
+
+def reverse_packet_loss(success_rate: str) -> int:
+    """Get the packet loss from the IOS-XR success rate."""
+    return 100 - int(success_rate)
+
+
+def parse_iosxr_ping(raw_output: str) -> list[dict]:
+    """Parse IOS-XR ping output."""
+    text, lines = output_lines(raw_output)
+    records = Records("destination")
+
+    for pos, line in lines:
+        if line.startswith("Type escape"):
+            if IOSXR_PING_START.match(text, pos):
+                records.start({})
+        elif records.record is None:
+            continue
+        elif line.startswith("Sending"):
+            match = IOSXR_PING_SENDING.match(text, pos)
+            if match:
+                add(records.record, match.groupdict())
+        elif line.startswith("Success rate"):
+            match = IOSXR_PING_RTT.match(text, pos)
+            if match:
+                add(
+                    records.record,
+                    {
+                        "packet_loss": reverse_packet_loss(match["packet_loss"]),
+                        "rtt_min": match["rtt_min"] + "ms",
+                        "rtt_avg": match["rtt_avg"] + "ms",
+                        "rtt_max": match["rtt_max"] + "ms",
+                    },
+                )
+                continue
+            match = IOSXR_PING_NO_RTT.match(text, pos)
+            if match:
+                add(records.record, {"packet_loss": reverse_packet_loss(match["packet_loss"])})
+
+    return records.finish()
+
+
+def parse_iosxr_traceroute(raw_output: str) -> list[dict]:
+    """Parse IOS-XR traceroute output."""
+    text, lines = output_lines(raw_output)
+    records = Records("destination", "hops")
+
+    for pos, line in lines:
+        if line.startswith("Tracing"):
+            match = IOSXR_TRACEROUTE_START.match(text, pos)
+            if match:
+                records.start(match.groupdict())
+        elif records.record is None or not line.startswith(" "):
+            continue
+        elif line[1:2].isdigit():
+            for regex in IOSXR_TRACEROUTE_HOPS:
+                match = regex.match(text, pos)
+                if match:
+                    records.start_child(match.groupdict())
+                    break
+        elif line.startswith("    "):
+            match = IOSXR_TRACEROUTE_PROBE.match(text, pos)
+            if match:
+                records.start_child(match.groupdict())
+
+    return records.finish()
+
+
+def parse_junos_bgp(raw_output: str) -> list[dict]:
+    """Parse JunOS show route protocol bgp output."""
+    text, lines = output_lines(raw_output)
+    records = Records("prefix", "paths")
+
+    for pos, line in lines:
+        if not line:
+            continue
+        if not line[0].isspace():
+            match = JUNOS_BGP_PREFIX.match(text, pos)
+            if match:
+                records.start({"prefix": match["prefix"]})
+            continue
+        if records.record is None:
+            continue
+
+        field = line.lstrip()
+        if field.startswith(("BGP", "*BGP")):
+            match = JUNOS_BGP_PATH.match(text, pos)
+            if match:
+                records.start_child({"best_path": match["best_path"] == "*BGP"})
+        elif records.in_child() and field.startswith(JUNOS_BGP_FIELDS):
+            if field.startswith("Next"):
+                match = JUNOS_BGP_NEXT_HOP.match(text, pos)
+            elif field.startswith("AS"):
+                match = JUNOS_BGP_AS_PATH.match(text, pos)
+            elif field.startswith("Localpref"):
+                match = JUNOS_BGP_LOCAL_PREF.match(text, pos)
+            elif field.startswith("Age"):
+                match = JUNOS_BGP_METRIC.match(text, pos)
+            else:
+                match = JUNOS_BGP_COMMUNITIES.match(text, pos)
+                if match:
+                    add(records.record, {"communities": match["communities"].split(" ")})
+                continue
+            if match:
+                add(records.record, match.groupdict())
+
+    return records.finish()
+
+
+def parse_junos_ping(raw_output: str) -> list[dict]:
+    """Parse JunOS ping output."""
+    text, lines = output_lines(raw_output)
+    records = Records("destination")
+
+    for pos, line in lines:
+        if line.startswith("PING"):
+            match = JUNOS_PING_START.match(text, pos) or JUNOS_PING6_START.match(text, pos)
+            if match:
+                records.start(match.groupdict())
+        elif records.record is None:
+            continue
+        elif line[:1].isdigit():
+            match = JUNOS_PING_STATISTICS.match(text, pos)
+            if match:
+                add(records.record, match.groupdict())
+        elif line.startswith("round-trip"):
+            match = JUNOS_PING_RTT.match(text, pos)
+            if match:
+                add(records.record, {name: value + "ms" for name, value in match.groupdict().items()})
+
+    return records.finish()
+
+
+def parse_junos_traceroute(raw_output: str) -> list[dict]:
+    """Parse JunOS traceroute output."""
+    text, lines = output_lines(raw_output)
+    records = Records("destination", "hops")
+
+    for pos, line in lines:
+        if line.startswith("traceroute"):
+            match = JUNOS_TRACEROUTE_START.match(text, pos)
+            if match:
+                records.start({"destination": match["destination"]})
+        elif records.record is not None and line[:1] == " " and line[1:2].isdigit():
+            match = JUNOS_TRACEROUTE_HOP.match(text, pos)
+            if match:
+                records.start_child(match.groupdict())
+
+    return records.finish()
+
+
+# Native parsers by device type and command.
+NATIVE_PARSERS: dict[tuple[str, str], Callable[[str], list[dict]]] = {
+    ("cisco_iosxr", "bgp"): parse_iosxr_bgp,
+    ("cisco_iosxr", "ping"): parse_iosxr_ping,
+    ("cisco_iosxr", "traceroute"): parse_iosxr_traceroute,
+    ("juniper_junos", "bgp"): parse_junos_bgp,
+    ("juniper_junos", "ping"): parse_junos_ping,
+    ("juniper_junos", "traceroute"): parse_junos_traceroute,
+}
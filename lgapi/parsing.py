@@ -6,35 +6,302 @@
 #
 """TTP Template helper functions and parsing."""
 
+import asyncio
+import hashlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 from httpx import AsyncClient
 from ttp import ttp
 
+from lgapi import logger
 from lgapi.config import settings
+from lgapi.localcache import MISSING, LocalCache
+from lgapi.native_parsers import NATIVE_PARSERS
 from lgapi.processing.bgp import process_bgp_output
+from lgapi.processing.budget import EnrichmentBudget
 from lgapi.processing.ping import process_ping_output
 from lgapi.processing.traceroute import process_traceroute_output
+from lgapi.structured_parsers import STRUCTURED_PARSERS
+from lgapi.types.config import ParsingConfig
 from lgapi.types.returntypes import LocationResult
 
 LOCATIONS_CFG = settings.locations
+COMMANDS_CFG = settings.commands
 
+TEMPLATE_DIR = Path("lgapi/ttp_templates")
 
-def parse_txt(raw_output: str, template: str) -> list[dict[str, dict]]:
-    """Parse raw device output with ttp template."""
+# Compiled TTP parsers by device type and command, loaded once per worker.
+template_parsers: dict[tuple[str, str], ttp] = {}
+
+# Compiled TTP parsers for each parse pool thread or process, compiled parsers are not thread safe.
+pool_templates = threading.local()
+
+
+def compile_templates() -> dict[tuple[str, str], ttp]:
+    """Load and compile all TTP templates."""
+    parsers = {}
+    for template_path in sorted(TEMPLATE_DIR.glob("*.ttp")):
+        device_type, command = template_path.stem.rsplit("_", 1)
+        parsers[(device_type, command)] = ttp(template=template_path.read_text())
+    return parsers
+
+
+def load_templates() -> None:
+    """Load and compile all TTP templates for this worker."""
+    template_parsers.update(compile_templates())
+
+
+def parse_txt(raw_output: str, template: ttp) -> list[dict[str, dict]]:
+    """Parse raw device output with a compiled ttp template."""
     try:
-        ttp_parser = ttp(data=raw_output, template=template)
+        # Only the input and results of the last parse are cleared, the compiled template is reused.
+        template.clear_result()
+        template.clear_input()
+        template.add_input(raw_output)
 
-        ttp_parser.parse()
-        return ttp_parser.result(structure="flat_list")
+        template.parse()
+        return template.result(structure="flat_list")
     except Exception:
         return []
 
 
-def get_template(command: str, device_type: str) -> str | None:
-    """Get TTP Template file name."""
-    template_path = Path("lgapi/ttp_templates") / f"{device_type}_{command}.ttp"
-    return str(template_path) if template_path.is_file() else None
+def parse_structured(raw_output: str, command: str, device_type: str, output_format: str) -> list:
+    """Decode structured device output."""
+    decoder = STRUCTURED_PARSERS.get((device_type, command, output_format))
+    if decoder is None:
+        return []
+
+    try:
+        return decoder(raw_output)
+    except Exception:
+        logger.debug("Failed to decode %s %s %s output", device_type, command, output_format, exc_info=True)
+        return []
+
+
+def parse_output(
+    raw_output: str,
+    command: str,
+    device_type: str,
+    template: ttp | None,
+    native: bool = True,
+    output_format: str = "text",
+) -> list:
+    """Parse device output with its native parser if there is one, otherwise with the TTP template."""
+    if output_format != "text":
+        return parse_structured(raw_output, command, device_type, output_format)
+
+    parser = NATIVE_PARSERS.get((device_type, command)) if native else None
+    if parser:
+        try:
+            return parser(raw_output)
+        except Exception:
+            logger.debug("Native %s %s parser failed, parsing with TTP", device_type, command, exc_info=True)
+
+    if template is None:
+        return []
+    return parse_txt(raw_output, template)
+
+
+def get_template(command: str, device_type: str) -> ttp | None:
+    """Get the compiled TTP template for the device type and command."""
+    if not template_parsers:
+        load_templates()
+    return template_parsers.get((device_type, command))
+
+
+def get_output_format(command: str, device_type: str) -> str:
+    """Get the output format the device type is asked for with the command."""
+    variants = getattr(COMMANDS_CFG, command, {}).get(device_type)
+    return variants.format if variants else "text"
+
+
+def has_parser(command: str, device_type: str, output_format: str) -> bool:
+    """Check if output of the command in the output format can be parsed for the device type."""
+    if output_format != "text":
+        return (device_type, command, output_format) in STRUCTURED_PARSERS
+    return get_template(command, device_type) is not None
+
+
+def init_pool_templates() -> None:
+    """Compile the TTP templates for a parse pool thread or process."""
+    if getattr(pool_templates, "parsers", None) is None:
+        pool_templates.parsers = compile_templates()
+
+
+def parse_in_pool(
+    raw_output: str, command: str, device_type: str, native: bool, output_format: str, submitted: float
+) -> tuple[list, float, float]:
+    """Parse device output in a parse pool thread or process, with its queue and parse times."""
+    started = time.monotonic()
+    init_pool_templates()
+
+    template = pool_templates.parsers.get((device_type, command))
+    result = parse_output(raw_output, command, device_type, template, native, output_format)
+    return result, started - submitted, time.monotonic() - started
+
+
+class ParsePool:
+    """Run large parses in a thread or process pool so they do not block the event loop."""
+
+    def __init__(self, config: ParsingConfig):
+        self.config = config
+        self.executor: Executor | None = None
+        # Parsed results by device type, command, output format and output digest, outputs served from
+        # the command cache are not parsed again. Callers must not modify the parsed results.
+        self.cache = LocalCache(config.cache_size)
+        self.cached = 0
+        self.inline = 0
+        self.offloaded = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.parse_time_total = 0.0
+        self.parse_time_max = 0.0
+
+    def start(self) -> None:
+        """Start the pool if offloading is enabled."""
+        if self.config.executor == "thread":
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.config.workers, thread_name_prefix="lgapi-parse", initializer=init_pool_templates
+            )
+        elif self.config.executor == "process":
+            # Spawn rather than fork, forking an event loop process with running threads is unsafe.
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.config.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_pool_templates,
+            )
+        else:
+            return
+
+        # Start the pool now, so the first large output does not wait for it to start.
+        for _ in range(self.config.workers):
+            self.executor.submit(init_pool_templates)
+
+    def close(self) -> None:
+        """Stop the pool, cancelling any queued parses."""
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def record(self, queue_time: float, parse_time: float) -> None:
+        """Record the queue and parse time of a parse."""
+        self.queue_time_total += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+        self.parse_time_total += parse_time
+        self.parse_time_max = max(self.parse_time_max, parse_time)
+
+    def parse_inline(
+        self, raw_output: str, command: str, device_type: str, output_format: str
+    ) -> list[dict[str, dict]]:
+        """Parse device output on the event loop."""
+        template = get_template(command, device_type)
+        return parse_output(raw_output, command, device_type, template, self.config.native, output_format)
+
+    async def parse(
+        self, raw_output: str, command: str, device_type: str, output_format: str = "text"
+    ) -> list[dict[str, dict]]:
+        """Parse device output, from the parsed result cache if the same output was parsed recently."""
+        if len(raw_output) > self.config.cache_max_output:
+            return await self.parse_uncached(raw_output, command, device_type, output_format)
+
+        digest = hashlib.blake2b(raw_output.encode(), digest_size=16).digest()
+        key = (device_type, command, output_format, digest)
+        result = self.cache.get(key)
+        if result is not MISSING:
+            self.cached += 1
+            return result
+
+        result = await self.parse_uncached(raw_output, command, device_type, output_format)
+        self.cache.set(key, result, self.config.cache_ttl)
+        return result
+
+    async def parse_uncached(
+        self, raw_output: str, command: str, device_type: str, output_format: str
+    ) -> list[dict[str, dict]]:
+        """Parse device output, inline if it is small, otherwise in the pool."""
+        if self.executor is None or len(raw_output) < self.config.offload_min_size:
+            self.inline += 1
+            started = time.monotonic()
+            result = self.parse_inline(raw_output, command, device_type, output_format)
+            self.record(0.0, time.monotonic() - started)
+            return result
+
+        loop = asyncio.get_running_loop()
+        try:
+            result, queue_time, parse_time = await loop.run_in_executor(
+                self.executor,
+                parse_in_pool,
+                raw_output,
+                command,
+                device_type,
+                self.config.native,
+                output_format,
+                time.monotonic(),
+            )
+        except BrokenProcessPool:
+            logger.warning("Parse pool is broken, restarting it and parsing inline")
+            self.close()
+            self.start()
+            self.inline += 1
+            return self.parse_inline(raw_output, command, device_type, output_format)
+
+        self.offloaded += 1
+        self.record(queue_time, parse_time)
+        logger.debug("Parsed %s output in %.3fs after %.3fs queued", command, parse_time, queue_time)
+        return result
+
+    def stats(self) -> dict:
+        """Parse counts, queue time and parse time statistics."""
+        parses = self.inline + self.offloaded
+        return {
+            "executor": self.config.executor,
+            "native": self.config.native,
+            "workers": self.config.workers,
+            "offload_min_size": self.config.offload_min_size,
+            "cached": self.cached,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "queue_time_avg": self.queue_time_total / self.offloaded if self.offloaded else 0.0,
+            "queue_time_max": self.queue_time_max,
+            "parse_time_avg": self.parse_time_total / parses if parses else 0.0,
+            "parse_time_max": self.parse_time_max,
+        }
+
+
+parse_pool = ParsePool(settings.parsing)
+
+
+async def process_command_output(
+    location: str,
+    raw_output: str,
+    command: str,
+    httpclient: AsyncClient | None,
+    budget: EnrichmentBudget,
+) -> list:
+    """Parse and process the output of a command, an empty list if it can not be parsed."""
+    device_type = LOCATIONS_CFG[location].type
+    output_format = get_output_format(command, device_type)
+    if not has_parser(command, device_type, output_format):
+        return []
+
+    parsed_result = await parse_pool.parse(raw_output, command, device_type, output_format)
+    if not isinstance(parsed_result, list) or not parsed_result or not parsed_result[0]:
+        return []
+
+    # Process based on command type
+    if command == "ping":
+        return await process_ping_output(parsed_result[0])
+    if command == "traceroute" and httpclient:
+        return await process_traceroute_output(parsed_result[0], device_type, httpclient, budget)
+    if command == "bgp" and httpclient:
+        return await process_bgp_output(parsed_result[0], httpclient, budget)
+
+    return []
 
 
 async def parse_command_output(
@@ -45,45 +312,59 @@ async def parse_command_output(
     httpclient: AsyncClient | None = None,
 ) -> dict:
     """Create standardized command result structure"""
-    location_info = LOCATIONS_CFG[location]
-
     base_result = {
         "parsed_output": [],
         "raw_output": result,
         "raw_only": raw,
         "command": command,
         "location": location,
-        "location_name": location_info.name,
+        "location_name": LOCATIONS_CFG[location].name,
+        "incomplete": [],
     }
 
     if raw:
         return base_result
 
-    template_name = get_template(command, location_info.type)
-    if not template_name:
-        base_result["raw_only"] = True
-        return base_result
-
-    parsed_result = parse_txt(result, template_name)
-    if not isinstance(parsed_result, list) or not parsed_result or not parsed_result[0]:
-        base_result["raw_only"] = True
-        return base_result
-
-    # Process based on command type
-    parsed_output = []
-    if command == "ping":
-        parsed_output = await process_ping_output(parsed_result[0])
-    elif command == "traceroute" and httpclient:
-        parsed_output = await process_traceroute_output(parsed_result[0], location_info.type, httpclient)
-    elif command == "bgp" and httpclient:
-        parsed_output = await process_bgp_output(parsed_result[0], httpclient)
-
+    budget = EnrichmentBudget.from_now(settings.enrichment.budget)
+    parsed_output = await process_command_output(location, result, command, httpclient, budget)
     base_result["parsed_output"] = parsed_output
     base_result["raw_only"] = not parsed_output
+    base_result["incomplete"] = sorted(budget.incomplete)
 
     return base_result
 
 
+async def parse_location_result(
+    result: LocationResult,
+    command: str,
+    raw: bool = False,
+    httpclient: AsyncClient | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """Parse each destination of a location on its own and combine them in destination order."""
+    location = result["location"]
+    outputs = result["outputs"]
+    budget = EnrichmentBudget(deadline)
+
+    parsed_output = []
+    if not raw:
+        parsed = await asyncio.gather(
+            *(process_command_output(location, output, command, httpclient, budget) for output in outputs.values())
+        )
+        for destination_output in parsed:
+            parsed_output.extend(destination_output)
+
+    return {
+        "parsed_output": parsed_output,
+        "raw_output": "\n".join(outputs.values()),
+        "raw_only": raw or not parsed_output,
+        "command": command,
+        "location": location,
+        "location_name": LOCATIONS_CFG[location].name,
+        "incomplete": sorted(budget.incomplete),
+    }
+
+
 async def parse_multi_command_results(
     results: list[LocationResult],
     command: str,
@@ -94,20 +375,16 @@ async def parse_multi_command_results(
     output_table = {"locations": [], "errors": [], "raw_only": raw}
 
     for result in results:
-        if "errors" in result and result["errors"]:
-            for err in result["errors"]:
-                output_table["errors"].append(f"{result['location']}: {err}")
-
-        if "result" in result and result["result"]:
-            parsed_result = await parse_command_output(
-                location=result["location"],
-                result=result["result"],
-                command=command,
-                raw=raw,
-                httpclient=httpclient,
-            )
+        for destination, err in result["errors"].items():
+            output_table["errors"].append(f"{result['location']}:{destination}: {err}")
 
-            location_name = LOCATIONS_CFG[result["location"]].name
-            output_table["locations"].append({"name": location_name, "results": parsed_result})
+    # One enrichment deadline for the whole request.
+    deadline = EnrichmentBudget.from_now(settings.enrichment.budget).deadline
+    with_output = [result for result in results if result["outputs"]]
+    parsed_results = await asyncio.gather(
+        *(parse_location_result(result, command, raw, httpclient, deadline) for result in with_output)
+    )
+    for parsed_result in parsed_results:
+        output_table["locations"].append({"name": parsed_result["location_name"], "results": parsed_result})
 
     return output_table
@@ -0,0 +1,221 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Map IP addresses to their origin ASN from a local prefix to AS file.
+
+The file has one prefix per line, either in the CAIDA Routeviews pfx2as layout
+or as a prefix in CIDR notation followed by the ASN, with an optional registry:
+
+    1.0.0.0     24  13335
+    1.0.4.0/22  38803  apnic
+
+Prefixes are flattened into sorted, non-overlapping address ranges, each taking
+the most specific prefix covering it, so the longest prefix match of an address
+is a binary search. Multi-origin ASNs (13335_4134 or {4134,4809}) keep the first.
+"""
+import asyncio
+import gzip
+import os
+import re
+import socket
+import time
+from array import array
+from bisect import bisect_right
+from typing import TextIO
+
+from lgapi import logger
+
+ASN_REGEX = re.compile(r"\d+")
+
+ADDRESS_FAMILIES = ((socket.AF_INET, 32), (socket.AF_INET6, 128))
+
+
+def flatten(prefixes: list[tuple[int, int, int]]) -> tuple[list[int], list[int], list[int]]:
+    """Flatten nested (start, end, entry) prefixes into ranges of the most specific entry.
+
+    Prefixes either nest or do not overlap, so a sweep in address order with a stack
+    of the enclosing prefixes emits each range once. A repeated prefix takes the entry
+    read last.
+    """
+    starts, ends, values = [], [], []
+    stack: list[tuple[int, int, int]] = []
+    pos = 0
+
+    def emit(start: int, end: int, value: int) -> None:
+        if start <= end:
+            starts.append(start)
+            ends.append(end)
+            values.append(value)
+
+    for start, end, entry in sorted(prefixes, key=lambda prefix: (prefix[0], -prefix[1])):
+        while stack and stack[-1][1] < start:
+            _, enclosing_end, enclosing_entry = stack.pop()
+            emit(pos, enclosing_end, enclosing_entry)
+            pos = enclosing_end + 1
+        if stack:
+            emit(pos, start - 1, stack[-1][2])
+        stack.append((start, end, entry))
+        pos = start
+
+    while stack:
+        _, enclosing_end, enclosing_entry = stack.pop()
+        emit(pos, enclosing_end, enclosing_entry)
+        pos = enclosing_end + 1
+
+    return starts, ends, values
+
+
+class PrefixIndex:
+    """Read only longest prefix match of IPv4 and IPv6 addresses to origin ASNs."""
+
+    def __init__(self, lines: TextIO | list[str] | None = None):
+        """Index the lines of a prefix to AS file, lines that can not be read are skipped."""
+        self.prefixes: list[str] = []
+        self.asns = array("L")
+        self.registries: list[str | None] = []
+        self.skipped = 0
+
+        family_prefixes: dict[int, list[tuple[int, int, int]]] = {family: [] for family, _ in ADDRESS_FAMILIES}
+        for line in lines or []:
+            parsed = self.parse_line(line)
+            if parsed is None:
+                if line.strip() and not line.startswith("#"):
+                    self.skipped += 1
+                continue
+
+            family, start, end, prefix, asn, registry = parsed
+            family_prefixes[family].append((start, end, len(self.prefixes)))
+            self.prefixes.append(prefix)
+            self.asns.append(asn)
+            self.registries.append(registry)
+
+        self.ranges = {}
+        for family, _ in ADDRESS_FAMILIES:
+            starts, ends, values = flatten(family_prefixes[family])
+            if family == socket.AF_INET:
+                self.ranges[family] = (array("L", starts), array("L", ends), array("L", values))
+            else:
+                self.ranges[family] = (starts, ends, array("L", values))
+
+    @staticmethod
+    def parse_line(line: str) -> tuple[int, int, int, str, int, str | None] | None:
+        """Parse a line into address family, first and last address, prefix, ASN and registry."""
+        fields = line.split()
+        if not fields or fields[0].startswith("#"):
+            return None
+
+        if "/" in fields[0]:
+            address, _, length = fields[0].partition("/")
+            rest = fields[1:]
+        else:
+            address, length = fields[0], fields[1] if len(fields) > 1 else ""
+            rest = fields[2:]
+
+        if not rest or not length.isdigit():
+            return None
+        asn = ASN_REGEX.search(rest[0])
+        if asn is None:
+            return None
+
+        for family, bits in ADDRESS_FAMILIES:
+            try:
+                packed = socket.inet_pton(family, address)
+            except OSError:
+                continue
+            length_bits = int(length)
+            if length_bits > bits:
+                return None
+            host_mask = (1 << (bits - length_bits)) - 1
+            start = int.from_bytes(packed, "big") & ~host_mask
+            registry = rest[1] if len(rest) > 1 else None
+            return family, start, start | host_mask, f"{address}/{length}", int(asn.group()), registry
+
+        return None
+
+    def lookup(self, ip: str) -> dict | None:
+        """Get the origin ASN, prefix and registry of an address, None if no prefix covers it."""
+        for family, _ in ADDRESS_FAMILIES:
+            try:
+                number = int.from_bytes(socket.inet_pton(family, ip), "big")
+            except OSError:
+                continue
+
+            starts, ends, values = self.ranges[family]
+            idx = bisect_right(starts, number) - 1
+            if idx < 0 or number > ends[idx]:
+                return None
+            entry = values[idx]
+            return {"asn": self.asns[entry], "bgp_prefix": self.prefixes[entry], "registry": self.registries[entry]}
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self.prefixes)
+
+
+# Prefix to AS index loaded from the pfx2as file, read only and replaced as a whole.
+pfx2as_index = PrefixIndex()
+
+# Identity of the file the index was loaded from.
+loaded_file: tuple[int, int] | None = None
+
+
+def file_identity(filepath: str) -> tuple[int, int] | None:
+    """Get the inode and modification time of the file, which change when it is replaced."""
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def read_index(filepath: str) -> PrefixIndex:
+    """Read and index a prefix to AS file, gzip compressed if it ends in .gz."""
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "rt", encoding="utf-8", errors="replace") as pfx2as_file:
+        return PrefixIndex(pfx2as_file)
+
+
+async def load_pfx2as(filepath: str) -> None:
+    """Load the prefix to AS file into a new index and swap it in."""
+    global pfx2as_index, loaded_file
+
+    identity = file_identity(filepath)
+    start = time.perf_counter()
+    index = await asyncio.to_thread(read_index, filepath)
+
+    pfx2as_index = index
+    loaded_file = identity
+    logger.info(
+        "Loaded %d prefixes from %s in %.1fs, %d lines skipped",
+        len(index),
+        filepath,
+        time.perf_counter() - start,
+        index.skipped,
+    )
+
+
+async def try_load_pfx2as(filepath: str) -> None:
+    """Load the prefix to AS file if it changed since it was loaded, logging rather than raising errors."""
+    identity = file_identity(filepath)
+    if identity is not None and identity == loaded_file:
+        return
+    try:
+        await load_pfx2as(filepath)
+    except (OSError, EOFError) as err:
+        logger.warning("Unable to load prefix to AS file %s: %s", filepath, err)
+
+
+async def watch_pfx2as_file(filepath: str, interval: int) -> None:
+    """Check for a changed prefix to AS file every interval seconds, and reload it."""
+    while True:
+        await asyncio.sleep(interval)
+        await try_load_pfx2as(filepath)
+
+
+def lookup_ip(ip: str) -> dict | None:
+    """Get the origin ASN information of an address from the loaded index."""
+    return pfx2as_index.lookup(ip)
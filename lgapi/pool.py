@@ -0,0 +1,169 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Persistent device connection pool.
+
+Keeps authenticated scrapli sessions open per device and authentication group so
+that requests do not pay for the TCP and SSH handshake, authentication and prompt
+discovery on every command.
+"""
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+
+from scrapli import AsyncScrapli
+
+from lgapi import logger
+from lgapi.types.config import ConnectionPoolConfig
+
+PoolKey = tuple[str, str | None]
+
+
+@dataclass
+class PooledConnection:
+    """Open device session waiting in the pool."""
+
+    conn: AsyncScrapli
+    last_used: float
+
+
+class DevicePool:
+    """Open sessions for a single device and authentication group."""
+
+    def __init__(self, key: PoolKey, device_args: dict, config: ConnectionPoolConfig):
+        self.key = key
+        self.device_args = device_args
+        self.config = config
+        self.idle: deque[PooledConnection] = deque()
+        self.slots = asyncio.Semaphore(config.max_sessions)
+        self.open_sessions = 0
+
+    async def _open(self) -> AsyncScrapli:
+        """Open a new session to the device."""
+        logger.debug("Opening new session to %s", self.key[0])
+        conn = AsyncScrapli(**self.device_args)
+        await conn.open()
+        self.open_sessions += 1
+        return conn
+
+    async def _close(self, conn: AsyncScrapli) -> None:
+        """Close a session, ignoring errors from sessions that are already dead."""
+        self.open_sessions -= 1
+        with suppress(Exception):
+            await conn.close()
+
+    async def _is_alive(self, conn: AsyncScrapli) -> bool:
+        """Check the session transport is up and the device still answers with a prompt."""
+        if not conn.isalive():
+            return False
+        try:
+            await asyncio.wait_for(conn.get_prompt(), timeout=self.config.probe_timeout)
+        except Exception:
+            return False
+        return True
+
+    async def acquire(self) -> AsyncScrapli:
+        """Get a live session, reusing the most recently used idle session if possible."""
+        await self.slots.acquire()
+        try:
+            while self.idle:
+                pooled = self.idle.pop()
+                if await self._is_alive(pooled.conn):
+                    return pooled.conn
+
+                logger.debug("Discarding dead session to %s", self.key[0])
+                await self._close(pooled.conn)
+
+            return await self._open()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    async def release(self, conn: AsyncScrapli, discard: bool = False) -> None:
+        """Return a session to the pool, or close it if it can no longer be trusted."""
+        try:
+            if discard:
+                await self._close(conn)
+            else:
+                self.idle.append(PooledConnection(conn=conn, last_used=time.monotonic()))
+        finally:
+            self.slots.release()
+
+    async def evict_idle(self, now: float) -> None:
+        """Close sessions that have not been used within the idle timeout."""
+        while self.idle and now - self.idle[0].last_used > self.config.idle_timeout:
+            pooled = self.idle.popleft()
+            logger.debug("Closing idle session to %s", self.key[0])
+            await self._close(pooled.conn)
+
+    async def close(self) -> None:
+        """Close all idle sessions."""
+        while self.idle:
+            await self._close(self.idle.popleft().conn)
+
+
+class ConnectionPool:
+    """Device session pools keyed by device hostname and authentication group."""
+
+    def __init__(self, config: ConnectionPoolConfig):
+        self.config = config
+        self.pools: dict[PoolKey, DevicePool] = {}
+        self._reaper: asyncio.Task | None = None
+
+    def _get_pool(self, key: PoolKey, device_args: dict) -> DevicePool:
+        """Get or create the pool for a device."""
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = DevicePool(key, device_args, self.config)
+        return pool
+
+    @asynccontextmanager
+    async def connection(self, device_args: dict, auth_group: str | None) -> AsyncIterator[AsyncScrapli]:
+        """Borrow an open session to a device for the duration of the context."""
+        if not self.config.enabled:
+            async with AsyncScrapli(**device_args) as conn:
+                yield conn
+            return
+
+        pool = self._get_pool((device_args["host"], auth_group), device_args)
+        conn = await pool.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # The channel may be part way through a command, never reuse it.
+            await pool.release(conn, discard=True)
+            raise
+
+        await pool.release(conn)
+
+    async def _reap(self) -> None:
+        """Periodically close idle sessions."""
+        interval = max(1, self.config.idle_timeout // 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for pool in list(self.pools.values()):
+                await pool.evict_idle(now)
+
+    def start(self) -> None:
+        """Start the idle session reaper."""
+        if self.config.enabled and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def close(self) -> None:
+        """Stop the reaper and close all idle sessions."""
+        if self._reaper:
+            self._reaper.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._reaper
+            self._reaper = None
+
+        for pool in self.pools.values():
+            await pool.close()
+        self.pools.clear()
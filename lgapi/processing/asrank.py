@@ -8,41 +8,65 @@
 from httpx import AsyncClient, HTTPError
 
 from lgapi import logger
+from lgapi.asninfo import lookup_asns
+from lgapi.batchloader import BatchLoader
 from lgapi.cache import asn_key_builder
+from lgapi.config import settings
 from lgapi.decorators import request_cache
+from lgapi.processing.budget import EnrichmentBudget
 
+ASN_FIELDS = "{ asnName rank organization { orgName } country { iso name } }"
 
-def get_graphql_query(asn: int) -> str:
-    """Format the GraphQL query for retrieving the ASN data."""
-    return f"""{{
-        asn(asn:"{asn}") {{
-            asnName
-            rank
-            organization {{
-                orgName
-            }}
-            country {{
-                iso
-                name
-            }}
-        }}
-    }}"""
 
+def get_graphql_query(asns: list[int]) -> str:
+    """Format one GraphQL query for the ASN data of each ASN, aliased by ASN."""
+    aliases = "".join(f'\n    a{asn}: asn(asn:"{asn}") {ASN_FIELDS}' for asn in asns)
+    return f"{{{aliases}\n}}"
 
-@request_cache(ttl=3600, alias="default", key_builder=asn_key_builder)
-async def get_asn_information(asn: int, httpclient: AsyncClient) -> dict:
-    """Map the ASN to a name."""
-    logger.debug("Cache Miss: AS Rank ASN lookup %s", asn)
+
+async def fetch_asn_information(asns: list[int], httpclient: AsyncClient) -> dict[int, dict]:
+    """Get the ASN data of many ASNs with one request to the AS Rank API."""
+    logger.debug("AS Rank lookup of %d ASNs", len(asns))
     try:
-        query = get_graphql_query(asn)
         response = await httpclient.post(
-            "https://api.asrank.caida.org/v2/graphql",
-            json={"query": query},
+            settings.asninfo.api_url,
+            json={"query": get_graphql_query(asns)},
             timeout=10,
         )
         response.raise_for_status()
-        result = response.json()
-        asn_data = result.get("data", {}).get("asn")
-        return asn_data if asn_data else {}
-    except HTTPError:
-        return {}
+        data = response.json().get("data") or {}
+    except (HTTPError, ValueError):
+        data = {}
+    return {asn: data.get(f"a{asn}") or {} for asn in asns}
+
+
+# ASNs looked up close together, across responses, are fetched with one request.
+asn_loader = BatchLoader(
+    fetch_asn_information, window=settings.asninfo.batch_window, max_size=settings.asninfo.batch_size
+)
+
+
+@request_cache(ttl=3600, alias="default", key_builder=asn_key_builder)
+async def get_asn_information(asn: int, httpclient: AsyncClient) -> dict:
+    """Map the ASN to a name."""
+    logger.debug("Cache Miss: AS Rank ASN lookup %s", asn)
+    return await asn_loader.load(asn, httpclient)
+
+
+async def asn_information(
+    asns: set, httpclient: AsyncClient, budget: EnrichmentBudget, field: str = "asn_info"
+) -> dict:
+    """Map ASNs to AS Rank information from the local store, with the AS Rank API for the rest.
+
+    API lookups still running at the budget's deadline mark the field incomplete.
+    """
+    asninfo_cfg = settings.asninfo
+    results = {}
+    if asninfo_cfg.database:
+        results = await lookup_asns(asninfo_cfg.database, asns)
+
+    misses = set(asns) - results.keys()
+    if misses and asninfo_cfg.api_fallback:
+        results.update(await budget.lookup(field, get_asn_information, misses, httpclient))
+
+    return results
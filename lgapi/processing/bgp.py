@@ -7,40 +7,39 @@
 """Process bgp output from the routers into the correct structures."""
 
 
-import asyncio
-
 from httpx import AsyncClient
 
 from lgapi.database import get_community_map
-from lgapi.processing.asrank import get_asn_information
+from lgapi.processing.asrank import asn_information
+from lgapi.processing.budget import EnrichmentBudget
 
 
-async def process_bgp_output(output: dict, httpclient: AsyncClient) -> list:
+async def process_bgp_output(output: dict, httpclient: AsyncClient, budget: EnrichmentBudget) -> list:
     """Process the output of the BGP command."""
     result = []
 
     all_communities = set()
     all_asns = set()
+    prefix_paths = {}
 
-    # Collect all unique communities and assets
-    for prefix in output.values():
-        for path in prefix["paths"]:
+    # Collect all unique communities and assets, copying the paths as parsed results are cached and shared
+    for prefix, prefix_data in output.items():
+        paths = prefix_paths[prefix] = []
+        for path in prefix_data["paths"]:
             aspath = path.get("as_path", "")
             parsed_aspath = [int(asp) for asp in aspath.split() if asp.isnumeric()]
-            path["as_path"] = parsed_aspath
+            paths.append({**path, "as_path": parsed_aspath})
             all_asns.update(parsed_aspath)
             all_communities.update(path.get("communities", []))
 
-    community_map = await get_community_map(all_communities)
-    asn_info_result = await asyncio.gather(*(get_asn_information(asn, httpclient) for asn in all_asns))
+    community_map = get_community_map(all_communities)
+    asn_infos = await asn_information(all_asns, httpclient, budget)
 
-    asn_infos = dict(zip(all_asns, asn_info_result))
-
-    for prefix, prefix_data in output.items():
+    for prefix, paths in prefix_paths.items():
         new_prefix = {"prefix": prefix, "paths": [], "as_paths": []}
         as_path_set = set()
 
-        for path in prefix_data["paths"]:
+        for path in paths:
             aspath = path.get("as_path")
             if aspath:
                 as_path_set.add(tuple(aspath))
@@ -0,0 +1,96 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Bound the time spent enriching a response with DNS, Team Cymru and AS Rank lookups."""
+import asyncio
+import time
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+from lgapi import logger
+
+# Lookups that ran past their response's deadline, kept running so their results fill the cache.
+background_lookups: set[asyncio.Task] = set()
+
+
+def finished_results(field: str, tasks: dict) -> dict:
+    """Results of the finished lookup tasks, logging those that failed."""
+    results = {}
+    for item, task in tasks.items():
+        if task.cancelled() or task.exception() is not None:
+            logger.debug("Lookup of %s for %s failed", item, field)
+        else:
+            results[item] = task.result()
+    return results
+
+
+async def store_late(field: str, func: Callable, tasks: dict, args: tuple) -> None:
+    """Wait for lookups that ran past the deadline and store their results with one batched write."""
+    await asyncio.wait(tasks.values())
+    await func.store(finished_results(field, tasks), *args)
+
+
+def background_done(task: asyncio.Task) -> None:
+    """Forget a finished background lookup, logging it if it failed."""
+    background_lookups.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Background lookup failed: %s", task.exception())
+
+
+class EnrichmentBudget:
+    """Deadline for the lookups enriching a response, and the fields left out when it passes."""
+
+    def __init__(self, deadline: float | None):
+        self.deadline = deadline
+        self.incomplete: set[str] = set()
+
+    @classmethod
+    def from_now(cls, seconds: float) -> "EnrichmentBudget":
+        """Start a budget of seconds from now, without a deadline if seconds is 0."""
+        return cls(time.monotonic() + seconds if seconds else None)
+
+    def remaining(self) -> float | None:
+        """Seconds left until the deadline, None if there is no deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    async def lookup(self, field: str, func: Callable, items: Iterable[Hashable], *args: Any) -> dict:
+        """Look up the items with a request cached function, returning those done by the deadline.
+
+        Without a deadline the items are looked up as one batch. Otherwise cached results
+        are still read as one batch and only the misses are held to the deadline. Misses
+        still running at the deadline are left to finish in the background, and those that
+        fail or run late mark the field incomplete. Finished misses are written to the cache
+        with one batched write, and the late ones with another once they are all done.
+        """
+        items = list(dict.fromkeys(items))
+        if not items:
+            return {}
+        if self.deadline is None:
+            return await func.batch(items, *args)
+
+        results, misses = await func.lookup_cached(items, *args)
+        tasks = {item: asyncio.ensure_future(func.fetch(item, *args)) for item in misses}
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=self.remaining())
+
+        done = {item: task for item, task in tasks.items() if task.done()}
+        late = {item: task for item, task in tasks.items() if not task.done()}
+        fetched = finished_results(field, done)
+        if late or len(fetched) < len(done):
+            self.incomplete.add(field)
+        if late:
+            task = asyncio.ensure_future(store_late(field, func, late, args))
+            background_lookups.add(task)
+            task.add_done_callback(background_done)
+        if fetched:
+            await func.store(fetched, *args)
+        results.update(fetched)
+
+        if field in self.incomplete:
+            logger.debug("Enrichment ended with %d of %d %s lookups done", len(results), len(items), field)
+        return results
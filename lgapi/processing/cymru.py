@@ -7,11 +7,13 @@
 """Cymru Network Team lookups"""
 import ipaddress
 
-import dns.asyncresolver
-
 from lgapi import logger
 from lgapi.cache import ip_to_asn_key_builder
+from lgapi.config import settings
 from lgapi.decorators import request_cache
+from lgapi.pfx2as import lookup_ip
+from lgapi.processing.budget import EnrichmentBudget
+from lgapi.resolver import get_resolver
 
 
 @request_cache(ttl=3600, alias="default", key_builder=ip_to_asn_key_builder)
@@ -28,8 +30,7 @@ async def ip_to_asn(ip: str) -> dict:
             reversed_nibbles = ".".join(reversed(nibbles))
             query = f"{reversed_nibbles}.origin6.asn.cymru.com"
 
-        resolver = dns.asyncresolver.Resolver()
-        answer = await resolver.resolve(query, "TXT")
+        answer = await get_resolver().resolve(query, "TXT")
         parts = [p.strip() for p in answer[0].to_text().strip('"').split("|")]
 
         def get_part(idx):
@@ -49,3 +50,23 @@ async def ip_to_asn(ip: str) -> dict:
     except Exception as e:
         logger.debug("Unable to map IP to ASN: %s", str(e))
         return {}
+
+
+async def ip_to_asn_info(ips: set, budget: EnrichmentBudget) -> dict:
+    """Map IPs to ASN info from the local prefix to AS file, with Team Cymru for the rest."""
+    results = {}
+    misses = set()
+    for ip in ips:
+        info = lookup_ip(ip)
+        if info is None:
+            misses.add(ip)
+        else:
+            results[ip] = info
+
+    if misses:
+        if settings.pfx2as.cymru_fallback:
+            results.update(await budget.lookup("info", ip_to_asn, misses))
+        else:
+            results.update({ip: {} for ip in misses})
+
+    return results
@@ -14,8 +14,9 @@ import re
 from httpx import AsyncClient
 
 from lgapi.config import settings
-from lgapi.processing.asrank import get_asn_information
-from lgapi.processing.cymru import ip_to_asn
+from lgapi.processing.asrank import asn_information
+from lgapi.processing.budget import EnrichmentBudget
+from lgapi.processing.cymru import ip_to_asn_info
 from lgapi.resolver import reverse_lookup
 
 PROBE_REGEX = re.compile(
@@ -92,53 +93,71 @@ async def process_junos_hops(hops: list):
     return combined
 
 
-async def process_traceroute_output(output: dict, device_type: str, httpclient: AsyncClient) -> list[dict]:
-    """Process the output of the traceroute command."""
+async def resolve_hops(hops: list[dict], budget: EnrichmentBudget) -> None:
+    """Resolve hostnames of traceroute hops, as set in resolve_traceroute_hops."""
     resolve_mode = settings.resolve_traceroute_hops
+    if resolve_mode not in {"missing", "all"}:
+        return
+
+    # Avoid duplicate lookups
+    ip_to_indices = collections.defaultdict(list)
+    for idx, hop in enumerate(hops):
+        hop_ip = hop.get("ip_address")
+        fqdn = hop.get("fqdn")
+        if hop_ip and (not fqdn or resolve_mode == "all"):
+            ip_to_indices[hop_ip].append(idx)
+
+    # Look up all unique IPs at once, only cache misses are resolved
+    lookup_results = await budget.lookup("fqdn", reverse_lookup, ip_to_indices)
+    for ip, fqdn in lookup_results.items():
+        if fqdn:
+            for idx in ip_to_indices[ip]:
+                hops[idx]["fqdn"] = fqdn
+
+
+async def add_hop_asns(hops: list[dict], httpclient: AsyncClient, budget: EnrichmentBudget) -> None:
+    """Add ASN and AS Rank information to traceroute hops."""
+    all_ips = {hop.get("ip_address") for hop in hops if hop.get("ip_address")}
+    if not all_ips:
+        return
+
+    cymru_results = await ip_to_asn_info(all_ips, budget)
+    for hop in hops:
+        info = cymru_results.get(hop.get("ip_address"))
+        if info is not None:
+            # Copied, the looked up information is cached and shared.
+            hop["info"] = dict(info)
+
+    # --- ASRank info for all unique ASNs found in cymru_results ---
+    unique_asns = {info["asn"] for info in cymru_results.values() if info and info.get("asn")}
+    if unique_asns:
+        asrank_results = await asn_information(unique_asns, httpclient, budget, field="asrank")
+        for hop in hops:
+            asn = (hop.get("info") or {}).get("asn")
+            if asn:
+                hop["info"]["asrank"] = asrank_results.get(asn)
+
+
+async def enrich_hops(hops: list[dict], httpclient: AsyncClient, budget: EnrichmentBudget) -> list[dict]:
+    """Resolve hostnames and add ASN information to traceroute hops."""
+    await asyncio.gather(resolve_hops(hops, budget), add_hop_asns(hops, httpclient, budget))
+    return hops
+
+
+async def process_traceroute_output(
+    output: dict, device_type: str, httpclient: AsyncClient, budget: EnrichmentBudget
+) -> list[dict]:
+    """Process the output of the traceroute command."""
     results = []
 
     for ip_address, data in output.items():
-        hops = data["hops"]
-
+        # Parsed results are cached and shared, enrich copies of the hops
         if device_type == "juniper_junos":
-            hops = await process_junos_hops(hops)
-
-        # Prepare tasks for hops that need resolution, avoid duplicate lookups
-        if resolve_mode in {"missing", "all"}:
-            ip_to_indices = collections.defaultdict(list)
-            for idx, hop in enumerate(hops):
-                hop_ip = hop.get("ip_address")
-                fqdn = hop.get("fqdn")
-                if hop_ip and (not fqdn or resolve_mode == "all"):
-                    ip_to_indices[hop_ip].append(idx)
-
-            # Run all reverse lookups concurrently (unique IPs only)
-            if ip_to_indices:
-                lookup_results = await asyncio.gather(*(reverse_lookup(ip) for ip in ip_to_indices))
-                for ip, fqdn in zip(ip_to_indices, lookup_results):
-                    if fqdn:
-                        for idx in ip_to_indices[ip]:
-                            hops[idx]["fqdn"] = fqdn
-
-        # --- ASN info for all hops with IPs ---
-        all_ips = {hop.get("ip_address") for hop in hops if hop.get("ip_address")}
-        if all_ips:
-            cymru_infos = await asyncio.gather(*(ip_to_asn(ip) for ip in all_ips))
-            cymru_results = dict(zip(all_ips, cymru_infos))
-            for hop in hops:
-                ip = hop.get("ip_address")
-                if ip:
-                    hop["info"] = cymru_results.get(ip)
-
-            # --- ASRank info for all unique ASNs found in cymru_results ---
-            unique_asns = {info["asn"] for info in cymru_results.values() if info and "asn" in info and info["asn"]}
-            if unique_asns:
-                asrank_infos = await asyncio.gather(*(get_asn_information(asn, httpclient) for asn in unique_asns))
-                asrank_results = dict(zip(unique_asns, asrank_infos))
-                for hop in hops:
-                    asn = hop.get("info", {}).get("asn")
-                    if asn:
-                        hop["info"]["asrank"] = asrank_results.get(asn)
+            hops = await process_junos_hops(data["hops"])
+        else:
+            hops = [dict(hop) for hop in data["hops"]]
+
+        hops = await enrich_hops(hops, httpclient, budget)
 
         results.append({"ip_address": ip_address, "hops": hops})
 
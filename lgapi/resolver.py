@@ -6,12 +6,44 @@
 #
 """Resolve DNS queries."""
 
+import asyncio
+from functools import lru_cache
+
 import dns.asyncresolver
+import dns.name
+import dns.resolver
 import dns.reversename
 
 from lgapi import logger
 from lgapi.cache import reverse_dns_key_builder
+from lgapi.config import settings
 from lgapi.decorators import request_cache
+from lgapi.types.config import DnsConfig
+
+
+class SharedResolver:
+    """DNS resolver shared by all lookups in a worker, with a cap on the queries in flight."""
+
+    def __init__(self, config: DnsConfig):
+        # Read /etc/resolv.conf once, unless the name servers are configured.
+        self.resolver = dns.asyncresolver.Resolver(configure=not config.nameservers)
+        if config.nameservers:
+            self.resolver.nameservers = config.nameservers
+        self.resolver.port = config.port
+        self.resolver.timeout = config.timeout
+        self.resolver.lifetime = config.lifetime
+        self.slots = asyncio.Semaphore(config.max_queries)
+
+    async def resolve(self, qname: str | dns.name.Name, rdtype: str) -> dns.resolver.Answer:
+        """Resolve a query, waiting for a free slot if too many are in flight."""
+        async with self.slots:
+            return await self.resolver.resolve(qname, rdtype)
+
+
+@lru_cache(maxsize=1)
+def get_resolver() -> SharedResolver:
+    """Get the worker's shared resolver."""
+    return SharedResolver(settings.dns)
 
 
 @request_cache(ttl=3600, alias="default", key_builder=reverse_dns_key_builder)
@@ -19,9 +51,8 @@ async def reverse_lookup(ipaddr: str) -> str:
     """Do a reverse lookup on an IP address asynchronously using DNS."""
     logger.debug("Cache Miss: Reverse DNS lookup %s", ipaddr)
     try:
-        resolver = dns.asyncresolver.Resolver()
         rev_name = dns.reversename.from_address(ipaddr)
-        answer = await resolver.resolve(rev_name, "PTR")
+        answer = await get_resolver().resolve(rev_name, "PTR")
         return str(answer[0]).rstrip(".")
     except Exception:
         return ""
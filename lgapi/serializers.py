@@ -0,0 +1,107 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Compact serializers for the Redis cache.
+
+Values are encoded as JSON (with orjson when it is installed) or msgpack, and
+encoded values larger than the threshold can be compressed with zstd. Every
+stored value starts with a one byte header saying whether it was compressed.
+"""
+import json
+import pickle
+from typing import Any
+
+from aiocache.serializers import BaseSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PLAIN = b"\x00"
+ZSTD = b"\x01"
+
+
+def json_dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON."""
+    if orjson:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def json_loads(value: bytes) -> Any:
+    """Decode a JSON value."""
+    if orjson:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def msgpack_dumps(value: Any) -> bytes:
+    """Encode a value as msgpack."""
+    return msgpack.packb(value)
+
+
+def msgpack_loads(value: bytes) -> Any:
+    """Decode a msgpack value."""
+    return msgpack.unpackb(value, strict_map_key=False)
+
+
+FORMATS = {
+    "json": (json_dumps, json_loads),
+    "msgpack": (msgpack_dumps, msgpack_loads),
+    "pickle": (pickle.dumps, pickle.loads),
+}
+
+
+class CompactSerializer(BaseSerializer):
+    """Serialize cache values as JSON, msgpack or pickle, compressing large values with zstd."""
+
+    DEFAULT_ENCODING = None
+
+    def __init__(self, *args, fmt: str = "json", compression: str = "off", compress_min_size: int = 1024, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fmt == "msgpack" and msgpack is None:
+            raise ImportError("The msgpack cache serializer needs the msgpack package installed")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd cache compression needs the zstandard package installed")
+
+        self.fmt = fmt
+        self.encode, self.decode = FORMATS[fmt]
+        self.compress_min_size = compress_min_size
+        self.compressor = zstandard.ZstdCompressor() if compression == "zstd" else None
+        self.decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    def dumps(self, value: Any) -> bytes:
+        """Encode a value, compressing it if it is large enough."""
+        data = self.encode(value)
+        if self.compressor and len(data) >= self.compress_min_size:
+            return ZSTD + self.compressor.compress(data)
+        return PLAIN + data
+
+    def loads(self, value: bytes | None) -> Any:
+        """Decode a value, None and values without a header, from older serializers, are cache misses."""
+        if value is None:
+            return None
+
+        header, data = value[:1], value[1:]
+        if header not in (PLAIN, ZSTD):
+            return None
+        if header == ZSTD:
+            if self.decompressor is None:
+                raise ImportError("Cached value is zstd compressed but the zstandard package is not installed")
+            data = self.decompressor.decompress(data)
+        return self.decode(data)
@@ -0,0 +1,221 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Coalesce identical in-flight calls so that one execution serves every waiter.
+
+Calls are always coalesced between tasks in the same worker. With a shared backend
+they are also coalesced between workers: one worker takes a lock and runs the call,
+the others wait for the result to be published. The Redis backend is used in
+production, the local backend stands in for it in a single process and in tests.
+"""
+import asyncio
+import json
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from lgapi import logger
+from lgapi.admission import DeviceBusyError
+
+# Leader results are kept this long for waiters that subscribe just after they are published.
+RESULT_TTL = 5
+
+
+class CoalescedCallError(Exception):
+    """Raised in a waiter when the call it was waiting on failed in another worker."""
+
+
+class LocalBackend:
+    """In process coalescing backend, shared by SingleFlight instances standing in for workers."""
+
+    def __init__(self):
+        self.locks: dict[str, str] = {}
+        self.results: dict[str, str] = {}
+        self.events: dict[str, asyncio.Event] = {}
+
+    async def try_lock(self, key: str, token: str, ttl: float) -> bool:
+        """Take the lock for the key if nobody holds it."""
+        if key in self.locks:
+            return False
+        self.locks[key] = token
+        self.results.pop(key, None)
+        self.events[key] = asyncio.Event()
+        asyncio.get_running_loop().call_later(ttl, self._expire_lock, key, token)
+        return True
+
+    def _expire_lock(self, key: str, token: str) -> None:
+        if self.locks.get(key) == token:
+            del self.locks[key]
+            # Wake any waiters left behind by a holder that never published.
+            if key in self.events:
+                self.events.pop(key).set()
+
+    def _expire_result(self, key: str, message: str) -> None:
+        if self.results.get(key) == message:
+            del self.results[key]
+
+    async def unlock(self, key: str, token: str) -> None:
+        """Release the lock if it is still held with this token."""
+        self._expire_lock(key, token)
+
+    async def publish(self, key: str, message: str) -> None:
+        """Publish the result of a call to the waiters."""
+        self.results[key] = message
+        asyncio.get_running_loop().call_later(RESULT_TTL, self._expire_result, key, message)
+        if key in self.events:
+            self.events.pop(key).set()
+
+    async def wait(self, key: str, timeout: float) -> str | None:
+        """Wait for the result of the call, None if there is no call to wait on."""
+        if key in self.results:
+            return self.results[key]
+
+        event = self.events.get(key)
+        if key not in self.locks or event is None:
+            return None
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except TimeoutError:
+            return None
+        return self.results.get(key)
+
+
+class RedisBackend:
+    """Coalescing backend using a Redis lock and pub/sub, shared by all workers."""
+
+    UNLOCK_SCRIPT = "if redis.call('get',KEYS[1]) == ARGV[1] then return redis.call('del',KEYS[1]) else return 0 end"
+
+    # Take the lock and clear the previous call's result together, so waiters never see a stale result.
+    LOCK_SCRIPT = (
+        "if redis.call('set',KEYS[1],ARGV[1],'NX','PX',ARGV[2]) then "
+        "redis.call('del',KEYS[2]) return 1 else return 0 end"
+    )
+
+    def __init__(self, client: Any, namespace: str):
+        self.client = client
+        self.namespace = namespace
+
+    def _key(self, kind: str, key: str) -> str:
+        return f"{self.namespace}:singleflight:{kind}:{key}"
+
+    async def try_lock(self, key: str, token: str, ttl: float) -> bool:
+        """Take the lock for the key if nobody holds it."""
+        return bool(
+            await self.client.eval(
+                self.LOCK_SCRIPT, 2, self._key("lock", key), self._key("result", key), token, int(ttl * 1000)
+            )
+        )
+
+    async def unlock(self, key: str, token: str) -> None:
+        """Release the lock if it is still held with this token."""
+        await self.client.eval(self.UNLOCK_SCRIPT, 1, self._key("lock", key), token)
+
+    async def publish(self, key: str, message: str) -> None:
+        """Publish the result of a call to the waiters."""
+        await self.client.set(self._key("result", key), message, ex=RESULT_TTL)
+        await self.client.publish(self._key("channel", key), message)
+
+    async def wait(self, key: str, timeout: float) -> str | None:
+        """Wait for the result of the call, None if there is no call to wait on."""
+        pubsub = self.client.pubsub()
+        try:
+            # Subscribe before checking, so a result published in between is not missed.
+            await pubsub.subscribe(self._key("channel", key))
+
+            result = await self.client.get(self._key("result", key))
+            if result is not None:
+                return result.decode()
+            if not await self.client.exists(self._key("lock", key)):
+                return None
+
+            async with asyncio.timeout(timeout):
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                    if message and message["type"] == "message":
+                        return message["data"].decode()
+        except TimeoutError:
+            return None
+        finally:
+            await pubsub.aclose()
+
+
+class SingleFlight:
+    """Run only one call per key at a time, sharing its result with concurrent callers."""
+
+    def __init__(self, backend: LocalBackend | RedisBackend | None = None):
+        self.backend = backend
+        self.calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        """Run func for the key, or wait for the call already in flight for it."""
+        task = self.calls.get(key)
+        if task is None:
+            # Run in a task so a cancelled caller does not cancel the call for everyone else.
+            task = asyncio.create_task(self._run(key, func, timeout))
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        else:
+            logger.debug("Coalescing call for %s", key)
+
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, func: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        if self.backend is None:
+            return await func()
+
+        # Backend errors are treated as no call in flight elsewhere, and the call is run here.
+        token = uuid.uuid4().hex
+        try:
+            locked = await self.backend.try_lock(key, token, ttl=timeout)
+        except Exception as err:
+            logger.warning("Error taking coalescing lock for %s, running the call here: %s", key, err)
+            return await func()
+
+        if not locked:
+            try:
+                message = await self.backend.wait(key, timeout)
+            except Exception as err:
+                logger.warning("Error waiting for coalesced call %s, running the call here: %s", key, err)
+                message = None
+            result = json.loads(message) if message is not None else {"ok": None}
+
+            if result["ok"] is not None:
+                logger.debug("Coalesced call for %s with another worker", key)
+                if not result["ok"]:
+                    if "busy" in result:
+                        raise DeviceBusyError(**result["busy"])
+                    raise CoalescedCallError(result["error"])
+                return result["value"]
+
+            # Lock holder went away without a result, run it here instead.
+            return await func()
+
+        result = {"ok": None}
+        try:
+            value = await func()
+            result = {"ok": True, "value": value}
+            return value
+        except DeviceBusyError as err:
+            busy = {"location": err.location, "retry_after": err.retry_after, "queue_full": err.queue_full}
+            result = {"ok": False, "error": str(err), "busy": busy}
+            raise
+        except Exception as err:
+            result = {"ok": False, "error": str(err)}
+            raise
+        finally:
+            await self._finish(key, token, result)
+
+    async def _finish(self, key: str, token: str, result: dict) -> None:
+        """Publish the result and release the lock, logging rather than raising backend errors."""
+        try:
+            await self.backend.publish(key, json.dumps(result))
+        except Exception as err:
+            logger.warning("Error publishing coalesced call result for %s: %s", key, err)
+        try:
+            await self.backend.unlock(key, token)
+        except Exception as err:
+            logger.warning("Error releasing coalescing lock for %s: %s", key, err)
@@ -0,0 +1,234 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Stream command output from the devices as it arrives.
+
+Traceroute hops are parsed and enriched one at a time and sent to the client as
+soon as they are ready, rather than after the device has finished the command.
+"""
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, suppress
+from typing import Literal
+
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient
+from scrapli.exceptions import ScrapliException
+from ttp import ttp
+
+from lgapi import logger
+from lgapi.admission import device_slot
+from lgapi.commands import execute_single_command, get_cmd
+from lgapi.config import settings
+from lgapi.device import get_command_timeout, stream_on_device
+from lgapi.parsing import get_template, parse_command_output, parse_txt
+from lgapi.processing.budget import EnrichmentBudget
+from lgapi.processing.traceroute import enrich_hops, process_junos_hops
+
+LOCATIONS_CFG = settings.locations
+
+StreamFormat = Literal["ndjson", "sse"]
+
+
+async def output_lines(location: str, command: str, destination: str, cached_output: str | None) -> AsyncIterator[str]:
+    """Yield output lines from the command cache, or from the device as they arrive.
+
+    The caller holds the location's device slot when there is no cached output.
+    """
+    if cached_output is not None:
+        for line in cached_output.splitlines():
+            yield line
+        return
+
+    logger.debug("Cache Miss: Stream %s command at %s to %s", command, location, destination)
+
+    loc_config = LOCATIONS_CFG[location]
+    lines = []
+
+    async for line in stream_on_device(
+        hostname=loc_config.device,
+        device_type=loc_config.type,
+        cli_command=get_cmd(location, command, destination)["cmd"],
+        auth_group=loc_config.authentication,
+        timeout=get_command_timeout(command),
+    ):
+        lines.append(line)
+        yield line
+
+    await execute_single_command.store("\n".join(lines).strip(), location, command, destination)
+
+
+def parse_hops(header: str, line: str, template: ttp) -> list[dict]:
+    """Parse the traceroute hops on one output line, below the line that started its destination."""
+    parsed_result = parse_txt(f"{header}\n{line}", template)
+    if not parsed_result or len(parsed_result[0]) != 1:
+        return []
+
+    destination_data = next(iter(parsed_result[0].values()))
+    return destination_data.get("hops", [])
+
+
+def is_hop_header(line: str, template: ttp) -> bool:
+    """Check if an output line starts the hops of a destination."""
+    parsed_result = parse_txt(line, template)
+    return bool(parsed_result and parsed_result[0])
+
+
+async def stream_command(
+    location: str,
+    command: str,
+    destination: str,
+    raw: bool = False,
+    httpclient: AsyncClient | None = None,
+) -> AsyncIterator[dict]:
+    """Run a command and yield events as the output arrives from the device.
+
+    Without cached output the device slot is taken before the start event, so a busy
+    device raises DeviceBusyError from the first step rather than inside the stream.
+    """
+    loc_config = LOCATIONS_CFG[location]
+    template = None if raw else get_template(command, loc_config.type)
+    hop_template = template if command == "traceroute" and httpclient else None
+
+    slot = AsyncExitStack()
+    cached_output = await execute_single_command.lookup(location, command, destination)
+    if cached_output is None:
+        await slot.enter_async_context(device_slot(location))
+
+    yield {
+        "type": "start",
+        "command": command,
+        "location": location,
+        "location_name": loc_config.name,
+        "destination": destination,
+    }
+
+    lines: list[str] = []
+    queue: asyncio.Queue[tuple[str, object]] = asyncio.Queue()
+
+    async def resolve_hop(entry: dict) -> tuple[list[dict], list[str]]:
+        hops = [entry]
+        if loc_config.type == "juniper_junos":
+            hops = await process_junos_hops(hops)
+        budget = EnrichmentBudget.from_now(settings.enrichment.budget)
+        return await enrich_hops(hops, httpclient, budget), sorted(budget.incomplete)
+
+    async def produce() -> None:
+        header = None
+        try:
+            async for line in output_lines(location, command, destination, cached_output):
+                lines.append(line)
+                if not hop_template:
+                    await queue.put(("line", line))
+                    continue
+
+                # Each hop is on its own line, so only the new line is parsed, below the line starting
+                # the destination, and any hop on it is complete and can be enriched now.
+                entries = parse_hops(header, line, hop_template) if header is not None else []
+                for entry in entries:
+                    await queue.put(("hops", asyncio.create_task(resolve_hop(entry))))
+                if not entries and is_hop_header(line, hop_template):
+                    header = line
+
+            await queue.put(("done", None))
+        except Exception as err:
+            await queue.put(("error", err))
+
+    producer = asyncio.create_task(produce())
+    hops_sent = 0
+
+    try:
+        while True:
+            kind, item = await queue.get()
+
+            if kind == "line":
+                yield {"type": "line", "line": item}
+
+            elif kind == "hops":
+                hops, incomplete = await item
+                for hop in hops:
+                    hops_sent += 1
+                    yield {"type": "hop", "ip_address": destination, "hop": hop, "incomplete": incomplete}
+
+            elif kind == "error":
+                logger.warning(
+                    "Error getting device output from '%s' (%s) for command %s: %s",
+                    loc_config.device,
+                    location,
+                    command,
+                    item,
+                )
+                if not isinstance(item, (ScrapliException, OSError, TimeoutError)):
+                    raise item
+
+                yield {
+                    "type": "error",
+                    "detail": f"Error executing command '{command}' at location '{loc_config.name}'",
+                }
+                return
+
+            else:
+                break
+
+        raw_output = "\n".join(lines)
+
+        if command != "traceroute" and not raw:
+            yield {
+                "type": "result",
+                "result": await parse_command_output(
+                    location=location,
+                    result=raw_output,
+                    command=command,
+                    raw=raw,
+                    httpclient=httpclient,
+                ),
+            }
+
+        yield {"type": "end", "raw_output": raw_output, "raw_only": not hops_sent if command == "traceroute" else raw}
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            kind, item = queue.get_nowait()
+            if kind == "hops":
+                item.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
+        await slot.aclose()
+
+
+async def start_stream(events: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """Run the events up to the first, so errors before the stream starts are raised to the endpoint."""
+    first_event = await anext(events)
+
+    async def resumed() -> AsyncIterator[dict]:
+        yield first_event
+        async for event in events:
+            yield event
+
+    return resumed()
+
+
+def format_event(event: dict, stream_format: StreamFormat) -> str:
+    """Format an event as a server sent event or a line of newline delimited JSON."""
+    data = json.dumps(event)
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return f"{data}\n"
+
+
+def stream_response(events: AsyncIterator[dict], stream_format: StreamFormat) -> StreamingResponse:
+    """Create a streaming response that sends each event as soon as it is ready."""
+
+    async def body() -> AsyncIterator[str]:
+        async for event in events:
+            yield format_event(event, stream_format)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
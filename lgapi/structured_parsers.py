@@ -0,0 +1,123 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+"""Decode structured device output into the same structure as the text parsers.
+
+JunOS renders operational commands as JSON with `| display json`. Each element
+is a list of objects holding the value under "data", commands for several
+destinations give one JSON document each.
+"""
+import json
+from collections.abc import Callable, Iterator
+
+JSON_DECODER = json.JSONDecoder()
+
+
+def json_documents(raw_output: str) -> Iterator[dict]:
+    """Decode the JSON documents in the output, one per command run."""
+    pos = 0
+    while True:
+        while pos < len(raw_output) and raw_output[pos].isspace():
+            pos += 1
+        if pos == len(raw_output):
+            return
+        document, pos = JSON_DECODER.raw_decode(raw_output, pos)
+        yield document
+
+
+def junos_element(parent: dict, name: str) -> dict:
+    """Get the first of a JunOS JSON element, an empty element if it is missing."""
+    elements = parent.get(name)
+    return elements[0] if elements else {}
+
+
+def junos_value(parent: dict, name: str) -> str | None:
+    """Get the value of a JunOS JSON element, None if it is missing."""
+    return junos_element(parent, name).get("data")
+
+
+def junos_bgp_path(entry: dict) -> dict:
+    """Decode a JunOS BGP route entry into a path."""
+    path = {"best_path": junos_value(entry, "active-tag") == "*"}
+
+    next_hops = entry.get("nh") or entry.get("protocol-nh") or []
+    selected = [next_hop for next_hop in next_hops if "selected-next-hop" in next_hop]
+    if next_hops:
+        path["next_hop"] = junos_value((selected or next_hops)[0], "to")
+
+    as_path = junos_value(entry, "as-path")
+    if as_path is not None:
+        path["as_path"] = as_path.strip().removeprefix("AS path:").strip()
+
+    for field, name in (("local_pref", "local-preference"), ("metric", "med")):
+        value = junos_value(entry, name)
+        if value is not None:
+            path[field] = value
+
+    communities = junos_element(entry, "communities").get("community")
+    if communities:
+        path["communities"] = [community["data"] for community in communities]
+
+    return {field: value for field, value in path.items() if value is not None}
+
+
+def decode_junos_bgp(raw_output: str) -> list[dict]:
+    """Decode JunOS show route detail | display json output."""
+    results = {}
+    for document in json_documents(raw_output):
+        for route_information in document.get("route-information", []):
+            for table in route_information.get("route-table", []):
+                for route in table.get("rt", []):
+                    prefix = junos_value(route, "rt-destination")
+                    if prefix is None:
+                        continue
+                    if "/" not in prefix:
+                        prefix = f"{prefix}/{junos_value(route, 'rt-prefix-length')}"
+
+                    paths = [
+                        junos_bgp_path(entry)
+                        for entry in route.get("rt-entry", [])
+                        if junos_value(entry, "protocol-name") == "BGP"
+                    ]
+                    if paths:
+                        results.setdefault(prefix, {"paths": []})["paths"].extend(paths)
+
+    return [results]
+
+
+def microseconds_to_ms(value: str) -> str:
+    """Format a JunOS round trip time in microseconds as the text output shows it."""
+    return f"{int(value) / 1000:.3f}ms"
+
+
+def decode_junos_ping(raw_output: str) -> list[dict]:
+    """Decode JunOS ping | display json output."""
+    results = {}
+    for document in json_documents(raw_output):
+        for ping in document.get("ping-results", []):
+            destination = junos_value(ping, "target-ip") or junos_value(ping, "target-host")
+            summary = junos_element(ping, "probe-results-summary")
+
+            result = {
+                "packet_size": junos_value(ping, "packet-size"),
+                "packet_count": junos_value(summary, "probes-sent"),
+                "packet_loss": junos_value(summary, "packet-loss"),
+            }
+            for field, name in (("rtt_min", "rtt-minimum"), ("rtt_avg", "rtt-average"), ("rtt_max", "rtt-maximum")):
+                value = junos_value(summary, name)
+                if value is not None:
+                    result[field] = microseconds_to_ms(value)
+
+            results[destination] = {field: value for field, value in result.items() if value is not None}
+
+    return [results]
+
+
+# Structured output decoders by device type, command and output format.
+STRUCTURED_PARSERS: dict[tuple[str, str, str], Callable[[str], list[dict]]] = {
+    ("juniper_junos", "bgp", "json"): decode_junos_bgp,
+    ("juniper_junos", "ping", "json"): decode_junos_ping,
+}
@@ -5,6 +5,8 @@
 # have been included as part of this distribution.
 #
 """Models used for Configuration validation"""
+from typing import Literal
+
 from pydantic import BaseModel, Field, RedisDsn, model_validator
 
 
@@ -45,6 +47,20 @@ class SourcesConfig(BaseModel):
     ipv6: str
 
 
+class ConcurrencyConfig(BaseModel):
+    """Configuration for concurrent commands run against a location's device.
+
+    Attributes:
+        max_concurrent (int): Maximum number of commands running on the device at once.
+        max_queue (int): Maximum number of commands waiting for a free slot.
+        max_wait (float): Seconds a command waits in the queue before it is rejected.
+    """
+
+    max_concurrent: int = Field(default=2, ge=1)
+    max_queue: int = Field(default=20, ge=0)
+    max_wait: float = Field(default=15, gt=0)
+
+
 class LocationConfig(BaseModel):
     """Configuration for a network location.
 
@@ -57,6 +73,7 @@ class LocationConfig(BaseModel):
         type (str): Device type (i.e. juniper_junos).
         authentication (str | None): Optional authentication group name.
         source (str): Source IP or interface for ping and traceroute commands.
+        concurrency (ConcurrencyConfig): Concurrent command limits for the device.
     """
 
     name: str
@@ -67,6 +84,7 @@ class LocationConfig(BaseModel):
     type: str
     authentication: str | None = None
     source: SourcesConfig
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
 
 
 class CommandVariantsConfig(BaseModel):
@@ -75,10 +93,12 @@ class CommandVariantsConfig(BaseModel):
     Attributes:
         ipv4 (str): Command for IPv4.
         ipv6 (str): Command for IPv6.
+        format (str): Output format the commands ask the device for: text, or json (JunOS `| display json`).
     """
 
     ipv4: str
     ipv6: str
+    format: Literal["text", "json"] = Field(default="text")
 
 
 class CommandsConfig(BaseModel):
@@ -102,11 +122,30 @@ class RedisConfig(BaseModel):
         namespace (str): Redis namespace prefix.
         timeout (int): Connection timeout in seconds.
         dsn (RedisDsn): Redis DSN string.
+        serializer (str): Encoding for cached values: json, msgpack or pickle.
+        compression (str): Compression for large cached values: off or zstd.
+        compress_min_size (int): Encoded size in bytes from which values are compressed.
     """
 
     namespace: str = Field(default="lgapi")
     timeout: int = Field(default=5)
     dsn: RedisDsn = Field(default="redis://localhost:6379/")
+    serializer: Literal["json", "msgpack", "pickle"] = Field(default="json")
+    compression: Literal["off", "zstd"] = Field(default="off")
+    compress_min_size: int = Field(default=1024, ge=0)
+
+
+class CommandTTLConfig(BaseModel):
+    """Cache lifetimes for a single command type.
+
+    Attributes:
+        ttl (int | None): Seconds the cached output is fresh, defaults to the command cache ttl.
+        stale_ttl (int | None): Seconds the output is served stale while it is refreshed, defaults to
+            the command cache stale_ttl.
+    """
+
+    ttl: int | None = None
+    stale_ttl: int | None = None
 
 
 class CommandCacheConfig(BaseModel):
@@ -115,10 +154,45 @@ class CommandCacheConfig(BaseModel):
     Attributes:
         enabled (bool): Whether command caching is enabled.
         ttl (int): Time-to-live for cached commands in seconds.
+        stale_ttl (int): Seconds after the ttl that cached output is still served while it is refreshed.
+        ping (CommandTTLConfig): Cache lifetimes for ping.
+        bgp (CommandTTLConfig): Cache lifetimes for bgp.
+        traceroute (CommandTTLConfig): Cache lifetimes for traceroute.
     """
 
     enabled: bool = Field(default=False)
     ttl: int = 180
+    stale_ttl: int = Field(default=0, ge=0)
+    ping: CommandTTLConfig = Field(default_factory=CommandTTLConfig)
+    bgp: CommandTTLConfig = Field(default_factory=CommandTTLConfig)
+    traceroute: CommandTTLConfig = Field(default_factory=CommandTTLConfig)
+
+    def get_ttls(self, command: str) -> tuple[int, int]:
+        """Get the soft (fresh) and hard (stale) time-to-live for a command."""
+        command_cfg = getattr(self, command, None) or CommandTTLConfig()
+        ttl = self.ttl if command_cfg.ttl is None else command_cfg.ttl
+        stale_ttl = self.stale_ttl if command_cfg.stale_ttl is None else command_cfg.stale_ttl
+        return ttl, ttl + stale_ttl
+
+
+class LocalCacheConfig(BaseModel):
+    """Configuration for the in-process cache in front of Redis for lookups.
+
+    Attributes:
+        enabled (bool): Whether lookups are also cached in each worker's memory, when caching is enabled.
+        max_size (int): Maximum number of entries kept per worker.
+        ttl (int): Default time-to-live for entries in seconds.
+        namespaces (dict[str, int]): Time-to-live per lookup type (asninfo, ip2asn, rev_dns).
+    """
+
+    enabled: bool = Field(default=True)
+    max_size: int = Field(default=10000, ge=0)
+    ttl: int = Field(default=300, ge=0)
+    namespaces: dict[str, int] = Field(default_factory=dict)
+
+    def get_ttl(self, namespace: str) -> int:
+        """Get the time-to-live for a lookup type."""
+        return self.namespaces.get(namespace, self.ttl)
 
 
 class CacheConfig(BaseModel):
@@ -126,12 +200,16 @@ class CacheConfig(BaseModel):
 
     Attributes:
         enabled (bool): Whether caching is enabled.
+        negative_ttl (int): Time-to-live in seconds for failed lookups, which are retried sooner.
         commands (CommandCacheConfig): Command cache configuration.
+        local (LocalCacheConfig): In-process lookup cache configuration.
         redis (RedisConfig): Redis configuration.
     """
 
     enabled: bool = Field(default=False)
+    negative_ttl: int = Field(default=60, ge=0)
     commands: CommandCacheConfig
+    local: LocalCacheConfig = Field(default_factory=LocalCacheConfig)
     redis: RedisConfig
 
 
@@ -159,6 +237,136 @@ class MaxDestinationsConfig(BaseModel):
     ping: int = Field(default=5)
 
 
+class ConnectionPoolConfig(BaseModel):
+    """Configuration for the persistent device connection pool.
+
+    Attributes:
+        enabled (bool): Whether device sessions are kept open and reused between requests.
+        max_sessions (int): Maximum number of open sessions per device and authentication group.
+        idle_timeout (int): Seconds an unused session is kept open before it is closed.
+        probe_timeout (int): Seconds to wait for the device prompt when checking a session before reuse.
+    """
+
+    enabled: bool = Field(default=True)
+    max_sessions: int = Field(default=2, ge=1)
+    idle_timeout: int = Field(default=300, ge=1)
+    probe_timeout: int = Field(default=5, ge=1)
+
+
+class DevicesConfig(BaseModel):
+    """Configuration for connections to the network devices.
+
+    Attributes:
+        pool (ConnectionPoolConfig): Device connection pool configuration.
+        coalesce (str): Coalesce identical in-flight commands: off, local (per worker) or redis (across workers).
+    """
+
+    pool: ConnectionPoolConfig = Field(default_factory=ConnectionPoolConfig)
+    coalesce: Literal["off", "local", "redis"] = Field(default="local")
+
+
+class CommunitiesConfig(BaseModel):
+    """Configuration for the BGP community maps.
+
+    Attributes:
+        reload_interval (int): Seconds between checks for changed mapping files, 0 to disable.
+    """
+
+    reload_interval: int = Field(default=30, ge=0)
+
+
+class Pfx2AsConfig(BaseModel):
+    """Configuration for the local IP to ASN lookups.
+
+    Attributes:
+        file (str): Prefix to AS file (pfx2as or prefix and ASN per line, optionally gzip compressed), None to disable.
+        reload_interval (int): Seconds between checks for a changed file, 0 to disable.
+        cymru_fallback (bool): Look up addresses not covered by the file with Team Cymru.
+    """
+
+    file: str | None = None
+    reload_interval: int = Field(default=300, ge=0)
+    cymru_fallback: bool = True
+
+
+class AsnInfoConfig(BaseModel):
+    """Configuration for the ASN information lookups.
+
+    Attributes:
+        database (str): Local store of AS Rank ASN information, built with python -m lgapi.asninfo refresh.
+        api_fallback (bool): Look up ASNs not in the local store with the AS Rank API.
+        api_url (str): AS Rank GraphQL API URL.
+        batch_window (float): Seconds to collect ASNs for one AS Rank API request.
+        batch_size (int): Most ASNs in one AS Rank API request.
+    """
+
+    database: str | None = "mapsdb/asninfo.db"
+    api_fallback: bool = True
+    api_url: str = "https://api.asrank.caida.org/v2/graphql"
+    batch_window: float = Field(default=0.01, ge=0)
+    batch_size: int = Field(default=100, ge=1)
+
+
+class DnsConfig(BaseModel):
+    """Configuration for the DNS resolver used for reverse DNS and Team Cymru lookups.
+
+    Attributes:
+        nameservers (list[str]): Name server addresses, the system resolvers from /etc/resolv.conf if empty.
+        port (int): Name server port.
+        timeout (float): Seconds to wait for each name server to answer.
+        lifetime (float): Seconds to spend on a query in total, across name servers and retries.
+        max_queries (int): Most queries in flight per worker, further queries wait.
+    """
+
+    nameservers: list[str] = Field(default_factory=list)
+    port: int = Field(default=53, ge=1, le=65535)
+    timeout: float = Field(default=2.0, gt=0)
+    lifetime: float = Field(default=5.0, gt=0)
+    max_queries: int = Field(default=100, ge=1)
+
+
+class EnrichmentConfig(BaseModel):
+    """Configuration for enriching BGP and traceroute results with lookups.
+
+    Attributes:
+        budget (float): Seconds a response waits for its DNS, Team Cymru and AS Rank lookups, 0 to wait for all.
+    """
+
+    budget: float = Field(default=0.5, ge=0)
+
+
+class ParsingConfig(BaseModel):
+    """Configuration for parsing device output.
+
+    Attributes:
+        executor (str): Where large outputs are parsed: inline, thread (pool) or process (pool).
+        workers (int): Number of parse pool threads or processes per worker.
+        offload_min_size (int): Output size in characters from which parsing is moved to the pool.
+        native (bool): Use the native parsers for the shipped templates, TTP parses everything when disabled.
+        cache_size (int): Number of parsed outputs kept per worker, so cached outputs are not parsed again.
+        cache_ttl (int): Seconds a parsed output is kept.
+        cache_max_output (int): Largest output in characters whose parsed result is cached.
+    """
+
+    executor: Literal["inline", "thread", "process"] = Field(default="thread")
+    workers: int = Field(default=2, ge=1)
+    offload_min_size: int = Field(default=32768, ge=0)
+    native: bool = True
+    cache_size: int = Field(default=256, ge=0)
+    cache_ttl: int = Field(default=600, ge=0)
+    cache_max_output: int = Field(default=131072, ge=0)
+
+
+class AdminConfig(BaseModel):
+    """Configuration for the admin endpoints.
+
+    Attributes:
+        api_key (str | None): Key required in the X-API-Key header, admin endpoints are disabled when unset.
+    """
+
+    api_key: str | None = None
+
+
 class LimitsConfig(BaseModel):
     """Configuration for command limits.
 
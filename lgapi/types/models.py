@@ -5,7 +5,7 @@
 # have been included as part of this distribution.
 #
 """Models used for API output"""
-from typing import Annotated, Union
+from typing import Annotated, Literal, Union
 
 from annotated_types import Len
 from pydantic import AfterValidator, BaseModel, Field, IPvAnyAddress, IPvAnyNetwork
@@ -58,6 +58,13 @@ class MultiBgpBody(BaseModel):
     ]
 
 
+class JobBody(BaseModel):
+    """Request body for single location jobs"""
+
+    location: LocationStr
+    destination: DestIPNet
+
+
 # Base models
 #
 class BaseResult(BaseModel):
@@ -69,6 +76,9 @@ class BaseResult(BaseModel):
     location: str | None = None
     location_name: str | None = None
     raw_only: bool = False
+    incomplete: list[str] = Field(
+        default_factory=list, description="Enrichment fields left out of results, their lookups passed the deadline"
+    )
 
 
 class BaseLocation(BaseModel):
@@ -221,6 +231,23 @@ class TracerouteResult(BaseResult):
     parsed_output: list[TracerouteData] | None
 
 
+# Job output
+#
+class JobResult(BaseModel):
+    """Background job status and result"""
+
+    id: Annotated[str, Field(description="Job ID")]
+    command: str
+    status: Annotated[
+        Literal["pending", "running", "complete", "failed"],
+        Field(description="Job status, the result is set once the job is complete"),
+    ]
+    created: Annotated[float, Field(description="Job creation time as a UNIX timestamp")]
+    updated: Annotated[float, Field(description="Last status change as a UNIX timestamp")]
+    error: str | None = None
+    result: PingResult | TracerouteResult | BgpResult | MultiPingResult | MultiBgpResult | None = None
+
+
 # Location output
 #
 class LocationResponse(BaseModel):
@@ -239,3 +266,48 @@ class LocationRegionResponse(BaseModel):
 
     name: Annotated[str, Field(description="Region name", examples=["Western Europe", "Asia"])]
     locations: list[LocationResponse]
+
+
+# Admin output
+#
+class LimiterStats(BaseModel):
+    """Device concurrency limiter statistics for a location"""
+
+    location: str
+    max_concurrent: int
+    max_queue: int
+    max_wait: float
+    active: Annotated[int, Field(description="Commands currently running on the device")]
+    queue_depth: Annotated[int, Field(description="Commands currently waiting for a free slot")]
+    admitted: int
+    queued: Annotated[int, Field(description="Commands that had to wait for a free slot")]
+    wait_time_avg: Annotated[float, Field(description="Average wait in seconds of queued commands")]
+    wait_time_max: float
+    rejected_queue_full: int
+    rejected_timeout: int
+
+
+class CommunityMapStats(BaseModel):
+    """Loaded BGP community map details for a worker"""
+
+    generation: Annotated[str | None, Field(description="Hash of the mapping files the map was built from")]
+    files: Annotated[int, Field(description="Number of mapping files loaded")]
+    entries: Annotated[int, Field(description="Number of exact community descriptions loaded")]
+    patterns: Annotated[int, Field(description="Number of community pattern descriptions loaded")]
+    loaded: Annotated[float | None, Field(description="Time the map was loaded")]
+
+
+class ParseStats(BaseModel):
+    """Device output parsing statistics for a worker"""
+
+    executor: str
+    native: Annotated[bool, Field(description="Native parsers are used for the shipped templates")]
+    workers: int
+    offload_min_size: int
+    cached: Annotated[int, Field(description="Outputs served from the parsed result cache")]
+    inline: Annotated[int, Field(description="Outputs parsed on the event loop")]
+    offloaded: Annotated[int, Field(description="Outputs parsed in the parse pool")]
+    queue_time_avg: Annotated[float, Field(description="Average seconds offloaded parses waited for the pool")]
+    queue_time_max: float
+    parse_time_avg: Annotated[float, Field(description="Average seconds spent parsing")]
+    parse_time_max: float
@@ -17,8 +17,8 @@ class CmdResult(TypedDict):
 
 
 class LocationResult(TypedDict):
-    """Location result for multi-commands"""
+    """Location result for multi-commands, outputs and errors by destination"""
 
     location: str
-    result: str
-    errors: list[str]
+    outputs: dict[str, str]
+    errors: dict[str, str]
@@ -0,0 +1,17 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import pytest
+
+from lgapi import decorators
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    """Start and end each test with an empty in-process lookup cache."""
+    decorators.local_cache.clear()
+    yield
+    decorators.local_cache.clear()
@@ -0,0 +1,92 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+
+from starlette.requests import Request
+
+from lgapi.admission import ConcurrencyLimiter, DeviceBusyError
+from lgapi.config import settings
+from lgapi.main import device_busy_handler
+from lgapi.types.config import ConcurrencyConfig
+
+LOCATION = next(iter(settings.locations))
+
+
+def rejection(limiter: ConcurrencyLimiter) -> DeviceBusyError:
+    """Hold the only slot, fill the queue, and get the error of the command rejected after that."""
+
+    async def run():
+        await limiter.acquire()
+        queued = [asyncio.create_task(limiter.acquire()) for _ in range(limiter.config.max_queue)]
+        await asyncio.sleep(0)
+        try:
+            await limiter.acquire()
+        except DeviceBusyError as err:
+            return err
+        finally:
+            for task in queued:
+                task.cancel()
+            await asyncio.gather(*queued, return_exceptions=True)
+
+    return asyncio.run(run())
+
+
+def busy_response(err: DeviceBusyError):
+    request = Request({"type": "http", "method": "GET", "path": "/ping", "headers": [], "query_string": b""})
+    return asyncio.run(device_busy_handler(request, err))
+
+
+def test_full_queue_is_rejected_with_429():
+    limiter = ConcurrencyLimiter(LOCATION, ConcurrencyConfig(max_concurrent=1, max_queue=2, max_wait=5))
+    err = rejection(limiter)
+
+    assert err.queue_full
+    assert limiter.stats()["rejected_queue_full"] == 1
+
+    response = busy_response(err)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_queue_timeout_is_rejected_with_503():
+    limiter = ConcurrencyLimiter(LOCATION, ConcurrencyConfig(max_concurrent=1, max_queue=2, max_wait=0.05))
+
+    async def run():
+        await limiter.acquire()
+        try:
+            await limiter.acquire()
+        except DeviceBusyError as err:
+            return err
+
+    err = asyncio.run(run())
+    assert not err.queue_full
+    assert limiter.stats()["rejected_timeout"] == 1 and limiter.stats()["queue_depth"] == 0
+
+    response = busy_response(err)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_queued_commands_are_admitted_in_order():
+    limiter = ConcurrencyLimiter(LOCATION, ConcurrencyConfig(max_concurrent=1, max_queue=10, max_wait=5))
+    admitted = []
+
+    async def command(number: int):
+        async with limiter.slot():
+            admitted.append(number)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        tasks = []
+        for number in range(5):
+            tasks.append(asyncio.create_task(command(number)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert admitted == [0, 1, 2, 3, 4]
+    assert limiter.stats()["active"] == 0 and limiter.stats()["queued"] == 4
@@ -0,0 +1,94 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import gzip
+import json
+
+from lgapi import asninfo
+from lgapi.asninfo import close_store, lookup_asns, refresh
+from lgapi.config import settings
+from lgapi.processing import asrank
+from lgapi.processing.budget import EnrichmentBudget
+
+ASNS = [
+    {
+        "asn": "64500",
+        "asnName": "EXAMPLE-NET",
+        "rank": 1234,
+        "organization": {"orgName": "Example Networks"},
+        "country": {"iso": "GB", "name": "United Kingdom"},
+    },
+    {
+        "asn": "64501",
+        "asnName": "OTHER-NET",
+        "rank": 99,
+        "organization": {"orgName": "Other Networks"},
+        "country": {"iso": "NL", "name": "Netherlands"},
+    },
+]
+
+
+def write_dump(tmp_path) -> str:
+    filepath = tmp_path / "asns.jsonl.gz"
+    with gzip.open(filepath, "wt") as dump_file:
+        for node in ASNS:
+            dump_file.write(json.dumps(node) + "\n")
+    return str(filepath)
+
+
+def test_refresh_from_dump(tmp_path):
+    db_path = str(tmp_path / "asninfo.db")
+
+    assert asyncio.run(refresh(db_path, write_dump(tmp_path))) == 2
+    result = asyncio.run(lookup_asns(db_path, [64500, 64502]))
+
+    assert result == {64500: {field: value for field, value in ASNS[0].items() if field != "asn"}}
+    assert asyncio.run(lookup_asns(str(tmp_path / "missing.db"), [64500])) == {}
+    asyncio.run(close_store())
+
+
+def test_store_connection_is_reused_until_refreshed(tmp_path):
+    db_path = str(tmp_path / "asninfo.db")
+    dump_path = write_dump(tmp_path)
+
+    async def run():
+        await refresh(db_path, dump_path)
+        await lookup_asns(db_path, [64500])
+        first = asninfo.store_con
+        await lookup_asns(db_path, [64501])
+        reused = asninfo.store_con is first
+
+        await refresh(db_path, dump_path)
+        result = await lookup_asns(db_path, [64500])
+        reopened = asninfo.store_con is not first
+        await close_store()
+        return reused, reopened, result
+
+    reused, reopened, result = asyncio.run(run())
+    assert reused and reopened
+    assert result[64500]["asnName"] == "EXAMPLE-NET"
+
+
+def test_store_misses_use_the_api(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "asninfo.db")
+    asyncio.run(refresh(db_path, write_dump(tmp_path)))
+    requested = []
+
+    async def api_batch(asns, httpclient):
+        requested.extend(asns)
+        return {asn: {} for asn in asns}
+
+    monkeypatch.setattr(settings.asninfo, "database", db_path)
+    monkeypatch.setattr(asrank.get_asn_information, "batch", api_batch)
+
+    result = asyncio.run(asrank.asn_information({64500, 64501, 64502}, None, EnrichmentBudget(None)))
+    assert requested == [64502]
+    assert result[64501]["asnName"] == "OTHER-NET" and result[64502] == {}
+
+    monkeypatch.setattr(settings.asninfo, "api_fallback", False)
+    assert 64502 not in asyncio.run(asrank.asn_information({64500, 64502}, None, EnrichmentBudget(None)))
+    asyncio.run(close_store())
@@ -0,0 +1,119 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from httpx import AsyncClient
+
+from lgapi.batchloader import BatchLoader
+from lgapi.config import settings
+from lgapi.processing import asrank
+
+ALIAS_REGEX = re.compile(r'a(\d+): asn\(asn:"(\d+)"\)')
+
+
+class AsRankStub(BaseHTTPRequestHandler):
+    """AS Rank GraphQL API answering aliased asn queries, ASNs above 64510 are unknown."""
+
+    queries: list[str] = []
+
+    def do_POST(self):
+        query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["query"]
+        self.queries.append(query)
+        data = {}
+        for alias, asn in ALIAS_REGEX.findall(query):
+            data[f"a{alias}"] = None if int(asn) > 64510 else {"asnName": f"AS{asn}-NET", "rank": int(asn) - 64000}
+
+        body = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_stub(monkeypatch) -> ThreadingHTTPServer:
+    AsRankStub.queries = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AsRankStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings.asninfo, "api_url", f"http://127.0.0.1:{server.server_port}/v2/graphql")
+    return server
+
+
+def test_asns_are_fetched_with_one_request(monkeypatch):
+    server = run_stub(monkeypatch)
+
+    async def run():
+        async with AsyncClient() as httpclient:
+            return await asrank.fetch_asn_information([64500, 64501, 64600], httpclient)
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert len(AsRankStub.queries) == 1
+    assert result == {
+        64500: {"asnName": "AS64500-NET", "rank": 500},
+        64501: {"asnName": "AS64501-NET", "rank": 501},
+        64600: {},
+    }
+
+
+def test_concurrent_lookups_share_a_request(monkeypatch):
+    server = run_stub(monkeypatch)
+
+    async def run():
+        loader = BatchLoader(asrank.fetch_asn_information, window=0.05, max_size=100)
+        async with AsyncClient() as httpclient:
+            # Two responses looking up overlapping ASNs at about the same time.
+            first = asyncio.gather(*(loader.load(asn, httpclient) for asn in (64500, 64501)))
+            await asyncio.sleep(0.01)
+            second = asyncio.gather(*(loader.load(asn, httpclient) for asn in (64501, 64502, 64700)))
+            return await first, await second
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    assert len(AsRankStub.queries) == 1
+    assert ALIAS_REGEX.findall(AsRankStub.queries[0]) == [(str(asn), str(asn)) for asn in (64500, 64501, 64502, 64700)]
+    assert [info["rank"] for info in first] == [500, 501]
+    assert second[1]["rank"] == 502 and second[2] == {}
+
+
+def test_full_batches_are_loaded_at_once():
+    calls = []
+
+    async def load_many(items):
+        calls.append(items)
+        return {item: item * 2 for item in items}
+
+    async def run():
+        loader = BatchLoader(load_many, window=10, max_size=3)
+        return await asyncio.wait_for(asyncio.gather(*(loader.load(item) for item in range(3))), timeout=1)
+
+    assert asyncio.run(run()) == [0, 2, 4]
+    assert calls == [[0, 1, 2]]
+
+
+def test_errors_reach_every_caller():
+    async def load_many(items):
+        raise OSError("connection refused")
+
+    async def run():
+        loader = BatchLoader(load_many, window=0, max_size=10)
+        return await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert all(isinstance(result, OSError) for result in asyncio.run(run()))
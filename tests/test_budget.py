@@ -0,0 +1,146 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import time
+
+from lgapi import decorators
+from lgapi.config import settings
+from lgapi.processing.budget import EnrichmentBudget, background_lookups
+
+
+class RecordingCache:
+    """Cache backend missing every read and recording every write."""
+
+    def __init__(self):
+        self.writes = []
+
+    async def multi_get(self, keys):
+        return [None] * len(keys)
+
+    async def set(self, key, value, ttl=None):
+        self.writes.append([(key, value)])
+
+    async def multi_set(self, pairs, ttl=None):
+        self.writes.append(list(pairs))
+
+
+def make_lookup(finished: list, delays: dict, cached: dict | None = None):
+    """A request cached style lookup, slow for the items given a delay and failing for those starting bad."""
+    cached = cached or {}
+
+    async def lookup(item: str) -> str:
+        await asyncio.sleep(delays.get(item, 0))
+        if item.startswith("bad"):
+            raise ValueError(item)
+        finished.append(item)
+        return item.upper()
+
+    async def batch(items, *args) -> dict:
+        return {item: await lookup(item, *args) for item in items}
+
+    async def lookup_cached(items, *args) -> tuple[dict, list]:
+        return {item: cached[item] for item in items if item in cached}, [item for item in items if item not in cached]
+
+    async def store(fetched, *args) -> None:
+        lookup.stored.append(fetched)
+
+    lookup.batch = batch
+    lookup.lookup_cached = lookup_cached
+    lookup.fetch = lookup
+    lookup.store = store
+    lookup.stored = []
+    return lookup
+
+
+def test_partial_results_at_the_deadline():
+    finished = []
+    lookup = make_lookup(finished, {"slow": 0.2})
+
+    async def run():
+        budget = EnrichmentBudget.from_now(0.05)
+        start = time.monotonic()
+        results = await budget.lookup("fqdn", lookup, ["fast", "slow", "fast"])
+        elapsed = time.monotonic() - start
+
+        # The slow lookup carries on after the response, to fill the cache.
+        assert len(background_lookups) == 1
+        await asyncio.gather(*background_lookups)
+        return results, budget.incomplete, elapsed
+
+    results, incomplete, elapsed = asyncio.run(run())
+    assert results == {"fast": "FAST"}
+    assert incomplete == {"fqdn"}
+    assert elapsed < 0.15
+    assert sorted(finished) == ["fast", "slow"]
+    assert lookup.stored == [{"fast": "FAST"}, {"slow": "SLOW"}]
+    assert not background_lookups
+
+
+def test_no_deadline_waits_for_every_lookup():
+    finished = []
+    lookup = make_lookup(finished, {"slow": 0.05})
+    budget = EnrichmentBudget.from_now(0)
+
+    assert asyncio.run(budget.lookup("info", lookup, ["fast", "slow"])) == {"fast": "FAST", "slow": "SLOW"}
+    assert budget.deadline is None and not budget.incomplete
+
+
+def test_lookups_after_the_deadline_do_not_wait():
+    finished = []
+    lookup = make_lookup(finished, {"late": 0.05})
+
+    async def run():
+        budget = EnrichmentBudget(time.monotonic() - 1)
+        results = await budget.lookup("asrank", lookup, ["late"])
+        await asyncio.gather(*background_lookups)
+        return results, budget.incomplete
+
+    results, incomplete = asyncio.run(run())
+    assert results == {} and incomplete == {"asrank"}
+    assert finished == ["late"]
+
+
+def test_cached_results_are_returned_after_the_deadline():
+    finished = []
+    lookup = make_lookup(finished, {}, cached={"hit": "CACHED"})
+    budget = EnrichmentBudget(time.monotonic() - 1)
+
+    assert asyncio.run(budget.lookup("fqdn", lookup, ["hit"])) == {"hit": "CACHED"}
+    assert not budget.incomplete and not finished
+
+
+def test_failed_lookups_mark_the_field_incomplete():
+    finished = []
+    lookup = make_lookup(finished, {})
+    budget = EnrichmentBudget.from_now(1)
+
+    assert asyncio.run(budget.lookup("info", lookup, ["good", "bad"])) == {"good": "GOOD"}
+    assert budget.incomplete == {"info"}
+
+
+def test_misses_are_written_with_one_batched_write(monkeypatch):
+    cache = RecordingCache()
+    monkeypatch.setattr(settings.cache, "enabled", True)
+    monkeypatch.setattr(settings.cache.local, "enabled", False)
+    monkeypatch.setattr(decorators.caches, "get", lambda alias: cache)
+
+    @decorators.request_cache(alias="default", ttl=3600, key_builder=lambda func, ip: f"ip2asn:test:{ip}")
+    async def lookup(ip):
+        await asyncio.sleep(0.2 if ip.endswith(".9") else 0)
+        return {"ip": ip}
+
+    async def run():
+        budget = EnrichmentBudget.from_now(0.05)
+        results = await budget.lookup("info", lookup, ["192.0.2.1", "192.0.2.2", "192.0.2.9", "192.0.2.10"])
+        writes = list(cache.writes)
+        await asyncio.gather(*background_lookups)
+        return results, writes
+
+    results, writes = asyncio.run(run())
+    assert sorted(results) == ["192.0.2.1", "192.0.2.10", "192.0.2.2"]
+    assert writes == [[(f"ip2asn:test:{ip}", {"ip": ip}) for ip in ("192.0.2.1", "192.0.2.2", "192.0.2.10")]]
+    assert cache.writes[1:] == [[("ip2asn:test:192.0.2.9", {"ip": "192.0.2.9"})]]
@@ -0,0 +1,123 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+from fnmatch import fnmatchcase
+
+from aiocache import SimpleMemoryCache
+
+from lgapi import cache, decorators
+from lgapi.config import settings
+
+
+class FakeRedis:
+    """The Redis client commands used to manage cache generations, on a dict of byte keys."""
+
+    def __init__(self, keys: list[str]):
+        self.entries = {key.encode(): b"value" for key in keys}
+
+    async def scan_iter(self, match: str, count: int):
+        for key in list(self.entries):
+            if fnmatchcase(key.decode(), match):
+                yield key
+
+    async def unlink(self, *keys):
+        return sum(self.entries.pop(key, None) is not None for key in keys)
+
+    async def getset(self, key: str, value: str):
+        previous = self.entries.get(key.encode())
+        self.entries[key.encode()] = value.encode()
+        return previous
+
+
+class FakeCache:
+    def __init__(self, keys: list[str]):
+        self.client = FakeRedis(keys)
+
+
+def use_redis(monkeypatch, keys: list[str]) -> FakeRedis:
+    fake = FakeCache([f"{settings.cache.redis.namespace}:{key}" for key in keys])
+    monkeypatch.setattr(settings.cache, "enabled", True)
+    monkeypatch.setattr(cache.caches, "get", lambda alias: fake)
+    return fake.client
+
+
+def remaining(client: FakeRedis) -> set[str]:
+    namespace = f"{settings.cache.redis.namespace}:"
+    return {key.decode().removeprefix(namespace) for key in client.entries if key.startswith(namespace.encode())}
+
+
+def test_version_bump_starts_a_new_generation(monkeypatch):
+    before = cache.asn_key_builder(None, 64500), cache.command_key_builder(None, "AMS", "bgp", "192.0.2.0/24")
+
+    monkeypatch.setattr(cache, "LOOKUP_GENERATION", cache.build_generation(cache.LOOKUP_CACHE_VERSION + 1, "json"))
+    monkeypatch.setattr(cache, "COMMAND_GENERATION", cache.build_generation(cache.COMMAND_CACHE_VERSION + 1))
+    after = cache.asn_key_builder(None, 64500), cache.command_key_builder(None, "AMS", "bgp", "192.0.2.0/24")
+
+    assert before[0] != after[0] and before[1] != after[1]
+    assert after[0].startswith(f"asninfo:{cache.LOOKUP_GENERATION}:")
+    assert after[1].startswith(f"command:{cache.COMMAND_GENERATION}:")
+
+
+def test_values_from_an_old_generation_are_not_read(monkeypatch):
+    monkeypatch.setattr(settings.cache, "enabled", True)
+    monkeypatch.setattr(settings.cache.local, "enabled", False)
+    monkeypatch.setattr(decorators.caches, "get", lambda alias: SimpleMemoryCache())
+    calls = []
+
+    @decorators.request_cache(alias="default", ttl=3600, key_builder=cache.asn_key_builder)
+    async def lookup(asn):
+        calls.append(cache.LOOKUP_GENERATION)
+        return {"asn": asn}
+
+    async def run():
+        await lookup(64500)
+        await lookup(64500)
+        monkeypatch.setattr(cache, "LOOKUP_GENERATION", cache.build_generation(cache.LOOKUP_CACHE_VERSION + 1, "json"))
+        await lookup(64500)
+
+    generation = cache.LOOKUP_GENERATION
+    asyncio.run(run())
+    assert calls == [generation, cache.LOOKUP_GENERATION]
+
+
+def test_collection_only_unlinks_older_generations(monkeypatch):
+    current = [
+        cache.asn_key_builder(None, 64500),
+        cache.ip_to_asn_key_builder(None, "192.0.2.1"),
+        cache.command_key_builder(None, "AMS", "bgp", "192.0.2.0/24"),
+    ]
+    old = ["asninfo:0ld0ld00:64500", "rev_dns:0ld0ld00:192.0.2.1", "command:0ld0ld00:AMS_bgp_192.0.2.0/24"]
+    client = use_redis(monkeypatch, current + old + [cache.job_key("abc123")])
+
+    asyncio.run(cache.collect_old_generations())
+    assert remaining(client) == set(current + [cache.job_key("abc123"), "cache:generation"])
+
+    # Another worker starting on the same generation leaves everything alone.
+    client.entries[f"{settings.cache.redis.namespace}:{old[0]}".encode()] = b"value"
+    asyncio.run(cache.collect_old_generations())
+    assert old[0] in remaining(client)
+
+
+def test_flush_keeps_jobs(monkeypatch):
+    keys = [
+        cache.asn_key_builder(None, 64500),
+        cache.reverse_dns_key_builder(None, "192.0.2.1"),
+        cache.command_key_builder(None, "AMS", "bgp", "192.0.2.0/24"),
+        "asninfo:0ld0ld00:64500",
+    ]
+    client = use_redis(monkeypatch, keys + [cache.job_key("abc123")])
+
+    assert asyncio.run(cache.flush_cache()) == len(keys)
+    assert remaining(client) == {cache.job_key("abc123")}
+
+
+def test_unlink_keys_works_in_batches(monkeypatch):
+    monkeypatch.setattr(cache, "SCAN_BATCH", 2)
+    client = use_redis(monkeypatch, [f"ip2asn:0ld0ld00:192.0.2.{host}" for host in range(5)])
+
+    assert asyncio.run(cache.unlink_keys(("ip2asn",))) == 5
+    assert not remaining(client)
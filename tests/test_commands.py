@@ -0,0 +1,75 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+from types import SimpleNamespace
+
+from lgapi import commands
+from lgapi.config import settings
+
+LOCATION = next(iter(settings.locations))
+
+
+def use_device(monkeypatch, outputs: dict, cached: dict | None = None) -> tuple[list, list]:
+    """Fake the device and command cache, returning the device calls and stored outputs."""
+    calls, stored = [], []
+    cached = cached or {}
+
+    async def execute_many_on_device(hostname, device_type, cli_commands, auth_group, timeout):
+        calls.append(cli_commands)
+        await asyncio.sleep(0.01)
+        responses = []
+        for cli_command in cli_commands:
+            output = next(output for dest, output in outputs.items() if dest in cli_command)
+            responses.append(output if isinstance(output, Exception) else SimpleNamespace(result=output))
+        return responses
+
+    async def lookup(location, command, destination):
+        return cached.get(destination)
+
+    async def store(value, location, command, destination):
+        stored.append(destination)
+
+    monkeypatch.setattr(commands, "execute_many_on_device", execute_many_on_device)
+    monkeypatch.setattr(commands.execute_single_command, "lookup", lookup)
+    monkeypatch.setattr(commands.execute_single_command, "store", store)
+    return calls, stored
+
+
+def test_only_cache_misses_run_on_the_device(monkeypatch):
+    calls, stored = use_device(monkeypatch, {"192.0.2.2": "output 2"}, cached={"192.0.2.1": "cached 1"})
+
+    result = asyncio.run(commands.run_for_location(LOCATION, "ping", ["192.0.2.1", "192.0.2.2"]))
+
+    assert result["outputs"] == {"192.0.2.1": "cached 1", "192.0.2.2": "output 2"}
+    assert not result["errors"]
+    assert len(calls) == 1 and len(calls[0]) == 1
+    assert stored == ["192.0.2.2"]
+
+
+def test_completed_outputs_are_kept_when_a_command_fails(monkeypatch):
+    calls, stored = use_device(monkeypatch, {"192.0.2.1": "output 1", "192.0.2.2": TimeoutError("timed out")})
+
+    result = asyncio.run(commands.run_for_location(LOCATION, "ping", ["192.0.2.1", "192.0.2.2"]))
+
+    assert len(calls) == 1 and len(calls[0]) == 2
+    assert result["outputs"] == {"192.0.2.1": "output 1"}
+    assert result["errors"] == {"192.0.2.2": "Error getting output from network device"}
+    assert stored == ["192.0.2.1"]
+
+
+def test_concurrent_requests_share_device_commands(monkeypatch):
+    calls, _ = use_device(monkeypatch, {"192.0.2.1": "output 1", "192.0.2.2": "output 2"})
+
+    async def run():
+        return await asyncio.gather(
+            commands.run_for_location(LOCATION, "ping", ["192.0.2.1", "192.0.2.2"]),
+            commands.run_for_location(LOCATION, "ping", ["192.0.2.2", "192.0.2.1"]),
+        )
+
+    first, second = asyncio.run(run())
+    assert first["outputs"] == second["outputs"] == {"192.0.2.1": "output 1", "192.0.2.2": "output 2"}
+    assert sum(len(cli_commands) for cli_commands in calls) == 2
@@ -0,0 +1,68 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+from lgapi.communities import CommunityIndex, parse_pattern
+
+
+def test_parse_patterns():
+    assert parse_pattern("3356:2xxx") == (3356, [(2000, 2999)])
+    assert parse_pattern("1299:[20000-29999]") == (1299, [(20000, 29999)])
+    assert parse_pattern("1299:2:[100-199]") == (1299, [(2, 2), (100, 199)])
+    assert parse_pattern("large:1299:xx:5") == (1299, [(0, 99), (5, 5)])
+    assert parse_pattern("3356:2x5x") is None
+    assert parse_pattern("1299:[30-20]") is None
+    assert parse_pattern("AS1299:2xxx") is None
+
+
+def test_exact_match_takes_precedence_over_patterns():
+    index = CommunityIndex([("3356:2xxx", "Europe", 0), ("3356:2001", "London", 0)])
+    assert index.get("3356:2001") == "London"
+    assert index.get("3356:2002") == "Europe"
+    assert index.get("3356:3000") is None
+    assert index.get("174:2001") is None
+
+
+def test_overlapping_patterns():
+    index = CommunityIndex(
+        [
+            ("1299:[20000-29999]", "Customer", 0),
+            ("1299:25xxx", "Customer Europe", 0),
+            ("1299:2xxxx", "Override", 1),
+            ("1299:[25100-25199]", "Narrow", 0),
+        ]
+    )
+    assert index.get("1299:25150") == "Override"
+    assert index.get("1299:19999") is None
+    assert len(index) == 4
+
+
+def test_narrower_pattern_wins_within_a_file():
+    index = CommunityIndex([("1299:[20000-29999]", "Customer", 0), ("1299:25xxx", "Customer Europe", 0)])
+    assert index.get("1299:20000") == "Customer"
+    assert index.get("1299:25000") == "Customer Europe"
+    assert index.get("1299:25999") == "Customer Europe"
+    assert index.get("1299:26000") == "Customer"
+
+
+def test_large_communities():
+    index = CommunityIndex(
+        [
+            ("1299:2:[100-199]", "Peer", 0),
+            ("1299:[1-3]:150", "Special", 0),
+            ("1299:5:5", "Exact", 0),
+        ]
+    )
+    assert index.get("1299:2:100") == "Peer"
+    assert index.get("large:1299:2:150") == "Special"
+    assert index.get("1299:3:150") == "Special"
+    assert index.get("1299:3:151") is None
+    assert index.get("large:1299:5:5") == "Exact"
+    assert index.get("1299:150") is None
+
+
+def test_lookup_skips_unmapped_and_invalid_communities():
+    index = CommunityIndex([("3356:2xxx", "Europe", 0), ("3356:bad[", "Invalid", 0)])
+    assert index.lookup({"3356:2500", "3356:9", "target:1:2", "no-export"}) == {"3356:2500": "Europe"}
@@ -0,0 +1,156 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import fcntl
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from lgapi import database
+
+
+def use_tmp_db(monkeypatch, tmp_path: Path) -> tuple[Path, Path]:
+    """Build the database in tmp_path, from its asns and override directories."""
+    asns, override = tmp_path / "asns", tmp_path / "override"
+    asns.mkdir()
+    override.mkdir()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "maps.db"))
+    monkeypatch.setattr(database, "LOCK_PATH", str(tmp_path / "maps.db.lock"))
+    monkeypatch.setattr(database, "SOURCE_DIRS", ((str(asns), 0), (str(override), 1)))
+    return asns, override
+
+
+def write_map(path: Path, content: str, mtime: float) -> None:
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def stored_communities() -> dict[str, str]:
+    with sqlite3.connect(database.DB_PATH) as db_con:
+        rows = db_con.execute("SELECT community, name FROM communities ORDER BY priority, source").fetchall()
+    return dict(rows)
+
+
+def test_rebuild_only_reloads_changed_files(monkeypatch, tmp_path):
+    asns, _ = use_tmp_db(monkeypatch, tmp_path)
+    write_map(asns / "1299.txt", "# Arelion\n1299:2xxx Europe\n", 1000)
+    write_map(asns / "3356.txt", "3356:2001 Zürich\n", 1000)
+    write_map(asns / "174.txt", "174:21000 Customer\n", 1000)
+
+    read_files = []
+    read_communities_file = database.read_communities_file
+
+    def recording_read(filepath):
+        read_files.append(os.path.basename(filepath))
+        return read_communities_file(filepath)
+
+    monkeypatch.setattr(database, "read_communities_file", recording_read)
+
+    assert asyncio.run(database.init_community_map_db())
+    assert sorted(read_files) == ["1299.txt", "174.txt", "3356.txt"]
+    assert stored_communities() == {"1299:2xxx": "Europe", "174:21000": "Customer", "3356:2001": "Zürich"}
+
+    # Nothing changed, so the database is left alone.
+    read_files.clear()
+    assert not asyncio.run(database.init_community_map_db())
+    assert not read_files
+
+    write_map(asns / "3356.txt", "3356:2001 London\n3356:2002 Paris\n", 2000)
+    os.remove(asns / "174.txt")
+    # Touched but with the same content, so hashed but not read.
+    write_map(asns / "1299.txt", "# Arelion\n1299:2xxx Europe\n", 2000)
+
+    assert asyncio.run(database.init_community_map_db())
+    assert read_files == ["3356.txt"]
+    assert stored_communities() == {"1299:2xxx": "Europe", "3356:2001": "London", "3356:2002": "Paris"}
+
+    manifest = asyncio.run(database.read_manifest())
+    assert sorted(os.path.basename(path) for path in manifest) == ["1299.txt", "3356.txt"]
+    assert manifest[str(asns / "1299.txt")][1] == 2000
+
+
+def lock_is_held() -> bool:
+    with open(database.LOCK_PATH, "a", encoding="utf-8") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+
+
+def test_rebuild_is_swapped_in_under_the_lock(monkeypatch, tmp_path):
+    asns, _ = use_tmp_db(monkeypatch, tmp_path)
+    write_map(asns / "3356.txt", "3356:2001 London\n", 1000)
+    asyncio.run(database.init_community_map_db())
+    old_inode = os.stat(database.DB_PATH).st_ino
+
+    seen_during_build = []
+    insert_communities_from_dir = database.insert_communities_from_dir
+
+    async def checking_insert(db_cursor, directory, priority, manifest):
+        seen = await insert_communities_from_dir(db_cursor, directory, priority, manifest)
+        # Readers still see the complete old database while the copy is built.
+        seen_during_build.append(
+            (stored_communities(), lock_is_held(), [path.name for path in tmp_path.glob("maps.db.*.tmp")])
+        )
+        return seen
+
+    monkeypatch.setattr(database, "insert_communities_from_dir", checking_insert)
+    write_map(asns / "3356.txt", "3356:2001 London\n3356:2002 Paris\n", 2000)
+
+    assert asyncio.run(database.init_community_map_db())
+    assert seen_during_build[0] == ({"3356:2001": "London"}, True, [f"maps.db.{os.getpid()}.tmp"])
+    assert stored_communities() == {"3356:2001": "London", "3356:2002": "Paris"}
+    assert os.stat(database.DB_PATH).st_ino != old_inode
+    assert not list(tmp_path.glob("maps.db.*.tmp"))
+    assert not lock_is_held()
+
+
+def test_failed_rebuild_keeps_the_old_database(monkeypatch, tmp_path):
+    asns, _ = use_tmp_db(monkeypatch, tmp_path)
+    write_map(asns / "3356.txt", "3356:2001 London\n", 1000)
+    asyncio.run(database.init_community_map_db())
+
+    def failing_read(filepath):
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+    monkeypatch.setattr(database, "read_communities_file", failing_read)
+    write_map(asns / "3356.txt", "3356:2001 Paris\n", 2000)
+
+    with pytest.raises(UnicodeDecodeError):
+        asyncio.run(database.init_community_map_db())
+
+    assert stored_communities() == {"3356:2001": "London"}
+    assert not list(tmp_path.glob("maps.db.*.tmp"))
+    assert not lock_is_held()
+
+
+def test_reload_picks_up_changes_and_keeps_the_map_on_failure(monkeypatch, tmp_path):
+    asns, _ = use_tmp_db(monkeypatch, tmp_path)
+    for name in ("community_map", "community_map_info", "loaded_db"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    write_map(asns / "3356.txt", "3356:2001 London\n", 1000)
+
+    assert asyncio.run(database.reload_community_map())
+    assert database.get_community_map({"3356:2001"}) == {"3356:2001": "London"}
+    assert not asyncio.run(database.reload_community_map())
+
+    write_map(asns / "3356.txt", "3356:2001 Paris\n3356:2xxx Europe\n", 2000)
+    assert asyncio.run(database.reload_community_map())
+    assert database.get_community_map({"3356:2001", "3356:2500"}) == {"3356:2001": "Paris", "3356:2500": "Europe"}
+    generation = database.community_map_info["generation"]
+
+    # A file that can not be read leaves the previous map in place.
+    (asns / "3356.txt").write_bytes(b"3356:2001 \xff\xfe\n")
+    os.utime(asns / "3356.txt", (3000, 3000))
+    asyncio.run(database.try_reload_community_map())
+    assert database.get_community_map({"3356:2001"}) == {"3356:2001": "Paris"}
+    assert database.community_map_info["generation"] == generation
+    assert stored_communities() == {"3356:2001": "Paris", "3356:2xxx": "Europe"}
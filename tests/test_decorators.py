@@ -0,0 +1,158 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import time
+
+from lgapi import decorators
+from lgapi.cache import command_key_builder, command_ttl_builder
+from lgapi.config import settings
+
+
+class FailingCache:
+    """Cache backend that can not be reached."""
+
+    async def get(self, key):
+        raise ConnectionError("Cache unreachable")
+
+    async def set(self, key, value, ttl=None):
+        raise ConnectionError("Cache unreachable")
+
+    async def multi_get(self, keys):
+        raise ConnectionError("Cache unreachable")
+
+    async def multi_set(self, pairs, ttl=None):
+        raise ConnectionError("Cache unreachable")
+
+
+class MemoryCache:
+    """Cache backend holding entries in a dict, without expiry."""
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.entries[key] = value
+
+    async def multi_get(self, keys):
+        return [self.entries.get(key) for key in keys]
+
+    async def multi_set(self, pairs, ttl=None):
+        self.entries.update(pairs)
+
+
+def use_cache(monkeypatch, cache) -> None:
+    monkeypatch.setattr(settings.cache, "enabled", True)
+    monkeypatch.setattr(settings.cache.commands, "enabled", True)
+    monkeypatch.setattr(decorators.caches, "get", lambda alias: cache)
+
+
+def test_command_cache_errors_run_the_command(monkeypatch):
+    use_cache(monkeypatch, FailingCache())
+    calls = []
+
+    @decorators.command_cache(alias="default", key_builder=command_key_builder, ttl_builder=command_ttl_builder)
+    async def run_command(location, command, destination):
+        calls.append(destination)
+        return "output"
+
+    assert asyncio.run(run_command("AMS", "ping", "192.0.2.1")) == "output"
+    assert calls == ["192.0.2.1"]
+
+
+def test_stale_output_is_served_while_one_refresh_runs(monkeypatch):
+    cache = MemoryCache()
+    use_cache(monkeypatch, cache)
+    monkeypatch.setattr(settings.cache.commands, "ttl", 60)
+    monkeypatch.setattr(settings.cache.commands, "stale_ttl", 300)
+    calls = []
+
+    @decorators.command_cache(alias="default", key_builder=command_key_builder, ttl_builder=command_ttl_builder)
+    async def run_command(location, command, destination):
+        calls.append(destination)
+        await asyncio.sleep(0.01)
+        return "fresh"
+
+    key = command_key_builder(run_command, "AMS", "ping", "192.0.2.1")
+    cache.entries[key] = {"value": "stale", "stored": time.time() - 120}
+
+    async def run():
+        results = await asyncio.gather(*(run_command("AMS", "ping", "192.0.2.1") for _ in range(3)))
+        await asyncio.sleep(0.05)
+        return results, await run_command("AMS", "ping", "192.0.2.1")
+
+    stale_results, refreshed = asyncio.run(run())
+    assert stale_results == ["stale"] * 3
+    assert calls == ["192.0.2.1"]
+    assert refreshed == "fresh" and cache.entries[key]["value"] == "fresh"
+
+
+def test_request_cache_errors_run_the_lookup(monkeypatch):
+    use_cache(monkeypatch, FailingCache())
+    monkeypatch.setattr(settings.cache.local, "enabled", False)
+
+    @decorators.request_cache(alias="default", ttl=3600, key_builder=lambda func, ip: f"ip2asn:test:{ip}")
+    async def lookup(ip):
+        return {"asn": 64500}
+
+    assert asyncio.run(lookup("192.0.2.1")) == {"asn": 64500}
+
+
+def test_request_cache_batch_errors_run_the_lookups(monkeypatch):
+    use_cache(monkeypatch, FailingCache())
+    monkeypatch.setattr(settings.cache.local, "enabled", False)
+
+    @decorators.request_cache(alias="default", ttl=3600, key_builder=lambda func, ip: f"ip2asn:test:{ip}")
+    async def lookup(ip):
+        return {"ip": ip}
+
+    results = asyncio.run(lookup.batch(["192.0.2.1", "192.0.2.2"]))
+    assert results == {"192.0.2.1": {"ip": "192.0.2.1"}, "192.0.2.2": {"ip": "192.0.2.2"}}
+
+
+def test_request_cache_store_fills_the_cache(monkeypatch):
+    cache = MemoryCache()
+    use_cache(monkeypatch, cache)
+    monkeypatch.setattr(settings.cache.local, "enabled", True)
+    calls = []
+
+    @decorators.request_cache(alias="default", ttl=3600, key_builder=lambda func, ip: f"ip2asn:test:{ip}")
+    async def lookup(ip):
+        calls.append(ip)
+        return {"ip": ip}
+
+    async def run():
+        before = await lookup.lookup_cached(["192.0.2.1"])
+        await lookup.store({"192.0.2.1": await lookup.fetch("192.0.2.1")})
+        return before, await lookup.lookup_cached(["192.0.2.1", "192.0.2.2"])
+
+    before, after = asyncio.run(run())
+    assert before == ({}, ["192.0.2.1"])
+    assert after == ({"192.0.2.1": {"ip": "192.0.2.1"}}, ["192.0.2.2"])
+    assert calls == ["192.0.2.1"]
+    assert cache.entries == {"ip2asn:test:192.0.2.1": {"ip": "192.0.2.1"}}
+
+
+def test_request_cache_is_off_when_caching_is_disabled(monkeypatch):
+    monkeypatch.setattr(settings.cache, "enabled", False)
+    monkeypatch.setattr(settings.cache.local, "enabled", True)
+    calls = []
+
+    @decorators.request_cache(alias="default", ttl=3600, key_builder=lambda func, ip: f"ip2asn:test:{ip}")
+    async def lookup(ip):
+        calls.append(ip)
+        return {"ip": ip}
+
+    async def run():
+        await lookup("192.0.2.1")
+        await lookup("192.0.2.1")
+
+    asyncio.run(run())
+    assert calls == ["192.0.2.1", "192.0.2.1"]
+    assert len(decorators.local_cache) == 0
@@ -0,0 +1,98 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+
+from aiocache import SimpleMemoryCache
+
+from lgapi import jobs
+
+
+class FailingCache:
+    """Cache backend that can not be reached."""
+
+    async def get(self, key):
+        raise ConnectionError("Cache unreachable")
+
+    async def set(self, key, value, ttl=None):
+        raise ConnectionError("Cache unreachable")
+
+
+def use_cache(monkeypatch, cache) -> None:
+    monkeypatch.setattr(jobs.caches, "get", lambda alias: cache)
+
+
+async def wait_for_jobs() -> None:
+    await asyncio.gather(*jobs.running_jobs, return_exceptions=True)
+
+
+def test_submitted_job_completes(monkeypatch):
+    use_cache(monkeypatch, SimpleMemoryCache())
+
+    async def runner():
+        await asyncio.sleep(0.01)
+        return {"output": "done"}
+
+    async def run():
+        job = await jobs.submit_job("ping", runner)
+        pending = await jobs.get_job(job["id"])
+        await wait_for_jobs()
+        return pending, await jobs.get_job(job["id"])
+
+    pending, complete = asyncio.run(run())
+    assert pending["status"] in ("pending", "running")
+    assert complete["status"] == "complete" and complete["result"] == {"output": "done"}
+    assert complete["error"] is None
+
+
+def test_failed_job(monkeypatch):
+    use_cache(monkeypatch, SimpleMemoryCache())
+
+    async def runner():
+        raise OSError("connection refused")
+
+    async def run():
+        job = await jobs.submit_job("traceroute", runner)
+        await wait_for_jobs()
+        return await jobs.get_job(job["id"])
+
+    job = asyncio.run(run())
+    assert job["status"] == "failed" and job["result"] is None
+    assert job["error"] == "Error executing command 'traceroute'"
+
+
+def test_jobs_expire(monkeypatch):
+    use_cache(monkeypatch, SimpleMemoryCache())
+    monkeypatch.setattr(jobs, "JOB_TTL", 0.05)
+
+    async def runner():
+        return {}
+
+    async def run():
+        job = await jobs.submit_job("bgp", runner)
+        await wait_for_jobs()
+        found = await jobs.get_job(job["id"])
+        await asyncio.sleep(0.1)
+        return found, await jobs.get_job(job["id"])
+
+    found, expired = asyncio.run(run())
+    assert found is not None and expired is None
+
+
+def test_cache_errors_do_not_fail_jobs(monkeypatch):
+    use_cache(monkeypatch, FailingCache())
+
+    async def runner():
+        return {}
+
+    async def run():
+        job = await jobs.submit_job("ping", runner)
+        await wait_for_jobs()
+        return job, await jobs.get_job(job["id"])
+
+    job, polled = asyncio.run(run())
+    assert job["status"] == "complete"
+    assert polled is None
@@ -0,0 +1,169 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from lgapi.config import settings
+from lgapi.native_parsers import NATIVE_PARSERS
+from lgapi.parsing import (
+    ParsePool,
+    get_template,
+    parse_multi_command_results,
+    parse_output,
+    parse_txt,
+)
+from lgapi.processing.bgp import process_bgp_output
+from lgapi.processing.budget import EnrichmentBudget
+from lgapi.types.config import ParsingConfig
+
+FIXTURE_DIR = Path("tests/fixtures")
+
+
+def parity_corpus() -> list[tuple[str, str, Path]]:
+    """Recorded outputs, named or grouped by device type and command, with the TTP result beside them."""
+    corpus = []
+    for output_path in sorted(FIXTURE_DIR.glob("*.txt")) + sorted(FIXTURE_DIR.glob("*/*.txt")):
+        name = output_path.stem if output_path.parent == FIXTURE_DIR else output_path.parent.name
+        device_type, command = name.rsplit("_", 1)
+        corpus.append((device_type, command, output_path))
+    return corpus
+
+
+def test_compiled_template_is_reused_without_leftover_results():
+    template = get_template("bgp", "juniper_junos")
+    bgp_output = (FIXTURE_DIR / "juniper_junos_bgp.txt").read_text()
+
+    first = parse_txt(bgp_output, template)
+    parse_txt((FIXTURE_DIR / "juniper_junos_ping.txt").read_text(), template)
+
+    assert get_template("bgp", "juniper_junos") is template
+    assert parse_txt(bgp_output, template) == first
+    assert list(first[0]) == ["8.8.8.0/24", "2001:4860::/32"]
+
+
+def test_missing_template():
+    assert get_template("bgp", "unknown_os") is None
+
+
+def test_parity_corpus_covers_every_native_parser():
+    assert {(device_type, command) for device_type, command, _ in parity_corpus()} == set(NATIVE_PARSERS)
+
+
+def test_native_parsers_match_golden_output():
+    for device_type, command, output_path in parity_corpus():
+        golden = json.loads(output_path.with_suffix(".json").read_text())
+        raw_output = output_path.read_text()
+
+        assert NATIVE_PARSERS[(device_type, command)](raw_output) == golden, output_path
+        assert parse_txt(raw_output, get_template(command, device_type)) == golden, output_path
+
+
+def test_native_parser_failure_falls_back_to_ttp():
+    # A success rate that is not a number fails the native parser, TTP gives its own result.
+    raw_output = (FIXTURE_DIR / "cisco_iosxr_ping.txt").read_text().replace("rate is 0 percent", "rate is ? percent")
+    template = get_template("ping", "cisco_iosxr")
+
+    assert parse_output(raw_output, "ping", "cisco_iosxr", template) == parse_txt(raw_output, template)
+    assert parse_output("output", "bgp", "unknown_os", None) == []
+
+
+def test_parsed_results_are_cached():
+    pool = ParsePool(ParsingConfig(executor="inline"))
+    raw_output = (FIXTURE_DIR / "cisco_iosxr_ping.txt").read_text()
+
+    first = asyncio.run(pool.parse(raw_output, "ping", "cisco_iosxr"))
+    assert asyncio.run(pool.parse(raw_output, "ping", "cisco_iosxr")) is first
+    assert pool.stats()["cached"] == 1 and pool.stats()["inline"] == 1
+
+
+def test_large_outputs_are_not_cached():
+    raw_output = (FIXTURE_DIR / "cisco_iosxr_ping.txt").read_text()
+    pool = ParsePool(ParsingConfig(executor="inline", cache_max_output=len(raw_output) - 1))
+
+    asyncio.run(pool.parse(raw_output, "ping", "cisco_iosxr"))
+    asyncio.run(pool.parse(raw_output, "ping", "cisco_iosxr"))
+    assert pool.stats()["cached"] == 0 and pool.stats()["inline"] == 2
+    assert not len(pool.cache)
+
+
+def parse_with_pool(pool: ParsePool, raw_output: str) -> list:
+    async def run():
+        return await pool.parse_uncached(raw_output, "traceroute", "cisco_iosxr", "text")
+
+    return asyncio.run(run())
+
+
+def test_large_outputs_are_parsed_in_the_pool():
+    raw_output = (FIXTURE_DIR / "cisco_iosxr_traceroute.txt").read_text()
+    expected = json.loads((FIXTURE_DIR / "cisco_iosxr_traceroute.json").read_text())
+
+    for executor in ("thread", "process"):
+        pool = ParsePool(ParsingConfig(executor=executor, workers=1, offload_min_size=len(raw_output)))
+        pool.start()
+        try:
+            assert parse_with_pool(pool, raw_output) == expected
+            assert parse_with_pool(pool, raw_output[:-1]) == expected
+        finally:
+            pool.close()
+        assert (pool.stats()["offloaded"], pool.stats()["inline"]) == (1, 1), executor
+
+
+class BrokenExecutor(Executor):
+    """Process pool whose worker died."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+
+def test_broken_process_pool_is_restarted(monkeypatch):
+    raw_output = (FIXTURE_DIR / "cisco_iosxr_traceroute.txt").read_text()
+    expected = json.loads((FIXTURE_DIR / "cisco_iosxr_traceroute.json").read_text())
+    pool = ParsePool(ParsingConfig(executor="process", workers=1, offload_min_size=0))
+    pool.executor = BrokenExecutor()
+
+    try:
+        # The parse is retried inline, and the next one goes to the new pool.
+        assert parse_with_pool(pool, raw_output) == expected
+        assert isinstance(pool.executor, ProcessPoolExecutor)
+        assert parse_with_pool(pool, raw_output) == expected
+    finally:
+        pool.close()
+    assert (pool.stats()["offloaded"], pool.stats()["inline"]) == (1, 1)
+
+
+def test_bgp_processing_does_not_modify_parsed_result():
+    # A locally originated route, no ASNs to look up.
+    parsed = {"192.0.2.0/24": {"paths": [{"next_hop": "0.0.0.0", "communities": ["64500:1"]}]}}
+    expected = json.loads(json.dumps(parsed))
+
+    result = asyncio.run(process_bgp_output(parsed, None, EnrichmentBudget(None)))
+
+    assert parsed == expected
+    assert result[0]["paths"][0]["as_path"] == []
+    assert result[0]["paths"][0]["communities"][0]["community"] == "64500:1"
+
+
+def test_multi_command_results_by_destination():
+    location = next(name for name, location in settings.locations.items() if location.type == "cisco_iosxr")
+    raw_output = (FIXTURE_DIR / "cisco_iosxr_ping.txt").read_text()
+    results = [
+        {
+            "location": location,
+            "outputs": {"192.0.2.1": raw_output, "192.0.2.2": raw_output},
+            "errors": {"192.0.2.3": "Error getting output from network device"},
+        }
+    ]
+
+    output = asyncio.run(parse_multi_command_results(results, "ping"))
+    single = output["locations"][0]["results"]
+
+    assert output["errors"] == [f"{location}:192.0.2.3: Error getting output from network device"]
+    assert single["raw_output"] == f"{raw_output}\n{raw_output}"
+    assert len(single["parsed_output"]) == 2 * len(parse_txt(raw_output, get_template("ping", "cisco_iosxr"))[0])
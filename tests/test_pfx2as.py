@@ -0,0 +1,69 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import gzip
+import ipaddress
+import random
+
+from lgapi.pfx2as import PrefixIndex, read_index
+
+PFX2AS = """\
+# prefix  length  asn
+10.0.0.0\t8\t64500
+10.1.0.0\t16\t64501
+10.1.2.0\t24\t64502_64503
+10.2.0.0\t16\t{64504,64505}
+192.0.2.0/24 64510 ripencc
+2001:db8::/32 64520
+2001:db8:1::/48 64521 arin
+not a prefix
+10.3.0.0\t33\t64530
+"""
+
+
+def test_longest_prefix_match():
+    index = PrefixIndex(PFX2AS.splitlines())
+
+    assert index.lookup("10.1.2.3") == {"asn": 64502, "bgp_prefix": "10.1.2.0/24", "registry": None}
+    assert index.lookup("10.1.3.1")["bgp_prefix"] == "10.1.0.0/16"
+    assert index.lookup("10.2.255.255")["asn"] == 64504
+    assert index.lookup("10.255.0.1")["asn"] == 64500
+    assert index.lookup("192.0.2.1") == {"asn": 64510, "bgp_prefix": "192.0.2.0/24", "registry": "ripencc"}
+    assert index.lookup("2001:db8:1::1")["asn"] == 64521
+    assert index.lookup("2001:db8:2::1")["asn"] == 64520
+    assert index.lookup("11.0.0.1") is None
+    assert index.lookup("2001:db9::1") is None
+    assert index.lookup("not an address") is None
+    assert (len(index), index.skipped) == (7, 2)
+
+
+def test_matches_linear_search():
+    rng = random.Random(1)
+    networks = []
+    for _ in range(500):
+        length = rng.randint(8, 28)
+        networks.append(ipaddress.ip_network((rng.getrandbits(32), length), strict=False))
+    index = PrefixIndex([f"{net.network_address}\t{net.prefixlen}\t{asn}" for asn, net in enumerate(networks)])
+
+    for _ in range(2000):
+        address = ipaddress.ip_address(rng.getrandbits(32))
+        if rng.random() < 0.5:
+            net = rng.choice(networks)
+            address = net.network_address + rng.randrange(net.num_addresses)
+        # The most specific covering prefix, the last one read if a prefix is repeated.
+        covering = [(net.prefixlen, asn) for asn, net in enumerate(networks) if address in net]
+        expected = max(covering)[1] if covering else None
+
+        result = index.lookup(str(address))
+        assert (result["asn"] if result else None) == expected
+
+
+def test_read_gzip_file(tmp_path):
+    filepath = tmp_path / "pfx2as.txt.gz"
+    with gzip.open(filepath, "wt") as pfx2as_file:
+        pfx2as_file.write(PFX2AS)
+
+    assert read_index(str(filepath)).lookup("10.1.2.3")["asn"] == 64502
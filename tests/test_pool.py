@@ -0,0 +1,129 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import time
+
+from lgapi import pool
+from lgapi.pool import ConnectionPool
+from lgapi.types.config import ConnectionPoolConfig
+
+DEVICE = {"host": "router.example.net", "platform": "cisco_iosxr"}
+
+
+class FakeScrapli:
+    """Device session that records opens and closes."""
+
+    opened: list["FakeScrapli"] = []
+
+    def __init__(self, **device_args):
+        self.device_args = device_args
+        self.alive = False
+        self.closed = False
+
+    async def open(self):
+        self.alive = True
+        FakeScrapli.opened.append(self)
+
+    async def close(self):
+        self.alive = False
+        self.closed = True
+
+    def isalive(self):
+        return self.alive
+
+    async def get_prompt(self):
+        return "RP/0/RSP0/CPU0:router#"
+
+
+def make_pool(monkeypatch, **config) -> ConnectionPool:
+    FakeScrapli.opened = []
+    monkeypatch.setattr(pool, "AsyncScrapli", FakeScrapli)
+    return ConnectionPool(ConnectionPoolConfig(**config))
+
+
+def test_idle_connection_is_reused(monkeypatch):
+    conn_pool = make_pool(monkeypatch)
+
+    async def run():
+        async with conn_pool.connection(DEVICE, "default") as first:
+            pass
+        async with conn_pool.connection(DEVICE, "default") as second:
+            pass
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert len(FakeScrapli.opened) == 1 and not first.closed
+
+
+def test_connection_is_discarded_after_an_error(monkeypatch):
+    conn_pool = make_pool(monkeypatch)
+
+    async def run():
+        for error in (OSError("command failed"), TimeoutError()):
+            try:
+                async with conn_pool.connection(DEVICE, "default"):
+                    raise error
+            except (OSError, TimeoutError):
+                pass
+        return conn_pool.pools[(DEVICE["host"], "default")]
+
+    device_pool = asyncio.run(run())
+    assert len(FakeScrapli.opened) == 2
+    assert all(conn.closed for conn in FakeScrapli.opened)
+    assert not device_pool.idle and device_pool.open_sessions == 0
+
+
+def test_idle_connections_are_evicted(monkeypatch):
+    conn_pool = make_pool(monkeypatch, idle_timeout=60)
+
+    async def run():
+        async with conn_pool.connection(DEVICE, "default") as conn:
+            pass
+        device_pool = conn_pool.pools[(DEVICE["host"], "default")]
+        await device_pool.evict_idle(time.monotonic() + 30)
+        kept = len(device_pool.idle)
+        await device_pool.evict_idle(time.monotonic() + 61)
+        return conn, kept, len(device_pool.idle)
+
+    conn, kept, left = asyncio.run(run())
+    assert kept == 1 and left == 0
+    assert conn.closed
+
+
+def test_sessions_are_bounded_by_max_sessions(monkeypatch):
+    conn_pool = make_pool(monkeypatch, max_sessions=2)
+    active = []
+    peak = []
+
+    async def command():
+        async with conn_pool.connection(DEVICE, "default"):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def run():
+        await asyncio.gather(*(command() for _ in range(5)))
+
+    asyncio.run(run())
+    assert max(peak) == 2
+    assert len(FakeScrapli.opened) == 2
+
+
+def test_close_closes_idle_sessions(monkeypatch):
+    conn_pool = make_pool(monkeypatch)
+
+    async def run():
+        conn_pool.start()
+        async with conn_pool.connection(DEVICE, "default"):
+            pass
+        await conn_pool.close()
+
+    asyncio.run(run())
+    assert all(conn.closed for conn in FakeScrapli.opened)
+    assert not conn_pool.pools
@@ -0,0 +1,121 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import socket
+import threading
+import time
+
+import dns.message
+import dns.rcode
+import dns.rrset
+from aiocache import SimpleMemoryCache
+
+from lgapi import decorators, resolver
+from lgapi.cache import reverse_dns_key_builder
+from lgapi.config import settings
+from lgapi.decorators import request_cache
+from lgapi.processing.cymru import ip_to_asn
+from lgapi.types.config import DnsConfig
+
+RECORDS = {
+    ("1.2.0.192.in-addr.arpa.", "PTR"): "router1.example.net.",
+    ("3.2.0.192.origin.asn.cymru.com.", "TXT"): '"64500 | 192.0.2.0/24 | GB | ripencc | 2001-01-01"',
+}
+
+# Queries for this name are never answered.
+DROPPED = "4.2.0.192.in-addr.arpa."
+
+
+def run_stub_dns() -> tuple[socket.socket, list]:
+    """Answer the records above over UDP on a free local port, NXDOMAIN for anything else."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    queries = []
+
+    def serve():
+        while True:
+            try:
+                wire, peer = sock.recvfrom(4096)
+            except OSError:
+                return
+            query = dns.message.from_wire(wire)
+            question = query.question[0]
+            name, rdtype = question.name.to_text(), dns.rdatatype.to_text(question.rdtype)
+            queries.append(name)
+            if name == DROPPED:
+                continue
+
+            response = dns.message.make_response(query)
+            answer = RECORDS.get((name, rdtype))
+            if answer is None:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            else:
+                response.answer.append(dns.rrset.from_text(name, 60, "IN", rdtype, answer))
+            sock.sendto(response.to_wire(), peer)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return sock, queries
+
+
+def use_stub(monkeypatch, sock: socket.socket, **config) -> None:
+    monkeypatch.setattr(settings, "dns", DnsConfig(nameservers=["127.0.0.1"], port=sock.getsockname()[1], **config))
+    resolver.get_resolver.cache_clear()
+
+
+def test_reverse_and_cymru_lookups_use_the_configured_server(monkeypatch):
+    sock, queries = run_stub_dns()
+    use_stub(monkeypatch, sock, max_queries=1)
+
+    async def run():
+        return await asyncio.gather(
+            resolver.reverse_lookup("192.0.2.1"), resolver.reverse_lookup("192.0.2.2"), ip_to_asn("192.0.2.3")
+        )
+
+    try:
+        found, missing, asn_info = asyncio.run(run())
+    finally:
+        sock.close()
+        resolver.get_resolver.cache_clear()
+
+    assert found == "router1.example.net"
+    assert missing == ""
+    assert asn_info == {"asn": 64500, "bgp_prefix": "192.0.2.0/24", "registry": "ripencc"}
+    assert len(queries) == 3
+
+
+def test_query_lifetime(monkeypatch):
+    sock, _ = run_stub_dns()
+    use_stub(monkeypatch, sock, timeout=0.1, lifetime=0.2)
+
+    start = time.monotonic()
+    try:
+        result = asyncio.run(resolver.reverse_lookup("192.0.2.4"))
+    finally:
+        sock.close()
+        resolver.get_resolver.cache_clear()
+
+    assert result == ""
+    assert time.monotonic() - start < 1
+
+
+def test_failed_lookups_are_cached_for_the_negative_ttl(monkeypatch):
+    monkeypatch.setattr(settings.cache, "enabled", True)
+    monkeypatch.setattr(settings.cache, "negative_ttl", 0)
+    monkeypatch.setattr(decorators.caches, "get", lambda alias: SimpleMemoryCache())
+    calls = []
+
+    @request_cache(ttl=3600, alias="default", key_builder=reverse_dns_key_builder)
+    async def lookup(name: str) -> str:
+        calls.append(name)
+        return "" if name.startswith("missing") else f"{name}.example.net"
+
+    async def run():
+        for name in ("found-negative-ttl", "found-negative-ttl", "missing-negative-ttl", "missing-negative-ttl"):
+            await lookup(name)
+
+    asyncio.run(run())
+    assert calls == ["found-negative-ttl", "missing-negative-ttl", "missing-negative-ttl"]
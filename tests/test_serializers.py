@@ -0,0 +1,60 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import json
+from pathlib import Path
+
+from aiocache.serializers import JsonSerializer, PickleSerializer
+
+from lgapi.parsing import get_template, parse_txt
+from lgapi.serializers import PLAIN, ZSTD, CompactSerializer
+
+FIXTURE_DIR = Path("tests/fixtures")
+
+VARIANTS = [
+    {"fmt": "json"},
+    {"fmt": "msgpack"},
+    {"fmt": "json", "compression": "zstd", "compress_min_size": 0},
+    {"fmt": "msgpack", "compression": "zstd", "compress_min_size": 0},
+]
+
+
+def result_payloads() -> list:
+    """Values as cached: TTP parsed results, lookups with missing fields and command output with tuples."""
+    payloads = [
+        parse_txt((FIXTURE_DIR / f"{name}.txt").read_text(), get_template(command, "cisco_iosxr"))
+        for name, command in (("cisco_iosxr_bgp", "bgp"), ("cisco_iosxr_traceroute", "traceroute"))
+    ]
+    payloads.append({"asn": "64500", "prefix": "192.0.2.0/24", "country": "GB", "registry": None, "allocated": None})
+    payloads.append({"value": "output", "stale_at": 1700000000.5, "hops": ("192.0.2.1", None, ("192.0.2.9", 2))})
+    payloads.append({})
+    return payloads
+
+
+def test_variants_round_trip_result_payloads():
+    for options in VARIANTS:
+        serializer = CompactSerializer(**options)
+        for payload in result_payloads():
+            # Tuples come back as lists, as they would from the API's JSON responses.
+            assert serializer.loads(serializer.dumps(payload)) == json.loads(json.dumps(payload)), options
+
+
+def test_large_values_are_compressed():
+    payload = result_payloads()[0]
+    assert CompactSerializer(compression="zstd", compress_min_size=64).dumps(payload)[:1] == ZSTD
+    assert CompactSerializer(compression="zstd", compress_min_size=10**9).dumps(payload)[:1] == PLAIN
+    assert CompactSerializer().dumps(payload)[:1] == PLAIN
+
+
+def test_values_from_older_serializers_are_misses():
+    payload = result_payloads()[2]
+    for old in (PickleSerializer(), JsonSerializer()):
+        stored = old.dumps(payload)
+        stored = stored.encode() if isinstance(stored, str) else stored
+        for options in VARIANTS:
+            assert CompactSerializer(**options).loads(stored) is None
+
+    assert CompactSerializer().loads(None) is None
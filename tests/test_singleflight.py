@@ -0,0 +1,173 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+
+from lgapi.admission import DeviceBusyError
+from lgapi.singleflight import CoalescedCallError, LocalBackend, SingleFlight
+
+
+def make_call(calls: list, result: str = "output", delay: float = 0.05, error: Exception | None = None):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+
+    return call
+
+
+def test_concurrent_calls_in_one_worker_are_coalesced():
+    async def run():
+        calls = []
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", make_call(calls), timeout=5) for _ in range(10)))
+        return calls, results, flight.calls
+
+    calls, results, in_flight = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == ["output"] * 10
+    assert not in_flight
+
+
+def test_different_keys_are_not_coalesced():
+    async def run():
+        calls = []
+        flight = SingleFlight()
+        await asyncio.gather(flight.do("a", make_call(calls), timeout=5), flight.do("b", make_call(calls), timeout=5))
+        return calls
+
+    assert len(asyncio.run(run())) == 2
+
+
+def test_calls_are_coalesced_across_workers():
+    async def run():
+        calls = []
+        backend = LocalBackend()
+        workers = [SingleFlight(backend) for _ in range(3)]
+        results = await asyncio.gather(*(worker.do("key", make_call(calls), timeout=5) for worker in workers))
+        return calls, results
+
+    calls, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == ["output"] * 3
+
+
+def test_errors_are_shared_with_other_workers():
+    async def run():
+        calls = []
+        backend = LocalBackend()
+        leader, follower = SingleFlight(backend), SingleFlight(backend)
+        call = make_call(calls, error=OSError("connection refused"))
+        return await asyncio.gather(
+            leader.do("key", call, timeout=5), follower.do("key", call, timeout=5), return_exceptions=True
+        )
+
+    leader_result, follower_result = asyncio.run(run())
+    assert isinstance(leader_result, OSError)
+    assert isinstance(follower_result, CoalescedCallError)
+
+
+def test_busy_errors_are_raised_as_busy_in_other_workers():
+    async def run():
+        calls = []
+        backend = LocalBackend()
+        leader, follower = SingleFlight(backend), SingleFlight(backend)
+        call = make_call(calls, error=DeviceBusyError("LON", retry_after=3, queue_full=True))
+        return await asyncio.gather(
+            leader.do("key", call, timeout=5), follower.do("key", call, timeout=5), return_exceptions=True
+        )
+
+    _, follower_result = asyncio.run(run())
+    assert isinstance(follower_result, DeviceBusyError)
+    assert (follower_result.location, follower_result.retry_after, follower_result.queue_full) == ("LON", 3, True)
+
+
+class FailingBackend(LocalBackend):
+    """Coalescing backend that can not be reached, after taking the lock if lock_works is set."""
+
+    def __init__(self, lock_works: bool = False):
+        super().__init__()
+        self.lock_works = lock_works
+
+    async def try_lock(self, key: str, token: str, ttl: float) -> bool:
+        if self.lock_works:
+            return await super().try_lock(key, token, ttl)
+        raise ConnectionError("Backend unreachable")
+
+    async def wait(self, key: str, timeout: float) -> str | None:
+        raise ConnectionError("Backend unreachable")
+
+    async def publish(self, key: str, message: str) -> None:
+        raise ConnectionError("Backend unreachable")
+
+    async def unlock(self, key: str, token: str) -> None:
+        raise ConnectionError("Backend unreachable")
+
+
+def test_backend_errors_run_the_call_locally():
+    async def run():
+        calls = []
+        results = []
+        for backend in (FailingBackend(), FailingBackend(lock_works=True)):
+            results.append(await SingleFlight(backend).do("key", make_call(calls), timeout=5))
+        return calls, results
+
+    calls, results = asyncio.run(run())
+    assert len(calls) == 2
+    assert results == ["output", "output"]
+
+
+def test_follower_runs_the_call_when_waiting_fails():
+    async def run():
+        calls = []
+        backend = FailingBackend(lock_works=True)
+        await LocalBackend.try_lock(backend, "key", "other", ttl=5)
+        return calls, await SingleFlight(backend).do("key", make_call(calls), timeout=5)
+
+    calls, result = asyncio.run(run())
+    assert len(calls) == 1 and result == "output"
+
+
+def test_cancelled_caller_does_not_cancel_call():
+    async def run():
+        calls = []
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("key", make_call(calls, delay=0.1), timeout=5))
+        second = asyncio.create_task(flight.do("key", make_call(calls, delay=0.1), timeout=5))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return calls, await second
+
+    calls, result = asyncio.run(run())
+    assert len(calls) == 1
+    assert result == "output"
+
+
+def test_waiter_runs_call_when_lock_holder_never_publishes():
+    async def run():
+        calls = []
+        backend = LocalBackend()
+        await backend.try_lock("key", "stale", ttl=0.05)
+        return calls, await SingleFlight(backend).do("key", make_call(calls), timeout=5)
+
+    calls, result = asyncio.run(run())
+    assert len(calls) == 1
+    assert result == "output"
+
+
+def test_sequential_calls_run_again():
+    async def run():
+        key = "command:LON_bgp_192.0.2.1"
+        calls = []
+        flight = SingleFlight(LocalBackend())
+        await flight.do(key, make_call(calls), timeout=5)
+        await asyncio.sleep(0)
+        await flight.do(key, make_call(calls), timeout=5)
+        return calls
+
+    assert len(asyncio.run(run())) == 2
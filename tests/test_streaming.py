@@ -0,0 +1,90 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from lgapi import admission, streaming
+from lgapi.admission import ConcurrencyLimiter
+from lgapi.config import settings
+from lgapi.main import app
+from lgapi.parsing import get_template, parse_txt
+from lgapi.streaming import is_hop_header, parse_hops
+from lgapi.types.config import ConcurrencyConfig
+
+FIXTURE_DIR = Path("tests/fixtures")
+
+IOSXR_LOCATION = next(name for name, location in settings.locations.items() if location.type == "cisco_iosxr")
+
+
+def test_hops_parsed_per_line_match_the_whole_output():
+    for device_type in ("cisco_iosxr", "juniper_junos"):
+        template = get_template("traceroute", device_type)
+        raw_output = (FIXTURE_DIR / f"{device_type}_traceroute.txt").read_text()
+        expected = [hop for result in parse_txt(raw_output, template)[0].values() for hop in result["hops"]]
+
+        header = None
+        hops = []
+        for line in raw_output.splitlines():
+            entries = parse_hops(header, line, template) if header is not None else []
+            hops.extend(entries)
+            if not entries and is_hop_header(line, template):
+                header = line
+
+        assert hops == expected, device_type
+
+
+def stream_events(client: TestClient, url: str) -> tuple[int, list[dict], dict]:
+    response = client.get(url)
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    return response.status_code, events, response.headers
+
+
+def use_device(monkeypatch, lines: list[str], error: Exception | None = None) -> None:
+    async def stream_on_device(**kwargs):
+        for line in lines:
+            yield line
+        if error:
+            raise error
+
+    monkeypatch.setattr(streaming, "stream_on_device", stream_on_device)
+
+
+def test_ping_stream_events(monkeypatch):
+    use_device(monkeypatch, (FIXTURE_DIR / "cisco_iosxr_ping.txt").read_text().splitlines())
+    status, events, _ = stream_events(TestClient(app), f"/ping/{IOSXR_LOCATION}/192.0.2.1/stream")
+
+    assert status == 200
+    types = [event["type"] for event in events]
+    assert types[0] == "start" and types[-2:] == ["result", "end"]
+    assert set(types[1:-2]) == {"line"}
+    assert admission.limiters[IOSXR_LOCATION].stats()["active"] == 0
+
+
+def test_stream_error_event(monkeypatch):
+    use_device(monkeypatch, ["Type escape sequence to abort."], error=OSError("connection reset"))
+    status, events, _ = stream_events(TestClient(app), f"/ping/{IOSXR_LOCATION}/192.0.2.1/stream")
+
+    assert status == 200
+    assert [event["type"] for event in events] == ["start", "line", "error"]
+
+
+def test_busy_device_is_rejected_before_the_stream(monkeypatch):
+    use_device(monkeypatch, ["never sent"])
+    limiter = ConcurrencyLimiter(IOSXR_LOCATION, ConcurrencyConfig(max_concurrent=1, max_queue=0))
+    monkeypatch.setitem(admission.limiters, IOSXR_LOCATION, limiter)
+
+    async def hold_slot():
+        await limiter.acquire()
+
+    asyncio.run(hold_slot())
+    status, _, headers = stream_events(TestClient(app), f"/ping/{IOSXR_LOCATION}/192.0.2.1/stream?format=ndjson")
+
+    assert status == 429
+    assert int(headers["Retry-After"]) >= 1
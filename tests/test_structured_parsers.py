@@ -0,0 +1,63 @@
+# Copyright (c) 2025, Rob Woodward. All rights reserved.
+#
+# This file is part of Looking Glass API and is released under the
+# "BSD 2-Clause License". Please see the LICENSE file that should
+# have been included as part of this distribution.
+#
+import asyncio
+from pathlib import Path
+
+from lgapi.parsing import has_parser, parse_output
+from lgapi.processing.ping import process_ping_output
+from lgapi.structured_parsers import decode_junos_bgp, decode_junos_ping
+from lgapi.types.models import PingData
+
+FIXTURE_DIR = Path("tests/fixtures/structured")
+
+
+def test_junos_bgp_json():
+    result = decode_junos_bgp((FIXTURE_DIR / "juniper_junos_bgp.json").read_text())[0]
+
+    # The static route entry is skipped and the table without routes adds no prefix.
+    assert list(result) == ["8.8.8.0/24", "2001:4860::/32"]
+    best, backup = result["8.8.8.0/24"]["paths"]
+    assert best == {
+        "best_path": True,
+        "next_hop": "192.0.2.1",
+        "as_path": "15169 I",
+        "local_pref": "100",
+        "metric": "0",
+        "communities": ["64500:100", "64500:2001", "2914:410"],
+    }
+    assert backup["best_path"] is False
+    assert backup["next_hop"] == "198.51.100.1"
+    assert result["2001:4860::/32"]["paths"] == [
+        {"best_path": True, "next_hop": "2001:db8::77", "as_path": "I", "local_pref": "200"}
+    ]
+
+
+def test_junos_ping_json_matches_text_output():
+    result = decode_junos_ping((FIXTURE_DIR / "juniper_junos_ping.json").read_text())[0]
+
+    assert result["8.8.8.8"] == {
+        "packet_size": "56",
+        "packet_count": "5",
+        "packet_loss": "0",
+        "rtt_min": "1.198ms",
+        "rtt_avg": "1.244ms",
+        "rtt_max": "1.312ms",
+    }
+    assert result["192.0.2.55"] == {"packet_size": "56", "packet_count": "5", "packet_loss": "100"}
+
+    ping_data = [PingData(**entry) for entry in asyncio.run(process_ping_output(result))]
+    assert [entry.packet_loss for entry in ping_data] == [0, 100, 20]
+
+
+def test_structured_output_is_only_decoded_where_supported():
+    raw_output = (FIXTURE_DIR / "juniper_junos_ping.json").read_text()
+
+    assert has_parser("ping", "juniper_junos", "json")
+    assert not has_parser("traceroute", "juniper_junos", "json")
+    assert parse_output(raw_output, "ping", "juniper_junos", None, output_format="json")[0]
+    assert parse_output(raw_output, "ping", "cisco_iosxr", None, output_format="json") == []
+    assert parse_output("error: syntax error", "ping", "juniper_junos", None, output_format="json") == []